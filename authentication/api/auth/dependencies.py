@@ -1,25 +1,72 @@
-from typing import Annotated
+from typing import Annotated, Callable
 
-from fastapi import HTTPException, status, Depends
-from fastapi.security import OAuth2PasswordBearer
+from fastapi import HTTPException, status, Depends, Request
+from fastapi.security import OAuth2PasswordBearer, HTTPBasic, HTTPBasicCredentials
 
-from api.dependencies import get_auth_service
+from api.dependencies import get_auth_service, get_token_verifier
 from models.scope import Scope
 from models.user import User
 from services.authentication_serivce import AuthenticationService, AuthenticationError
+from services.client_cache import ClientPrincipal
+from services.token_verifier import TokenVerifier, TokenPrincipal
 
 oauth2_password_scheme = OAuth2PasswordBearer(tokenUrl="auth/token-password/")
+client_basic_scheme = HTTPBasic(description="client id and client secret")
 
 
-async def authenticate(
+async def get_request_principal(
+        request: Request,
         token: Annotated[str, Depends(oauth2_password_scheme)],
+        verifier: Annotated[TokenVerifier, Depends(get_token_verifier)]
+) -> TokenPrincipal:
+    """Decodes the bearer token once per request, everything after reads it from request.state"""
+    principal = getattr(request.state, "principal", None)
+    if principal is None:
+        try:
+            principal = verifier.get_principal(token)
+        except AuthenticationError as e:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(e))
+        request.state.principal = principal
+    return principal
+
+
+def require_scopes(*required: Scope.Types, forbidden: tuple[Scope.Types, ...] = ()) -> Callable:
+    async def check_scopes(
+            principal: Annotated[TokenPrincipal, Depends(get_request_principal)]
+    ) -> TokenPrincipal:
+        if not principal.scopes.issuperset(required) or not principal.scopes.isdisjoint(forbidden):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="No required scope")
+        return principal
+
+    return check_scopes
+
+
+check_profile_scopes = require_scopes(Scope.Types.UNRESTRICTED, forbidden=(Scope.Types.PROFILE_WRITE,))
+
+
+async def authenticate_introspection_client(
+        credentials: Annotated[HTTPBasicCredentials, Depends(client_basic_scheme)],
         auth_service: Annotated[AuthenticationService, Depends(get_auth_service)]
-) -> User:
+) -> ClientPrincipal:
+    """RFC 7662 callers authenticate as a client holding the token-introspect scope"""
     try:
-        scopes = auth_service.get_scopes(token)
-        if Scope.Types.UNRESTRICTED not in scopes or Scope.Types.PROFILE_WRITE in scopes:
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str("No required scope"))
+        client = await auth_service.authenticate_client(int(credentials.username), credentials.password)
+    except (ValueError, AuthenticationError):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid client credentials",
+            headers={"WWW-Authenticate": "Basic"}
+        )
+    if Scope.Types.TOKEN_INTROSPECT not in client.scopes:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No required scope")
+    return client
 
-        return await auth_service.get_user_by_token(token)
+
+async def authenticate(
+        principal: Annotated[TokenPrincipal, Depends(check_profile_scopes)],
+        auth_service: Annotated[AuthenticationService, Depends(get_auth_service)]
+) -> User:
+    try:
+        return await auth_service.get_user_by_subject(principal.subject)
     except AuthenticationError as e:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(e))
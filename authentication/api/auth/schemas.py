@@ -44,6 +44,17 @@ class VerifyRequest(BaseSchema):
     access_token: str
 
 
+class IntrospectionResponse(BaseSchema):
+    """RFC 7662 response, inactive tokens only carry the active member"""
+    active: bool
+    sub: Optional[str] = None
+    scopes: Optional[list[str]] = None
+    exp: Optional[float] = None
+    iat: Optional[float] = None
+    iss: Optional[str] = None
+    type: Optional[str] = None
+
+
 class TokenResponse(BaseSchema):
     access_token: str
     refresh_token: Optional[str]
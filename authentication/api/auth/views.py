@@ -1,15 +1,22 @@
+import math
+import time
 from enum import Enum
-from typing import Annotated
+from typing import Annotated, Optional
 
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Form
+from starlette.responses import Response
 
-from api.auth.dependencies import oauth2_password_scheme
+from api.auth.dependencies import oauth2_password_scheme, authenticate_introspection_client
 from api.auth.schemas import CredentialsRequest, TokenResponse, AuthorizationResponse, \
-    CodeTokenRequest, PasswordTokenRequestForm, RefreshRequest
-from api.dependencies import get_auth_service
+    CodeTokenRequest, PasswordTokenRequestForm, RefreshRequest, IntrospectionResponse
+from api.dependencies import get_auth_service, get_token_verifier
+from api.responses import make_response
 from api.schemas import ErrorSchema, MessageResponse
 from env import get_develop_mode
-from services.authentication_serivce import AuthenticationService, AuthenticationError, TokenTypes
+from services.authentication_serivce import AuthenticationService, AuthenticationError, TokenTypes, TOKEN_SUB, \
+    TOKEN_SCOPES, TOKEN_EXP, TOKEN_IAT, TOKEN_ISS, TOKEN_TYPE
+from services.token_cache import token_claims_cache
+from services.token_verifier import TokenVerifier
 
 AUTH_URL_NAME = "auth"
 
@@ -21,6 +28,7 @@ class AuthRoutes(str, Enum):
     CALLBACK_CODE = "/login-code/"
     REFRESH = "/refresh/"
     VERIFY = "/verify/"
+    INTROSPECT = "/introspect/"
 
 
 router = APIRouter(
@@ -31,9 +39,10 @@ router = APIRouter(
 
 
 # Move common things into dependencies (service, session etc)
-@router.get(AuthRoutes.GET_AUTHORIZATION_URI)
-async def code_auth_url(client_id: int, redirect_uri: str) -> AuthorizationResponse:
-    return AuthorizationResponse(
+@router.get(AuthRoutes.GET_AUTHORIZATION_URI, response_model=AuthorizationResponse)
+async def code_auth_url(client_id: int, redirect_uri: str) -> Response:
+    return make_response(
+        AuthorizationResponse,
         redirect_uri=AuthenticationService.get_auth_uri(client_id, redirect_uri)
     )
 
@@ -61,11 +70,11 @@ async def callback_code(
     )
 
 
-@router.post(AuthRoutes.TOKEN_CODE)
+@router.post(AuthRoutes.TOKEN_CODE, response_model=TokenResponse)
 async def token_code(
         data: CodeTokenRequest,
         auth_service: Annotated[AuthenticationService, Depends(get_auth_service)]
-) -> TokenResponse:
+) -> Response:
     try:
         access_token, refresh_token = await auth_service.create_code_pair(
             client_id=data.client_id,
@@ -76,19 +85,20 @@ async def token_code(
     except AuthenticationError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
-    return TokenResponse(
+    return make_response(
+        TokenResponse,
         access_token=access_token,
         refresh_token=refresh_token,
         token_type="bearer"
     )
 
 
-@router.post(AuthRoutes.TOKEN_PASSWORD)
+@router.post(AuthRoutes.TOKEN_PASSWORD, response_model=TokenResponse)
 async def token_password(
         data: Annotated[PasswordTokenRequestForm, Depends()],
         auth_service: Annotated[AuthenticationService, Depends(get_auth_service)],
         develop_mode: Annotated[bool, Depends(get_develop_mode)]
-) -> TokenResponse:
+) -> Response:
     if not develop_mode:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only available in the develop mode")
     try:
@@ -101,18 +111,19 @@ async def token_password(
     except AuthenticationError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
-    return TokenResponse(
+    return make_response(
+        TokenResponse,
         access_token=access_token,
         refresh_token=None,
         token_type="bearer"
     )
 
 
-@router.post(AuthRoutes.REFRESH)
+@router.post(AuthRoutes.REFRESH, response_model=TokenResponse)
 async def refresh(
         data: RefreshRequest,
         auth_service: Annotated[AuthenticationService, Depends(get_auth_service)]
-) -> TokenResponse:
+) -> Response:
     try:
         access_token, refresh_token = await auth_service.refresh_pair(
             refresh_token=data.refresh_token,
@@ -122,26 +133,69 @@ async def refresh(
     except AuthenticationError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
-    return TokenResponse(
+    return make_response(
+        TokenResponse,
         access_token=access_token,
         refresh_token=refresh_token,
         token_type="bearer"
     )
 
 
-@router.post(AuthRoutes.VERIFY)
+@router.post(AuthRoutes.VERIFY, response_model=MessageResponse)
 async def verify(
         token: Annotated[str, Depends(oauth2_password_scheme)],
-        auth_service: Annotated[AuthenticationService, Depends(get_auth_service)]
-) -> MessageResponse:
+        verifier: Annotated[TokenVerifier, Depends(get_token_verifier)]
+) -> Response:
     try:
-        auth_service.decode_token(
+        verifier.verify(
             token=token,
             required_type=TokenTypes.ACCESS
         )
     except AuthenticationError as e:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(e))
 
-    return MessageResponse(
+    return make_response(
+        MessageResponse,
         detail="Token is valid"
     )
+
+
+def get_introspection_cache_control(claims: Optional[dict]) -> str:
+    """Resource servers may reuse an answer until the token expires, never for longer"""
+    if not claims:
+        return "no-store"
+    max_age = min(math.floor(claims[TOKEN_EXP] - time.time()), token_claims_cache.ttl)
+    return f"private, max-age={max(max_age, 0)}"
+
+
+@router.post(
+    AuthRoutes.INTROSPECT,
+    response_model=IntrospectionResponse,
+    dependencies=[Depends(authenticate_introspection_client)]
+)
+async def introspect(
+        token: Annotated[str, Form()],
+        verifier: Annotated[TokenVerifier, Depends(get_token_verifier)],
+        token_type_hint: Annotated[Optional[str], Form()] = None
+) -> Response:
+    # the hint is optional in RFC 7662, every token type is decoded the same way
+    try:
+        claims = verifier.introspect(token)
+    except AuthenticationError:
+        claims = None
+
+    if claims:
+        response = make_response(
+            IntrospectionResponse,
+            active=True,
+            sub=claims[TOKEN_SUB],
+            scopes=claims[TOKEN_SCOPES],
+            exp=claims[TOKEN_EXP],
+            iat=claims.get(TOKEN_IAT),
+            iss=claims.get(TOKEN_ISS),
+            type=claims.get(TOKEN_TYPE)
+        )
+    else:
+        response = make_response(IntrospectionResponse, active=False)
+    response.headers["Cache-Control"] = get_introspection_cache_control(claims)
+    return response
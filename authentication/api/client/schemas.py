@@ -1,13 +1,18 @@
 from datetime import datetime
+from typing import Annotated
 
-from pydantic import BaseModel as BaseSchema
+from pydantic import BaseModel as BaseSchema, StringConstraints
 
+from api.user.schemas import Username
+from models.client import USERNAME_REGEX as CLIENT_NAME_REGEX
 from models.scope import Scope
 
+ClientName = Annotated[str, StringConstraints(pattern=CLIENT_NAME_REGEX)]
+
 
 class RegisterClientRequest(BaseSchema):
-    username: str
-    client_name: str
+    username: Username
+    client_name: ClientName
     scopes: list[Scope.Types]
 
 
@@ -1,4 +1,4 @@
-from typing import Annotated
+from typing import Annotated, AsyncIterator
 
 from fastapi import Depends
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -6,25 +6,34 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from config import get_session
 from services.authentication_serivce import AuthenticationService
 from services.client_service import ClientService
+from services.token_verifier import TokenVerifier, token_verifier
 from services.user_service import UserService
 
 
+async def get_request_session() -> AsyncIterator[AsyncSession]:
+    """Closed once the response is sent, returning its connection to the pool"""
+    async with get_session() as session:
+        yield session
+
+
+async def get_token_verifier() -> TokenVerifier:
+    """Shared by claim only routes, resolving it opens no session"""
+    return token_verifier
+
+
 async def get_auth_service(
-        session: Annotated[AsyncSession, Depends(get_session)]
+        session: Annotated[AsyncSession, Depends(get_request_session)]
 ) -> AuthenticationService:
-    async with session:
-        return AuthenticationService(session)
+    return AuthenticationService(session)
 
 
 async def get_user_service(
-        session: Annotated[AsyncSession, Depends(get_session)]
+        session: Annotated[AsyncSession, Depends(get_request_session)]
 ) -> UserService:
-    async with session:
-        return UserService(session)
+    return UserService(session)
 
 
 async def get_client_service(
-        session: Annotated[AsyncSession, Depends(get_session)]
+        session: Annotated[AsyncSession, Depends(get_request_session)]
 ) -> ClientService:
-    async with session:
-        return ClientService(session)
+    return ClientService(session)
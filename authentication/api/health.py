@@ -0,0 +1,59 @@
+from enum import Enum
+from typing import Optional
+
+from fastapi import APIRouter
+from pydantic import BaseModel as BaseSchema
+from starlette.responses import Response
+
+from api.responses import make_response
+from monitoring.health import health_state
+
+HEALTH_URL_NAME = "health"
+
+
+class HealthStatus(str, Enum):
+    LIVE = "live"
+    READY = "ready"
+    NOT_READY = "not_ready"
+
+
+class LiveResponse(BaseSchema):
+    status: str
+
+
+class ReadyResponse(BaseSchema):
+    status: str
+    failures: list[str]
+    saturated: list[str]
+    database: bool
+    schema_revision: Optional[str]
+    pool_saturation: float
+    hashing_saturation: float
+    loop_lag_seconds: float
+
+
+router = APIRouter(prefix=f"/{HEALTH_URL_NAME}", tags=[HEALTH_URL_NAME])
+
+
+@router.get("/live", include_in_schema=False)
+async def live() -> Response:
+    """Answers as long as the event loop does, never touches the database"""
+    return make_response(LiveResponse, status=HealthStatus.LIVE)
+
+
+@router.get("/ready", include_in_schema=False)
+async def ready() -> Response:
+    """Reads the state of the background checks, a probe costs no connection"""
+    failures = health_state.get_failures()
+    return make_response(
+        ReadyResponse,
+        status_code=503 if failures else 200,
+        status=HealthStatus.NOT_READY if failures else HealthStatus.READY,
+        failures=failures,
+        saturated=health_state.get_saturated(),
+        database=health_state.database,
+        schema_revision=health_state.schema_revision,
+        pool_saturation=round(health_state.pool_saturation, 3),
+        hashing_saturation=round(health_state.hashing_saturation, 3),
+        loop_lag_seconds=round(health_state.loop_lag_seconds, 4),
+    )
@@ -0,0 +1,69 @@
+import time
+from typing import Iterable
+
+from fastapi import APIRouter
+from fastapi.routing import APIRoute
+from starlette.datastructures import MutableHeaders
+from starlette.responses import Response
+from starlette.types import ASGIApp, Scope, Receive, Send, Message
+
+from env import get_develop_mode
+from monitoring.metrics import registry, REQUEST_LATENCY, RESPONSES, DB_QUERIES_PER_REQUEST, DB_TIME_PER_REQUEST
+from monitoring.queries import track_queries, QueryStats
+
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# requests that did not match a route share one label so unknown paths can not grow the registry
+UNMATCHED_ROUTE = "other"
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    return Response(registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+
+def preallocate_route_metrics(routes: Iterable):
+    """Creates the latency histograms of every route up front, they are reported before the first request"""
+    for route in routes:
+        if isinstance(route, APIRoute):
+            for method in route.methods:
+                REQUEST_LATENCY.labels(method, route.path)
+
+
+def get_server_timing(stats: QueryStats) -> str:
+    return f'db;dur={stats.duration * 1000:.2f};desc="{stats.count} queries"'
+
+
+class MetricsMiddleware:
+    """Records the latency, status and statements of every request under the path template of its route"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        status = 500
+        debug = get_develop_mode()
+
+        with track_queries() as stats:
+            async def send_with_status(message: Message):
+                nonlocal status
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    if debug:
+                        MutableHeaders(scope=message).append("Server-Timing", get_server_timing(stats))
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                route = scope.get("route")
+                labels = (scope["method"], route.path if route else UNMATCHED_ROUTE)
+                REQUEST_LATENCY.labels(*labels).observe(time.perf_counter() - started)
+                RESPONSES.labels(*labels, str(status)).inc()
+                DB_QUERIES_PER_REQUEST.labels(*labels).observe(stats.count)
+                DB_TIME_PER_REQUEST.labels(*labels).observe(stats.duration)
@@ -0,0 +1,155 @@
+import json
+import logging
+import math
+from functools import lru_cache
+from typing import Optional
+from urllib.parse import parse_qs
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Scope, Receive, Send, Message
+
+from api.responses import get_response_class
+from config import get_rate_limit_backend
+from env import get_rate_limit_enabled, get_rate_limit_default, get_rate_limit_routes
+from services.rate_limiter import Rate, RateLimitBackend, BucketState, RATE_LIMIT_BACKEND_MAP
+
+logger = logging.getLogger(__name__)
+
+# client ids are only looked up in bodies of routes with their own rate
+MAX_INSPECTED_BODY_SIZE = 64 * 1024
+INSPECTED_CONTENT_TYPES = (b"application/json", b"application/x-www-form-urlencoded")
+# orchestrator probes must not be throttled nor touch the backend
+EXEMPT_PATH_PREFIXES = ("/health/",)
+
+
+@lru_cache(maxsize=4)
+def get_route_rates(routes: str) -> dict[str, Rate]:
+    rates = {}
+    for rule in routes.split(","):
+        path, rate = rule.split("=")
+        rates[path] = Rate.parse(rate)
+    return rates
+
+
+@lru_cache(maxsize=4)
+def get_default_rate(rate: str) -> Rate:
+    return Rate.parse(rate)
+
+
+def parse_client_id(value) -> Optional[str]:
+    if isinstance(value, list):
+        value = value[0] if value else None
+    if isinstance(value, int) and not isinstance(value, bool):
+        value = str(value)
+    if isinstance(value, str) and value.isdigit():
+        return value
+    return None
+
+
+def get_client_id_from_body(content_type: bytes, body: bytes) -> Optional[str]:
+    try:
+        if content_type.startswith(b"application/json"):
+            data = json.loads(body)
+            return parse_client_id(data.get("client_id")) if isinstance(data, dict) else None
+        return parse_client_id(parse_qs(body.decode()).get("client_id"))
+    except ValueError:
+        return None
+
+
+def get_rate_limit_headers(state: BucketState) -> dict[str, str]:
+    headers = {
+        "RateLimit-Limit": str(state.limit),
+        "RateLimit-Remaining": str(state.remaining),
+        "RateLimit-Reset": str(math.ceil(state.reset_after)),
+    }
+    if not state.allowed:
+        headers["Retry-After"] = str(math.ceil(state.retry_after))
+    return headers
+
+
+class RateLimitMiddleware:
+    """
+    Token buckets per route for every IP and client id, answers 429 once one of them is empty.
+    The client id is not authenticated yet, a request only takes tokens when every bucket allows it,
+    so a client bucket is not drained by requests its IP bucket already denies
+    """
+
+    def __init__(self, app: ASGIApp, backend: RateLimitBackend = None):
+        self.app = app
+        self.backend = backend
+
+    def get_backend(self) -> RateLimitBackend:
+        if not self.backend:
+            self.backend = RATE_LIMIT_BACKEND_MAP[get_rate_limit_backend()]()
+        return self.backend
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not get_rate_limit_enabled():
+            return await self.app(scope, receive, send)
+
+        path = scope["path"]
+        if path.startswith(EXEMPT_PATH_PREFIXES):
+            return await self.app(scope, receive, send)
+        route_rates = get_route_rates(get_rate_limit_routes())
+        rate = route_rates.get(path) or get_default_rate(get_rate_limit_default())
+
+        client_id = parse_client_id(parse_qs(scope["query_string"].decode()).get("client_id"))
+        if client_id is None and path in route_rates:
+            client_id, receive = await self.read_client_id(scope, receive)
+
+        keys = [f"ip:{scope['client'][0] if scope.get('client') else ''}:{path}"]
+        if client_id is not None:
+            keys.append(f"client:{client_id}:{path}")
+
+        try:
+            states = await self.get_backend().take_all(keys, rate)
+        except Exception:
+            # limiting is best effort, an unavailable backend should not take authentication down
+            logger.exception("Rate limit backend failed")
+            return await self.app(scope, receive, send)
+
+        denied = [state for state in states if not state.allowed]
+        if denied:
+            state = max(denied, key=lambda item: item.retry_after)
+            response = get_response_class()(
+                {"detail": "Too many requests"},
+                status_code=429,
+                headers=get_rate_limit_headers(state)
+            )
+            return await response(scope, receive, send)
+
+        headers = get_rate_limit_headers(min(states, key=lambda item: item.remaining))
+
+        async def send_with_headers(message: Message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).update(headers)
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+    @staticmethod
+    async def read_client_id(scope: Scope, receive: Receive) -> tuple[Optional[str], Receive]:
+        """Reads a small body to find the client id, the consumed messages are replayed to the app"""
+        content_type = dict(scope["headers"]).get(b"content-type", b"")
+        if not content_type.startswith(INSPECTED_CONTENT_TYPES):
+            return None, receive
+
+        messages = []
+        body = b""
+        while True:
+            message = await receive()
+            messages.append(message)
+            body += message.get("body", b"")
+            if not message.get("more_body") or len(body) > MAX_INSPECTED_BODY_SIZE:
+                break
+
+        client_id = None
+        if not messages[-1].get("more_body") and message["type"] == "http.request":
+            client_id = get_client_id_from_body(content_type, body)
+
+        async def replay() -> Message:
+            if messages:
+                return messages.pop(0)
+            return await receive()
+
+        return client_id, replay
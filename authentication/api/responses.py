@@ -0,0 +1,32 @@
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel as BaseSchema
+from starlette.responses import Response
+
+from env import get_fast_json_responses, get_develop_mode
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class OrjsonResponse(JSONResponse):
+    """Renders with orjson, FastAPI deprecated its own ORJSONResponse"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def get_response_class() -> type[JSONResponse]:
+    if orjson and get_fast_json_responses():
+        return OrjsonResponse
+    return JSONResponse
+
+
+def make_response(schema: type[BaseSchema], status_code: int = 200, **content: Any) -> Response:
+    """Renders trusted values without revalidating them, the schema is only checked in develop mode"""
+    if get_develop_mode():
+        schema.model_validate(content)
+    return get_response_class()(content, status_code=status_code)
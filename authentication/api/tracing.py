@@ -0,0 +1,37 @@
+from starlette.types import ASGIApp, Scope, Receive, Send, Message
+
+from monitoring.tracing import start_trace, use_span
+
+
+class TracingMiddleware:
+    """Starts the root span of sampled requests, it is renamed after the matched route once handled"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        traceparent = dict(scope["headers"]).get(b"traceparent")
+        span = start_trace(
+            f"{scope['method']} {scope['path']}",
+            traceparent.decode("latin-1") if traceparent else None,
+            **{"http.method": scope["method"], "http.target": scope["path"]}
+        )
+        if span is None:
+            return await self.app(scope, receive, send)
+
+        async def send_with_status(message: Message):
+            if message["type"] == "http.response.start":
+                span.attributes["http.status_code"] = message["status"]
+            await send(message)
+
+        with use_span(span):
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                route = scope.get("route")
+                if route:
+                    span.name = f"{scope['method']} {route.path}"
+                    span.attributes["http.route"] = route.path
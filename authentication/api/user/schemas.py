@@ -1,11 +1,29 @@
 from datetime import datetime
+from typing import Annotated
 
-from pydantic import BaseModel as BaseSchema
+from pydantic import BaseModel as BaseSchema, StringConstraints, AfterValidator
+
+from config import get_password_validators
+from models.user import USERNAME_REGEX
+from services.password_service.validators import PasswordValidationError
+
+
+def validate_plain_password(value: str) -> str:
+    try:
+        for validator in get_password_validators():
+            validator(value)
+    except PasswordValidationError as e:
+        raise ValueError(str(e))
+    return value
+
+
+Username = Annotated[str, StringConstraints(pattern=USERNAME_REGEX)]
+PlainPassword = Annotated[str, AfterValidator(validate_plain_password)]
 
 
 class RegisterRequest(BaseSchema):
-    username: str
-    password: str
+    username: Username
+    password: PlainPassword
 
 
 class RegisterResponse(BaseSchema):
@@ -21,4 +39,4 @@ class UserResponse(BaseSchema):
 
 
 class SetPasswordRequest(BaseSchema):
-    new_password: str
+    new_password: PlainPassword
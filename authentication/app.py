@@ -1,28 +1,104 @@
+import asyncio
+import logging
+import signal
 import traceback
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request
-from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.responses import JSONResponse
 
 from api.auth.views import router as auth_router
 from api.client.views import router as client_router
+from api.health import router as health_router
+from api.metrics import router as metrics_router, MetricsMiddleware, preallocate_route_metrics
+from api.rate_limit import RateLimitMiddleware
+from api.responses import get_response_class, make_response
 from api.schemas import MessageResponse
+from api.tracing import TracingMiddleware
 from api.user.views import router as user_router
-from config import ADAPTERS, get_test_database_url
-from env import get_develop_mode, get_frontend_url
-from migrations.operations import migrate_head
+from config import get_cache_backend, get_session, get_db_engine, prefill_db_pool, dispose_db_engine, close_redis_client
+from env import get_develop_mode, get_frontend_url, get_code_partition_maintenance_seconds, \
+    get_last_authenticated_flush_seconds, get_db_pool_prefill, reload_settings, get_health_check_seconds, \
+    load_settings
+from exceptions import EnvironmentValueError
+from migrations.version import check_schema_version
+from monitoring.health import refresh_health_state, run_health_checks
+from monitoring.tracing import start_tracing, stop_tracing
+from services.cache import CacheBackends
+from services.invalidation import InvalidationListener
+from services.last_authenticated_buffer import run_last_authenticated_flush, flush_last_authenticated
+from services.partition_service import run_code_partition_maintenance
+from services.password_service.executor import shutdown_hashing_executor
+from services.scope_registry import scope_registry
+from services.token_cache import token_claims_cache
 
-migrate_head(get_test_database_url(ADAPTERS.SYNC))
-app = FastAPI()
+logger = logging.getLogger(__name__)
+
+
+def reload_settings_on_signal():
+    try:
+        reload_settings()
+    except EnvironmentValueError as e:
+        logger.error("Settings were not reloaded: %s", e)
+    else:
+        # claims decoded with a rotated secret must not stay active
+        token_claims_cache.clear()
+        logger.info("Settings reloaded")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # an invalid variable fails the boot instead of the first request reading it
+    load_settings()
+    loop = asyncio.get_running_loop()
+    loop.add_signal_handler(signal.SIGHUP, reload_settings_on_signal)
+    start_tracing()
+
+    engine = get_db_engine()
+    await check_schema_version(engine)
+    await prefill_db_pool(engine, get_db_pool_prefill())
+
+    async with get_session() as session:
+        await scope_registry.load(session)
+    await refresh_health_state(engine)
+
+    background_tasks = [
+        asyncio.create_task(run_health_checks(engine, get_health_check_seconds())),
+        asyncio.create_task(run_code_partition_maintenance(get_code_partition_maintenance_seconds())),
+        asyncio.create_task(run_last_authenticated_flush(get_last_authenticated_flush_seconds()))
+    ]
+    # a shared backend is invalidated by the worker making the change, per process caches need to listen
+    if get_cache_backend() == CacheBackends.MEMORY:
+        background_tasks.append(asyncio.create_task(InvalidationListener().run()))
+
+    yield
+
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    await flush_last_authenticated()
+    await dispose_db_engine()
+    await close_redis_client()
+    shutdown_hashing_executor()
+    stop_tracing()
+    loop.remove_signal_handler(signal.SIGHUP)
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=get_response_class())
 
 origins = [
     get_frontend_url()
 ]
 
-for router in [auth_router, user_router, client_router]:
+for router in [auth_router, user_router, client_router, metrics_router, health_router]:
     app.include_router(router)
+preallocate_route_metrics(app.routes)
 
+# Inside CORS so that rejected requests still carry the CORS headers
+app.add_middleware(RateLimitMiddleware)
+# Outside the rate limiter so that rejected requests are counted too
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(TracingMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -36,8 +112,8 @@ app.add_middleware(
 async def internal_exception_handler(request: Request, exc: Exception):
     if get_develop_mode():
         traceback.print_exc()
-    return JSONResponse(
-        content=jsonable_encoder(MessageResponse(
-            detail="Internal Server Error")),
-        status_code=500
+    return make_response(
+        MessageResponse,
+        status_code=500,
+        detail="Internal Server Error"
     )
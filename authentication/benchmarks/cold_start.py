@@ -0,0 +1,116 @@
+"""Measures how long a fresh worker takes to import the app and serve its first /auth/verify"""
+import json
+import os
+import re
+import subprocess
+import sys
+from dataclasses import dataclass, asdict
+
+from config import get_root_dir
+
+IMPORT_TIME_REGEX = re.compile(r"^import time:\s+(\d+) \|\s+\d+ \|\s*(\S+)$")
+
+COLD_START_BUDGET_SECONDS = float(os.getenv("COLD_START_BUDGET_SECONDS", "3"))
+RSS_BUDGET_MB = float(os.getenv("COLD_START_RSS_BUDGET_MB", "250"))
+DEFERRED_MODULES = ("alembic", "argparse", "psycopg2")
+
+COLD_START_SCRIPT = """
+import asyncio
+import json
+import resource
+import sys
+import time
+
+started = time.perf_counter()
+from app import app, lifespan
+imported = time.perf_counter()
+
+from httpx import AsyncClient
+from services.authentication_serivce import AuthenticationService
+
+
+async def first_verify():
+    async with lifespan(app):
+        ready = time.perf_counter()
+        token = AuthenticationService.generate_token(sub="cold_start")
+        async with AsyncClient(app=app, base_url="https://testserver") as client:
+            response = await client.post("/auth/verify/", headers={"Authorization": f"Bearer {token}"})
+        response.raise_for_status()
+        return ready, time.perf_counter()
+
+
+ready, verified = asyncio.run(first_verify())
+print(json.dumps({
+    "import_seconds": imported - started,
+    "startup_seconds": ready - started,
+    "first_verify_seconds": verified - started,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "deferred_imported": [module for module in %r if module in sys.modules],
+}))
+""" % (DEFERRED_MODULES,)
+
+
+@dataclass
+class ColdStartReport:
+    import_seconds: float
+    startup_seconds: float
+    first_verify_seconds: float
+    rss_mb: float
+    deferred_imported: list[str]
+
+    def over_budget(self) -> list[str]:
+        problems = []
+        if self.first_verify_seconds > COLD_START_BUDGET_SECONDS:
+            problems.append(
+                f"first /auth/verify took {self.first_verify_seconds:.3f}s, budget {COLD_START_BUDGET_SECONDS}s"
+            )
+        if self.rss_mb > RSS_BUDGET_MB:
+            problems.append(f"resident memory is {self.rss_mb:.1f}MB, budget {RSS_BUDGET_MB}MB")
+        if self.deferred_imported:
+            problems.append(f"modules off the request path were imported: {self.deferred_imported}")
+        return problems
+
+
+def run_python(*args: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args],
+        cwd=get_root_dir(),
+        capture_output=True,
+        text=True,
+        check=True
+    )
+
+
+def measure_import_times(module: str = "app") -> dict[str, int]:
+    """Import time in microseconds spent in each top level package pulled in by the module"""
+    output = run_python("-X", "importtime", "-c", f"import {module}").stderr
+    import_times = {}
+
+    for line in output.splitlines():
+        match = IMPORT_TIME_REGEX.match(line)
+        if not match:
+            continue
+        self_time, name = match.groups()
+        package = name.split(".")[0]
+        import_times[package] = import_times.get(package, 0) + int(self_time)
+
+    return import_times
+
+
+def measure_cold_start() -> ColdStartReport:
+    output = run_python("-c", COLD_START_SCRIPT).stdout
+    return ColdStartReport(**json.loads(output.splitlines()[-1]))
+
+
+if __name__ == "__main__":
+    import_times = measure_import_times()
+    for name, microseconds in sorted(import_times.items(), key=lambda item: item[1], reverse=True)[:15]:
+        print(f"{microseconds / 1000:10.1f} ms  {name}")
+
+    report = measure_cold_start()
+    print(json.dumps(asdict(report), indent=2))
+
+    problems = report.over_budget()
+    for problem in problems:
+        print(f"Over budget: {problem}", file=sys.stderr)
+    sys.exit(1 if problems else 0)
@@ -0,0 +1,76 @@
+"""Compares verifying a token behind the session dependency with the session free verifier"""
+import asyncio
+import json
+import sys
+import time
+from dataclasses import dataclass, asdict
+from typing import Annotated
+
+from fastapi import FastAPI, Depends
+from httpx import AsyncClient
+
+from api.dependencies import get_auth_service, get_token_verifier
+from services.authentication_serivce import AuthenticationService, TokenTypes
+from services.token_verifier import TokenVerifier
+
+SESSION_ROUTE = "/session/"
+VERIFIER_ROUTE = "/verifier/"
+
+# both routes do the same work, only the dependency differs
+bench_app = FastAPI()
+
+
+@bench_app.get(SESSION_ROUTE)
+async def verify_with_session(
+        token: str,
+        auth_service: Annotated[AuthenticationService, Depends(get_auth_service)]
+) -> dict:
+    auth_service.decode_token(token=token, required_type=TokenTypes.ACCESS)
+    return {}
+
+
+@bench_app.get(VERIFIER_ROUTE)
+async def verify_with_verifier(
+        token: str,
+        verifier: Annotated[TokenVerifier, Depends(get_token_verifier)]
+) -> dict:
+    verifier.verify(token=token, required_type=TokenTypes.ACCESS)
+    return {}
+
+
+@dataclass
+class DependencyReport:
+    iterations: int
+    session_us: float
+    verifier_us: float
+
+    @property
+    def saved_us(self) -> float:
+        return self.session_us - self.verifier_us
+
+
+async def time_per_request(client: AsyncClient, route: str, token: str, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        response = await client.get(route, params={"token": token})
+        assert response.status_code == 200, response.text
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+async def measure(iterations: int = 2000) -> DependencyReport:
+    token = AuthenticationService.generate_token(sub="benchmark", type_=TokenTypes.ACCESS)
+    async with AsyncClient(app=bench_app, base_url="https://testserver") as client:
+        # warms both paths up, the first session also creates the engine
+        for route in (SESSION_ROUTE, VERIFIER_ROUTE):
+            await time_per_request(client, route, token, 10)
+
+        return DependencyReport(
+            iterations=iterations,
+            session_us=round(await time_per_request(client, SESSION_ROUTE, token, iterations), 2),
+            verifier_us=round(await time_per_request(client, VERIFIER_ROUTE, token, iterations), 2),
+        )
+
+
+if __name__ == "__main__":
+    report = asyncio.run(measure(int(sys.argv[1]) if len(sys.argv) > 1 else 2000))
+    print(json.dumps({**asdict(report), "saved_us": round(report.saved_us, 2)}))
@@ -0,0 +1,303 @@
+"""Drives the OAuth flows with concurrent virtual users and reports latency percentiles per step"""
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import defaultdict
+from dataclasses import dataclass, asdict, field
+from string import ascii_lowercase, digits
+from typing import Optional
+from urllib.parse import urlparse, parse_qs
+
+from httpx import AsyncClient, HTTPError
+
+from api.auth.views import AUTH_URL_NAME, AuthRoutes
+from api.client.views import CLIENT_URL_NAME, ClientRoutes
+from api.user.views import USER_URL_NAME, UserRoutes
+from models.scope import Scope
+
+REDIRECT_URI = "http://localhost:3000/callback/"
+DEFAULT_MIX = "code_flow=1,refresh=2,verify=10,profile=5,register=1"
+SETUP_ATTEMPTS = 3
+
+
+def generate_name(prefix: str, length: int = 12) -> str:
+    return prefix + "".join(random.choices(ascii_lowercase + digits, k=length))
+
+
+def parse_mix(mix: str) -> dict[str, float]:
+    weights = {}
+    for rule in mix.split(","):
+        name, weight = rule.split("=")
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario {name}")
+        weights[name] = float(weight)
+    return weights
+
+
+def percentile(sorted_values: list[float], share: float) -> float:
+    """Nearest rank percentile of already sorted values"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, max(0, round(share * len(sorted_values)) - 1))]
+
+
+class StepError(Exception):
+    def __init__(self, step: str, message: str):
+        super().__init__(message)
+        self.step = step
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    async def step(self, name: str, request, expected_status: int = 200):
+        started = time.perf_counter()
+        try:
+            response = await request
+        except HTTPError as error:
+            self.errors[name][type(error).__name__] += 1
+            raise StepError(name, f"{name} failed with {error!r}") from error
+        elapsed = time.perf_counter() - started
+
+        self.latencies[name].append(elapsed)
+        if response.status_code != expected_status:
+            self.errors[name][str(response.status_code)] += 1
+            raise StepError(name, f"{name} answered {response.status_code}")
+        return response.json()
+
+    def fail(self, name: str, reason: str):
+        """Counts an error of a step made of several requests, e.g. the setup of a virtual user"""
+        self.errors[name][reason] += 1
+
+
+@dataclass
+class StepReport:
+    step: str
+    requests: int
+    errors: dict[str, int]
+    throughput: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+
+
+@dataclass
+class LoadReport:
+    concurrency: int
+    duration_seconds: float
+    requests: int
+    errors: int
+    throughput: float
+    steps: list[StepReport] = field(default_factory=list)
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), indent=2)
+
+
+class VirtualUser:
+    """A registered user with its own client, holding the tokens of its last authentication"""
+
+    def __init__(self, client: AsyncClient, recorder: Recorder):
+        self.client = client
+        self.recorder = recorder
+        self.username = generate_name("load_", 10)
+        self.password = generate_name("", 12)
+        self.client_id: Optional[int] = None
+        self.client_secret: Optional[str] = None
+        self.access_token: Optional[str] = None
+        self.refresh_token: Optional[str] = None
+
+    async def setup(self):
+        await self.register()
+        data = await self.recorder.step("client", self.client.post(
+            CLIENT_URL_NAME + ClientRoutes.CREATE,
+            json={
+                "username": self.username,
+                "client_name": generate_name("load_client_"),
+                "scopes": [Scope.Types.UNRESTRICTED]
+            }
+        ))
+        self.client_id, self.client_secret = data["id"], data["secret"]
+        await self.code_flow()
+
+    async def register(self):
+        await self.recorder.step("register", self.client.post(
+            USER_URL_NAME + UserRoutes.REGISTER,
+            json={"username": self.username, "password": self.password}
+        ))
+
+    async def register_another(self):
+        await self.recorder.step("register", self.client.post(
+            USER_URL_NAME + UserRoutes.REGISTER,
+            json={"username": generate_name("load_", 10), "password": self.password}
+        ))
+
+    async def code_flow(self):
+        data = await self.recorder.step("login_code", self.client.post(
+            AUTH_URL_NAME + AuthRoutes.CALLBACK_CODE,
+            params={"client_id": self.client_id, "redirect_uri": REDIRECT_URI},
+            json={"username": self.username, "password": self.password}
+        ))
+        code = parse_qs(urlparse(data["redirect_uri"]).query)["code"][0]
+
+        data = await self.recorder.step("token_code", self.client.post(
+            AUTH_URL_NAME + AuthRoutes.TOKEN_CODE,
+            json={
+                "code": code,
+                "client_id": self.client_id,
+                "client_secret": self.client_secret,
+                "redirect_uri": REDIRECT_URI
+            }
+        ))
+        self.access_token, self.refresh_token = data["access_token"], data["refresh_token"]
+
+    async def refresh(self):
+        data = await self.recorder.step("refresh", self.client.post(
+            AUTH_URL_NAME + AuthRoutes.REFRESH,
+            json={
+                "refresh_token": self.refresh_token,
+                "client_id": self.client_id,
+                "client_secret": self.client_secret
+            }
+        ))
+        self.access_token, self.refresh_token = data["access_token"], data["refresh_token"]
+
+    async def verify(self):
+        await self.recorder.step("verify", self.client.post(
+            AUTH_URL_NAME + AuthRoutes.VERIFY,
+            headers={"Authorization": f"Bearer {self.access_token}"}
+        ))
+
+    async def profile(self):
+        await self.recorder.step("profile", self.client.get(
+            USER_URL_NAME + UserRoutes.PROFILE,
+            headers={"Authorization": f"Bearer {self.access_token}"}
+        ))
+
+
+SCENARIOS = {
+    "register": VirtualUser.register_another,
+    "code_flow": VirtualUser.code_flow,
+    "refresh": VirtualUser.refresh,
+    "verify": VirtualUser.verify,
+    "profile": VirtualUser.profile,
+}
+
+
+async def run_user(
+        user: VirtualUser,
+        mix: dict[str, float],
+        start_delay: float,
+        deadline: float,
+        max_iterations: Optional[int]
+):
+    await asyncio.sleep(start_delay)
+    for _ in range(SETUP_ATTEMPTS):
+        try:
+            await user.setup()
+            break
+        except StepError as error:
+            user.recorder.fail("setup", error.step)
+            # the user may be registered already, the next attempt starts over under another name
+            user.username = generate_name("load_", 10)
+    else:
+        # the virtual user is retired, the others keep running
+        return
+
+    scenarios, weights = list(mix), list(mix.values())
+    iterations = 0
+    while time.monotonic() < deadline and (max_iterations is None or iterations < max_iterations):
+        scenario = random.choices(scenarios, weights)[0]
+        try:
+            await SCENARIOS[scenario](user)
+        except StepError:
+            # a failed refresh leaves stale tokens behind, start over with a fresh pair
+            try:
+                await user.code_flow()
+            except StepError:
+                pass
+        iterations += 1
+
+
+def build_report(recorder: Recorder, concurrency: int, duration: float) -> LoadReport:
+    steps = []
+    for name in sorted(recorder.latencies.keys() | recorder.errors.keys()):
+        latencies = sorted(recorder.latencies[name])
+        steps.append(StepReport(
+            step=name,
+            requests=len(latencies),
+            errors=dict(recorder.errors[name]),
+            throughput=round(len(latencies) / duration, 2),
+            p50_ms=round(percentile(latencies, 0.50) * 1000, 3),
+            p95_ms=round(percentile(latencies, 0.95) * 1000, 3),
+            p99_ms=round(percentile(latencies, 0.99) * 1000, 3),
+            max_ms=round(latencies[-1] * 1000, 3) if latencies else 0.0,
+        ))
+
+    requests = sum(step.requests for step in steps)
+    return LoadReport(
+        concurrency=concurrency,
+        duration_seconds=round(duration, 3),
+        requests=requests,
+        # the setup step sends no requests of its own, its failures are counted by the failed steps
+        errors=sum(sum(step.errors.values()) for step in steps if step.requests),
+        throughput=round(requests / duration, 2),
+        steps=steps
+    )
+
+
+async def run_load(
+        client: AsyncClient,
+        concurrency: int = 10,
+        duration: float = 30,
+        ramp_up: float = 5,
+        mix: str = DEFAULT_MIX,
+        max_iterations: int = None
+) -> LoadReport:
+    """Virtual users start evenly over the ramp up and loop over scenarios picked by their weight"""
+    recorder = Recorder()
+    weights = parse_mix(mix)
+
+    started = time.monotonic()
+    deadline = started + ramp_up + duration
+    await asyncio.gather(*[
+        run_user(VirtualUser(client, recorder), weights, ramp_up * index / concurrency, deadline, max_iterations)
+        for index in range(concurrency)
+    ])
+
+    return build_report(recorder, concurrency, time.monotonic() - started)
+
+
+async def main(arguments: list[str]) -> LoadReport:
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        epilog="Run the service with RATE_LIMIT_ENABLED=False, the limiter would answer most requests with 429"
+    )
+    parser.add_argument("--url", default="http://localhost:8000", help="running service, e.g. the compose stack")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=30, help="seconds after the ramp up")
+    parser.add_argument("--ramp-up", type=float, default=5)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="comma separated <scenario>=<weight>")
+    parser.add_argument("--output", help="file for the JSON report, printed when omitted")
+    args = parser.parse_args(arguments)
+
+    async with AsyncClient(base_url=args.url, timeout=30) as client:
+        report = await run_load(client, args.concurrency, args.duration, args.ramp_up, args.mix)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(report.to_json())
+    else:
+        print(report.to_json())
+    return report
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1:]))
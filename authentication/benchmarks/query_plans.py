@@ -0,0 +1,169 @@
+"""Runs EXPLAIN ANALYZE on the statements of the hot service calls and reports full scans of large tables"""
+import asyncio
+import json
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Iterator
+
+from sqlalchemy import event, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from benchmarks.scale_data import generate_scale_data, USERNAME_PREFIX, REDIRECT_URI
+from config import get_db_engine
+from models.client import Client
+from models.user import User
+from services.client_cache import client_principal_cache
+from services.client_service import ClientService
+from services.code_service import CodeService
+from services.code_storages import TableCodeStorage
+from services.user_service import UserService
+
+# tables that grow with the traffic, a sequential scan of any of them (or their partitions) is a regression
+LARGE_TABLES = ("users", "clients", "codes", "client_scope")
+# the planner rightly scans empty partitions and tiny tables, only scans reading this many rows count
+MIN_SCANNED_ROWS = 1000
+# an index scan reading this many blocks walks the index, it does not seek in it
+MIN_INDEX_SCAN_BLOCKS = 50
+INDEX_SCANS = ("Index Scan", "Index Only Scan")
+EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+
+@dataclass
+class PlanViolation:
+    call: str
+    statement: str
+    node_type: str
+    relation: str
+
+
+@dataclass
+class Subjects:
+    user: User
+    client: Client
+
+
+def iterate_nodes(plan: dict) -> Iterator[dict]:
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from iterate_nodes(child)
+
+
+def is_large_table(relation: str) -> bool:
+    return any(relation == table or relation.startswith(f"{table}_") for table in LARGE_TABLES)
+
+
+def is_violation(node: dict) -> bool:
+    if not is_large_table(node.get("Relation Name", "")):
+        return False
+    if node["Node Type"] == "Seq Scan":
+        scanned = node.get("Actual Rows", 0) * node.get("Actual Loops", 1) + node.get("Rows Removed by Filter", 0)
+        return scanned >= MIN_SCANNED_ROWS
+    if node["Node Type"] in INDEX_SCANS:
+        # e.g. a condition on the second column of a composite primary key
+        return node.get("Shared Hit Blocks", 0) + node.get("Shared Read Blocks", 0) >= MIN_INDEX_SCAN_BLOCKS
+    return False
+
+
+async def create_code(session: AsyncSession, subjects: Subjects):
+    return await CodeService(session, TableCodeStorage(session)).create(
+        client=subjects.client,
+        redirect_uri=REDIRECT_URI,
+        valid_until=datetime.now() + timedelta(minutes=5)
+    )
+
+
+async def get_valid_code(session: AsyncSession, subjects: Subjects):
+    code = await create_code(session, subjects)
+    service = CodeService(session, TableCodeStorage(session))
+    await service.get_valid_code(code.value, subjects.client.id, REDIRECT_URI)
+    await service.take_valid_code(code.value, subjects.client.id, REDIRECT_URI)
+
+
+async def get_client_principal(session: AsyncSession, subjects: Subjects):
+    await client_principal_cache.invalidate(subjects.client.id)
+    await ClientService(session).get_client_principal(subjects.client.id)
+
+
+HOT_CALLS: dict[str, Callable[[AsyncSession, Subjects], Awaitable]] = {
+    "UserService.get_user_by_username": lambda session, subjects: UserService(session).get_user_by_username(
+        subjects.user.username
+    ),
+    "UserService._preload_relationships": lambda session, subjects: UserService(session)._preload_relationships(
+        subjects.user
+    ),
+    "ClientService.get_client_by_secret": lambda session, subjects: ClientService(session).get_client_by_secret(
+        subjects.client.secret
+    ),
+    "ClientService.get_client_principal": get_client_principal,
+    "CodeService.create": create_code,
+    "CodeService.get_valid_code": get_valid_code,
+}
+
+
+async def capture_statements(connection: AsyncConnection, call: Callable[[], Awaitable]) -> list[tuple[str, tuple]]:
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        # savepoints and other statements of the session itself have no plan
+        if statement.lstrip().upper().startswith(EXPLAINABLE):
+            statements.append((statement, parameters))
+
+    event.listen(connection.sync_connection, "before_cursor_execute", capture)
+    try:
+        await call()
+    finally:
+        event.remove(connection.sync_connection, "before_cursor_execute", capture)
+    return statements
+
+
+async def explain(connection: AsyncConnection, statement: str, parameters) -> dict:
+    result = await connection.exec_driver_sql(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}", parameters)
+    plan = result.scalar()
+    return (json.loads(plan) if isinstance(plan, str) else plan)[0]["Plan"]
+
+
+async def check_query_plans(connection: AsyncConnection) -> list[PlanViolation]:
+    """Expects loaded scale data, everything runs in savepoints of the connection transaction"""
+    session = AsyncSession(bind=connection, join_transaction_mode="create_savepoint", expire_on_commit=False)
+    user = await session.scalar(select(User).where(User.username.startswith(USERNAME_PREFIX)).limit(1))
+    client = await session.scalar(select(Client).where(Client.user_id == user.id).limit(1))
+    subjects = Subjects(user=user, client=client)
+
+    violations = []
+    for name, call in HOT_CALLS.items():
+        for statement, parameters in await capture_statements(connection, lambda: call(session, subjects)):
+            plan = await explain(connection, statement, parameters)
+            for node in iterate_nodes(plan):
+                if is_violation(node):
+                    violations.append(PlanViolation(name, statement, node["Node Type"], node["Relation Name"]))
+    await session.close()
+    return violations
+
+
+async def main(arguments: list[str]) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=0, help="scale data loaded for the check and rolled back after")
+    parser.add_argument("--codes", type=int, default=0)
+    args = parser.parse_args(arguments)
+
+    engine = get_db_engine()
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        if args.users:
+            await generate_scale_data(connection, args.users, codes=args.codes)
+        else:
+            await connection.execute(text("ANALYZE"))
+        violations = await check_query_plans(connection)
+        await transaction.rollback()
+    await engine.dispose()
+
+    for violation in violations:
+        print(f"{violation.call}: {violation.node_type} on {violation.relation}\n    {violation.statement}")
+    return 1 if violations else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(sys.argv[1:])))
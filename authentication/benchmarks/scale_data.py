@@ -0,0 +1,123 @@
+"""Bulk loads production sized users, clients and codes with COPY"""
+import asyncio
+import os
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from config import get_db_engine, get_password_algorithm, get_password_iterations
+from services.password_service.service import PasswordService
+from services.utils import generate_authorization_code
+
+# every generated user shares this password, the load generator can log in as any of them
+SCALE_PASSWORD = "scale_password"
+USERNAME_PREFIX = "scale_"
+CLIENT_NAME_PREFIX = "scale_client_"
+REDIRECT_URI = "http://localhost:3000/callback/"
+
+
+@dataclass
+class ScaleReport:
+    users: int
+    clients: int
+    codes: int
+    seconds: float
+
+
+async def reserve_ids(connection: AsyncConnection, table: str, amount: int) -> int:
+    """Moves the id sequence past the rows about to be copied, returns the first reserved id"""
+    sequence = await connection.scalar(text(f"SELECT pg_get_serial_sequence('{table}', 'id')"))
+    last = await connection.scalar(text(f"SELECT coalesce(max(id), 0) FROM {table}"))
+    last = max(last, await connection.scalar(text(f"SELECT last_value FROM {sequence}")))
+    await connection.execute(text("SELECT setval(:sequence, :value)"), {"sequence": sequence, "value": last + amount})
+    return last + 1
+
+
+async def copy_records(connection: AsyncConnection, table: str, columns: list[str], records):
+    raw_connection = await connection.get_raw_connection()
+    await raw_connection.driver_connection.copy_records_to_table(table, columns=columns, records=records)
+
+
+def generate_codes(amount: int, first_client: int, clients: int, now: datetime):
+    """Spread over the last day, most codes in a production table are used or expired"""
+    for index in range(amount):
+        created_at = now - timedelta(seconds=index * 86400 / amount)
+        yield (
+            generate_authorization_code(),
+            first_client + index % clients,
+            REDIRECT_URI,
+            index % 10 != 0,
+            created_at + timedelta(minutes=5),
+            created_at
+        )
+
+
+async def generate_scale_data(
+        connection: AsyncConnection,
+        users: int,
+        clients_per_user: int = 2,
+        codes: int = 0
+) -> ScaleReport:
+    """Loads the rows in the transaction of the connection, it is up to the caller to commit"""
+    started = time.perf_counter()
+    # hashing once keeps the load fast while the stored format stays realistic
+    password = PasswordService().hash_password(
+        plain_password=SCALE_PASSWORD,
+        algorithm=get_password_algorithm(),
+        iterations=get_password_iterations()
+    )
+    now = datetime.now()
+    run = os.urandom(2).hex()
+
+    first_user = await reserve_ids(connection, "users", users)
+    await copy_records(connection, "users", ["id", "username", "password", "created_at"], (
+        (first_user + index, f"{USERNAME_PREFIX}{run}_{index}", password, now)
+        for index in range(users)
+    ))
+
+    clients = users * clients_per_user
+    first_client = await reserve_ids(connection, "clients", clients)
+    await copy_records(connection, "clients", ["id", "name", "user_id", "secret", "created_at"], (
+        (first_client + index, f"{CLIENT_NAME_PREFIX}{run}_{index}", first_user + index % users, str(uuid4()), now)
+        for index in range(clients)
+    ))
+
+    if codes:
+        await copy_records(
+            connection,
+            "codes",
+            ["value", "client_id", "redirect_uri", "is_used", "valid_until", "created_at"],
+            generate_codes(codes, first_client, clients, now)
+        )
+
+    for table in ("users", "clients", "codes"):
+        await connection.execute(text(f"ANALYZE {table}"))
+
+    return ScaleReport(users=users, clients=clients, codes=codes, seconds=round(time.perf_counter() - started, 3))
+
+
+async def main(arguments: list[str]) -> ScaleReport:
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--clients-per-user", type=int, default=2)
+    parser.add_argument("--codes", type=int, default=10_000_000)
+    args = parser.parse_args(arguments)
+
+    engine = get_db_engine()
+    async with engine.begin() as connection:
+        report = await generate_scale_data(connection, args.users, args.clients_per_user, args.codes)
+    await engine.dispose()
+
+    print(report)
+    return report
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1:]))
@@ -0,0 +1,228 @@
+"""Times the hot service calls against the configured Postgres and compares them with stored baselines"""
+import asyncio
+import inspect
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from dataclasses import dataclass, asdict
+from datetime import datetime, timedelta
+from string import ascii_lowercase, digits
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import get_session, get_root_dir
+from models.client import Client
+from models.user import User
+from services.authentication_serivce import AuthenticationService, TokenTypes
+from services.client_service import ClientService
+from services.code_service import CodeService
+from services.user_service import UserService
+
+BASELINE_FILE = os.getenv("BENCHMARK_BASELINE_FILE", os.path.join(get_root_dir(), "benchmarks", "baseline.json"))
+# a benchmark regresses once its median is this share slower than the baseline
+REGRESSION_THRESHOLD = float(os.getenv("BENCHMARK_REGRESSION_THRESHOLD", "0.25"))
+REDIRECT_URI = "http://localhost:3000/callback/"
+
+
+def generate_name(prefix: str) -> str:
+    return prefix + "".join(random.choices(ascii_lowercase + digits, k=12))
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    iterations: int
+    median_us: float
+    mean_us: float
+    min_us: float
+    stdev_us: float
+
+
+@dataclass
+class Regression:
+    name: str
+    baseline_us: float
+    median_us: float
+
+    @property
+    def slowdown(self) -> float:
+        return self.median_us / self.baseline_us - 1
+
+
+class Fixtures:
+    """A user with a client and a token pair, created once and shared by every benchmark"""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.password = generate_name("")
+        self.user: Optional[User] = None
+        self.client: Optional[Client] = None
+        self.refresh_token: Optional[str] = None
+        self.access_token: Optional[str] = None
+
+    async def setup(self):
+        self.user = await UserService(self.session).create(
+            username=generate_name("bench_"),
+            plain_password=self.password
+        )
+        self.client = await ClientService(self.session).create(name=generate_name("bench_client_"), user=self.user)
+        self.access_token, self.refresh_token = await AuthenticationService(self.session).create_password_pair(
+            username=self.user.username,
+            password=self.password,
+            client_id=self.client.id,
+            client_secret=self.client.secret
+        )
+
+    async def teardown(self):
+        await ClientService(self.session).delete(self.client.id)
+        await UserService(self.session).delete(self.user.id)
+
+    async def create_code(self):
+        return await CodeService(self.session).create(
+            client=self.client,
+            redirect_uri=REDIRECT_URI,
+            valid_until=datetime.now() + timedelta(minutes=5)
+        )
+
+
+async def noop(fixtures: Fixtures):
+    return None
+
+
+# name: (prepare, run), prepare is awaited before every call and is not timed, run may be synchronous
+BENCHMARKS: dict[str, tuple[Callable[[Fixtures], Awaitable], Callable[[Fixtures, object], object]]] = {
+    "UserService.get_user_by_username": (
+        noop,
+        lambda fixtures, _: UserService(fixtures.session).get_user_by_username(fixtures.user.username)
+    ),
+    "ClientService.get_client_by_secret": (
+        noop,
+        lambda fixtures, _: ClientService(fixtures.session).get_client_by_secret(fixtures.client.secret)
+    ),
+    "CodeService.create": (
+        noop,
+        lambda fixtures, _: fixtures.create_code()
+    ),
+    "CodeService.get_valid_code": (
+        Fixtures.create_code,
+        lambda fixtures, code: CodeService(fixtures.session).get_valid_code(
+            code.value, fixtures.client.id, REDIRECT_URI
+        )
+    ),
+    "AuthenticationService.create_code_pair": (
+        Fixtures.create_code,
+        lambda fixtures, code: AuthenticationService(fixtures.session).create_code_pair(
+            fixtures.client.id, fixtures.client.secret, REDIRECT_URI, code.value
+        )
+    ),
+    "AuthenticationService.refresh_pair": (
+        noop,
+        lambda fixtures, _: AuthenticationService(fixtures.session).refresh_pair(
+            fixtures.refresh_token, fixtures.client.id, fixtures.client.secret
+        )
+    ),
+    "AuthenticationService.generate_token": (
+        noop,
+        lambda fixtures, _: AuthenticationService.generate_token(sub=fixtures.user.username)
+    ),
+    "AuthenticationService.decode_token": (
+        noop,
+        lambda fixtures, _: AuthenticationService.decode_token(fixtures.access_token, TokenTypes.ACCESS)
+    ),
+}
+
+
+async def run_benchmark(name: str, fixtures: Fixtures, iterations: int, warmup: int) -> BenchmarkResult:
+    prepare, run = BENCHMARKS[name]
+    timings = []
+    for index in range(warmup + iterations):
+        prepared = await prepare(fixtures)
+        started = time.perf_counter()
+        result = run(fixtures, prepared)
+        if inspect.isawaitable(result):
+            await result
+        elapsed = time.perf_counter() - started
+        if index >= warmup:
+            timings.append(elapsed * 1e6)
+
+    return BenchmarkResult(
+        name=name,
+        iterations=iterations,
+        median_us=round(statistics.median(timings), 2),
+        mean_us=round(statistics.mean(timings), 2),
+        min_us=round(min(timings), 2),
+        stdev_us=round(statistics.stdev(timings), 2) if len(timings) > 1 else 0.0,
+    )
+
+
+async def run_benchmarks(iterations: int = 200, warmup: int = 20, names: list[str] = None) -> list[BenchmarkResult]:
+    results = []
+    async with get_session() as session:
+        fixtures = Fixtures(session)
+        await fixtures.setup()
+        try:
+            for name in names or BENCHMARKS:
+                results.append(await run_benchmark(name, fixtures, iterations, warmup))
+        finally:
+            await fixtures.teardown()
+    return results
+
+
+def load_baseline(path: str = BASELINE_FILE) -> dict[str, float]:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as file:
+        return json.load(file)
+
+
+def save_baseline(results: list[BenchmarkResult], path: str = BASELINE_FILE):
+    with open(path, "w") as file:
+        json.dump({result.name: result.median_us for result in results}, file, indent=2)
+
+
+def find_regressions(
+        results: list[BenchmarkResult],
+        baseline: dict[str, float],
+        threshold: float = REGRESSION_THRESHOLD
+) -> list[Regression]:
+    regressions = []
+    for result in results:
+        baseline_us = baseline.get(result.name)
+        if baseline_us and result.median_us > baseline_us * (1 + threshold):
+            regressions.append(Regression(result.name, baseline_us, result.median_us))
+    return regressions
+
+
+async def main(arguments: list[str]) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--save", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args(arguments)
+
+    results = await run_benchmarks(args.iterations, args.warmup)
+    baseline = load_baseline(args.baseline)
+    for result in results:
+        print(json.dumps({**asdict(result), "baseline_us": baseline.get(result.name)}))
+
+    if args.save:
+        save_baseline(results, args.baseline)
+        return 0
+
+    regressions = find_regressions(results, baseline, args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression.name}: {regression.baseline_us}us -> {regression.median_us}us "
+              f"(+{regression.slowdown:.0%})", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(sys.argv[1:])))
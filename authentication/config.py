@@ -1,12 +1,20 @@
+import asyncio
 import os
 from enum import Enum
 
-from sqlalchemy import AsyncAdaptedQueuePool
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, AsyncEngine
 
+from env import get_code_storage as get_code_storage_env
+from env import get_rate_limit_backend as get_rate_limit_backend_env
+from env import get_tracing_exporter as get_tracing_exporter_env
+from env import get_cache_backend as get_cache_backend_env
+from env import get_redis_url
 from env import get_password_iterations as get_password_iterations_env
+from env import get_db_pool_size, get_db_max_overflow
+from env import get_password_min_length_enforced, get_password_max_length_enforced
 from env import get_postgres_host, get_postgres_db, \
     get_postgres_user, get_postgres_password, get_postgres_port
+from monitoring.pool import InstrumentedAsyncAdaptedQueuePool
 from services.password_service.validators import validate_min_length, validate_max_length
 
 
@@ -36,10 +44,10 @@ def get_alembic_config_location():
 def get_password_validators():
     validators = []
 
-    if os.environ.get("PASSWORD_MIN_LENGTH"):
+    if get_password_min_length_enforced():
         validators.append(validate_min_length)
 
-    if os.environ.get("PASSWORD_MAX_LENGTH"):
+    if get_password_max_length_enforced():
         validators.append(validate_max_length)
 
     return validators
@@ -54,15 +62,80 @@ def get_password_iterations():
     return get_password_iterations_env()
 
 
+def get_code_storage():
+    from services.code_storages import CodeStorages
+    return CodeStorages(get_code_storage_env())
+
+
+def get_rate_limit_backend():
+    from services.rate_limiter import RateLimitBackends
+    return RateLimitBackends(get_rate_limit_backend_env())
+
+
+def get_cache_backend():
+    from services.cache import CacheBackends
+    return CacheBackends(get_cache_backend_env())
+
+
+def get_tracing_exporter():
+    from monitoring.tracing import TracingExporters
+    return TracingExporters(get_tracing_exporter_env())
+
+
 db_engine = None
+redis_client = None
 
 
-def get_session() -> AsyncSession:
+def create_db_engine() -> AsyncEngine:
+    return create_async_engine(
+        get_test_database_url(ADAPTERS.ASYNC),
+        poolclass=InstrumentedAsyncAdaptedQueuePool,
+        pool_size=get_db_pool_size(),
+        max_overflow=get_db_max_overflow(),
+    )
+
+
+def get_db_engine() -> AsyncEngine:
+    """Returns the engine created on startup, creates one for contexts without a lifespan (tests, scripts)"""
     global db_engine
     if not db_engine:
-        db_engine = create_async_engine(
-            get_test_database_url(ADAPTERS.ASYNC),
-            poolclass=AsyncAdaptedQueuePool,
-        )
+        db_engine = create_db_engine()
+
+    return db_engine
+
+
+async def prefill_db_pool(engine: AsyncEngine, connections: int):
+    connections = min(connections, get_db_pool_size())
+    if connections <= 0:
+        return
+
+    opened = await asyncio.gather(*[engine.connect() for _ in range(connections)])
+    await asyncio.gather(*[connection.close() for connection in opened])
+
+
+async def dispose_db_engine():
+    global db_engine
+    if db_engine:
+        await db_engine.dispose()
+        db_engine = None
+
+
+def get_session() -> AsyncSession:
+    return AsyncSession(get_db_engine(), expire_on_commit=False)
+
+
+def get_redis_client():
+    """Shared client for the redis backed services, redis is imported only when one is configured"""
+    global redis_client
+    if not redis_client:
+        from redis.asyncio import Redis
+        redis_client = Redis.from_url(get_redis_url())
+
+    return redis_client
+
 
-    return AsyncSession(db_engine, expire_on_commit=False)
+async def close_redis_client():
+    global redis_client
+    if redis_client:
+        await redis_client.aclose()
+        redis_client = None
@@ -1,17 +1,23 @@
 import os
 import re
+from dataclasses import dataclass
+from functools import cached_property
 from datetime import timedelta
-
-from cachetools import cached, TTLCache
+from typing import Optional
 
 from exceptions import EnvironmentValueError
 
 DOMAIN_REGEX = r"^(((?!-))(xn--|_)?[a-z0-9-]{0,61}[a-z0-9]{1,1}\.)*(xn--)?" \
                r"([a-z0-9][a-z0-9\-]{0,60}|[a-z0-9-]{1,30}\.[a-z]{2,})$"
-PORT_REGEX = r"^([1-9][0-9]{0,3}|[1-5][0-9]{4}|6[0-4][0-9]{3}|65[0-4][0-9]" \
-             r"{2}|655[0-2][0-9]|6553[0-5])$"
+PORT_REGEX = re.compile(
+    r"^([1-9][0-9]{0,3}|[1-5][0-9]{4}|6[0-4][0-9]{3}|65[0-4][0-9]"
+    r"{2}|655[0-2][0-9]|6553[0-5])$"
+)
+SECRET_REGEX = re.compile(r"^[\x20-\x7E]{12,36}$")
+RATE_REGEX = re.compile(r"^[1-9][0-9]*/(second|minute|hour)$")
 
-ENV_CACHE_TTL_SECONDS = 10 * 60
+DEFAULT_RATE_LIMIT_ROUTES = "/auth/token-code/=300/minute,/auth/refresh/=300/minute," \
+                            "/auth/token-password/=120/minute,/auth/login-code/=120/minute"
 
 
 def set_env_key(key: str, value: str):
@@ -21,174 +27,586 @@ def set_env_key(key: str, value: str):
         os.environ[key] = value
 
 
-# App
-@cached(cache=TTLCache(maxsize=1, ttl=ENV_CACHE_TTL_SECONDS))
-def get_app_secret() -> str:
-    """SECRET_KEY should be from 12 to 36 long and can contain any printable symbol"""
-    regex = r"^[\x20-\x7E]{12,36}$"
-    key = "APP_SECRET_KEY"
-    value = os.getenv(key, "")
+def read_str(key: str, default: str = None, regex: re.Pattern = None, choices: tuple[str, ...] = None) -> str:
+    value = os.getenv(key) or default
 
-    if not re.compile(regex).match(value):
+    if not value:
+        raise EnvironmentValueError(key)
+    if regex and not regex.match(value):
+        raise EnvironmentValueError(key)
+    if choices and value not in choices:
         raise EnvironmentValueError(key)
 
     return value
 
 
-@cached(cache=TTLCache(maxsize=1, ttl=ENV_CACHE_TTL_SECONDS))
-def get_develop_mode() -> bool:
-    key = "APP_DEVELOP_MODE"
-    value = os.getenv(key, "False")
+def read_rate_routes(key: str, default: str) -> str:
+    """Comma separated <path>=<rate> rules, each rate is checked on its own"""
+    value = read_str(key, default)
 
-    return value == "True"
+    for rule in value.split(","):
+        path, separator, rate = rule.partition("=")
+        if not separator or not path.startswith("/") or any(character.isspace() for character in path):
+            raise EnvironmentValueError(key)
+        if not RATE_REGEX.match(rate):
+            raise EnvironmentValueError(key)
 
+    return value
 
-# Passwords
-@cached(cache=TTLCache(maxsize=1, ttl=ENV_CACHE_TTL_SECONDS))
-def get_password_min_length() -> int:
-    key = "PASSWORD_MIN_LENGTH"
-    value = os.getenv(key)
-    if not value:
-        value = os.getenv(key, "8")
+
+def read_number(key: str, default: str, type_: type = int, minimum: float = None, maximum: float = None):
+    # an empty variable falls back to the default like an unset one
+    value = os.getenv(key) or default
 
     try:
-        return int(value)
+        value = type_(value)
     except ValueError:
         raise EnvironmentValueError(key)
 
+    if minimum is not None and value < minimum:
+        raise EnvironmentValueError(key)
+    if maximum is not None and value > maximum:
+        raise EnvironmentValueError(key)
+
+    return value
+
+
+@dataclass(frozen=True)
+class AppSettings:
+    secret: str
+    develop_mode: bool
+    fast_json_responses: bool
+    frontend_url: str
+
+    @classmethod
+    def load(cls) -> "AppSettings":
+        return cls(
+            # SECRET_KEY should be from 12 to 36 long and can contain any printable symbol
+            secret=read_str("APP_SECRET_KEY", regex=SECRET_REGEX),
+            develop_mode=os.getenv("APP_DEVELOP_MODE", "False") == "True",
+            # Renders responses with orjson when it is installed
+            fast_json_responses=os.getenv("FAST_JSON_RESPONSES", "True") == "True",
+            frontend_url=read_str("FRONTEND_URL"),
+        )
+
+
+@dataclass(frozen=True)
+class PasswordSettings:
+    min_length: int
+    max_length: int
+    min_length_enforced: bool
+    max_length_enforced: bool
+    iterations: int
+    hashing_threads: int
+
+    @classmethod
+    def load(cls) -> "PasswordSettings":
+        return cls(
+            min_length=read_number("PASSWORD_MIN_LENGTH", "8"),
+            max_length=read_number("PASSWORD_MAX_LENGTH", "16"),
+            # The lengths are only enforced when they are configured
+            min_length_enforced=bool(os.getenv("PASSWORD_MIN_LENGTH")),
+            max_length_enforced=bool(os.getenv("PASSWORD_MAX_LENGTH")),
+            iterations=read_number("PASSWORD_ITERATIONS", "300000", maximum=1e6),
+            # Threads hashing passwords off the event loop, defaults to the CPU count
+            hashing_threads=read_number("PASSWORD_HASHING_THREADS", str(os.cpu_count() or 1), minimum=1),
+        )
+
+
+@dataclass(frozen=True)
+class PostgresSettings:
+    host: str
+    port: str
+    db: str
+    user: str
+    password: str
+    pool_size: int
+    max_overflow: int
+    pool_prefill: int
+
+    @classmethod
+    def load(cls) -> "PostgresSettings":
+        return cls(
+            host=read_str("POSTGRES_HOST", "127.0.0.1"),
+            port=read_str("POSTGRES_PORT", "5432", regex=PORT_REGEX),
+            db=read_str("POSTGRES_DB"),
+            user=read_str("POSTGRES_USER"),
+            password=read_str("POSTGRES_PASSWORD"),
+            pool_size=read_number("DB_POOL_SIZE", "5"),
+            max_overflow=read_number("DB_MAX_OVERFLOW", "10"),
+            # Amount of pooled connections opened on startup, capped by the pool size
+            pool_prefill=read_number("DB_POOL_PREFILL", "5"),
+        )
+
+
+@dataclass(frozen=True)
+class CodeSettings:
+    valid_minutes: int
+    storage: str
+    storage_max_size: int
+    partition_interval: str
+    partitions_ahead: int
+    partitions_retained: int
+    partition_maintenance_seconds: int
+
+    @classmethod
+    def load(cls) -> "CodeSettings":
+        return cls(
+            valid_minutes=read_number("AUTHENTICATION_CODE_VALID_MINUTES", "5"),
+            storage=read_str("CODE_STORAGE", "table", choices=("table", "unlogged_table", "memory")),
+            storage_max_size=read_number("CODE_STORAGE_MAX_SIZE", "100000"),
+            partition_interval=read_str("CODE_PARTITION_INTERVAL", "day", choices=("hour", "day")),
+            # Amount of future partitions that should exist besides the current one
+            partitions_ahead=read_number("CODE_PARTITIONS_AHEAD", "3"),
+            # Amount of past partitions that are kept before being dropped
+            partitions_retained=read_number("CODE_PARTITIONS_RETAINED", "2"),
+            partition_maintenance_seconds=read_number("CODE_PARTITION_MAINTENANCE_SECONDS", "3600"),
+        )
+
+
+@dataclass(frozen=True)
+class ClientSettings:
+    last_authenticated_flush_seconds: float
+    cache_backend: str
+    cache_max_size: int
+    cache_ttl_seconds: int
+
+    @classmethod
+    def load(cls) -> "ClientSettings":
+        return cls(
+            # Maximum staleness of clients.last_authenticated
+            last_authenticated_flush_seconds=read_number("LAST_AUTHENTICATED_FLUSH_SECONDS", "5", float),
+            # Shared caches live in each process or in the redis of REDIS_URL
+            cache_backend=read_str("CACHE_BACKEND", "memory", choices=("memory", "redis")),
+            cache_max_size=read_number("CLIENT_CACHE_MAX_SIZE", "10000"),
+            cache_ttl_seconds=read_number("CLIENT_CACHE_TTL_SECONDS", "300"),
+        )
+
+
+@dataclass(frozen=True)
+class ServerSettings:
+    host: str
+    port: int
+    workers: int
+    max_requests: int
+    max_requests_jitter: int
+    graceful_timeout: int
+
+    @classmethod
+    def load(cls) -> "ServerSettings":
+        return cls(
+            host=read_str("SERVE_HOST", "0.0.0.0"),
+            port=int(read_str("SERVE_PORT", "8000", regex=PORT_REGEX)),
+            # Defaults to the CPU count
+            workers=read_number("SERVE_WORKERS", str(os.cpu_count() or 1), minimum=1),
+            # Requests served before a worker is recycled, 0 disables recycling
+            max_requests=read_number("SERVE_MAX_REQUESTS", "10000"),
+            max_requests_jitter=read_number("SERVE_MAX_REQUESTS_JITTER", "1000"),
+            graceful_timeout=read_number("SERVE_GRACEFUL_TIMEOUT", "30"),
+        )
+
+
+@dataclass(frozen=True)
+class TokenSettings:
+    access_token_valid: timedelta
+    refresh_token_valid: timedelta
+    cache_max_size: int
+    cache_ttl_seconds: int
+
+    @classmethod
+    def load(cls) -> "TokenSettings":
+        return cls(
+            access_token_valid=timedelta(minutes=read_number("ACCESS_TOKEN_VALID_MINUTES", "30")),
+            refresh_token_valid=timedelta(days=read_number("REFRESH_TOKEN_VALID_DAYS", "356")),
+            # Decoded claims of introspected tokens, an entry never outlives its token
+            cache_max_size=read_number("TOKEN_CACHE_MAX_SIZE", "100000"),
+            cache_ttl_seconds=read_number("TOKEN_CACHE_TTL_SECONDS", "300"),
+        )
+
+
+@dataclass(frozen=True)
+class RateLimitSettings:
+    enabled: bool
+    backend: str
+    max_keys: int
+    default: str
+    routes: str
+
+    @classmethod
+    def load(cls) -> "RateLimitSettings":
+        return cls(
+            enabled=os.getenv("RATE_LIMIT_ENABLED", "True") == "True",
+            backend=read_str("RATE_LIMIT_BACKEND", "memory", choices=("memory", "redis")),
+            # Amount of buckets kept by the memory backend, least recently used ones are evicted
+            max_keys=read_number("RATE_LIMIT_MAX_KEYS", "100000", minimum=1),
+            # Applies to every route for each IP and client id, as <amount>/<second|minute|hour>
+            default=read_str("RATE_LIMIT_DEFAULT", "1200/minute", regex=RATE_REGEX),
+            # Comma separated <path>=<rate> overrides
+            routes=read_rate_routes("RATE_LIMIT_ROUTES", DEFAULT_RATE_LIMIT_ROUTES),
+        )
+
+
+@dataclass(frozen=True)
+class RedisSettings:
+    url: str
+
+    @classmethod
+    def load(cls) -> "RedisSettings":
+        return cls(
+            url=read_str("REDIS_URL", "redis://localhost:6379/0"),
+        )
+
+
+@dataclass(frozen=True)
+class TracingSettings:
+    exporter: str
+    sample_rate: float
+    endpoint: str
+    file: str
+
+    @classmethod
+    def load(cls) -> "TracingSettings":
+        return cls(
+            exporter=read_str("TRACING_EXPORTER", "none", choices=("none", "jsonl", "otlp")),
+            # Share of the requests starting a trace, requests continuing a sampled trace are always traced
+            sample_rate=read_number("TRACING_SAMPLE_RATE", "0.01", float, minimum=0, maximum=1),
+            # OTLP/HTTP traces endpoint of the collector
+            endpoint=read_str("TRACING_ENDPOINT", "http://localhost:4318/v1/traces"),
+            file=read_str("TRACING_FILE", "traces.jsonl"),
+        )
+
+
+@dataclass(frozen=True)
+class HealthSettings:
+    check_seconds: float
+    max_loop_lag_seconds: float
+    max_hashing_saturation: float
+    fail_on_saturation: bool
+
+    @classmethod
+    def load(cls) -> "HealthSettings":
+        return cls(
+            # Interval of the background checks served by /health/ready
+            check_seconds=read_number("HEALTH_CHECK_SECONDS", "5", float, minimum=0.1),
+            max_loop_lag_seconds=read_number("HEALTH_MAX_LOOP_LAG_SECONDS", "0.5", float),
+            # Hashing calls in flight per hashing thread, above it the worker reports saturated
+            max_hashing_saturation=read_number("HEALTH_MAX_HASHING_SATURATION", "4", float),
+            # Saturation is only reported by default, failing readiness on it moves the load to the other replicas
+            fail_on_saturation=os.getenv("HEALTH_FAIL_ON_SATURATION", "False") == "True",
+        )
+
+
+class Settings:
+    """
+    Snapshot of the environment, replaced as a whole on reload.
+    Each group is validated the first time it is read, a script only needs the variables of the groups it uses
+    """
+    groups = (
+        "app", "passwords", "postgres", "codes", "clients", "server", "tokens", "rate_limit", "redis", "tracing",
+        "health"
+    )
+
+    @classmethod
+    def load(cls, groups: tuple[str, ...] = None) -> "Settings":
+        """Validates the given groups right away, all of them by default"""
+        settings_ = cls()
+        for group in cls.groups if groups is None else groups:
+            getattr(settings_, group)
+        return settings_
+
+    @property
+    def loaded_groups(self) -> tuple[str, ...]:
+        return tuple(group for group in self.groups if group in self.__dict__)
+
+    @cached_property
+    def app(self) -> AppSettings:
+        return AppSettings.load()
+
+    @cached_property
+    def passwords(self) -> PasswordSettings:
+        return PasswordSettings.load()
+
+    @cached_property
+    def postgres(self) -> PostgresSettings:
+        return PostgresSettings.load()
+
+    @cached_property
+    def codes(self) -> CodeSettings:
+        return CodeSettings.load()
+
+    @cached_property
+    def clients(self) -> ClientSettings:
+        return ClientSettings.load()
+
+    @cached_property
+    def server(self) -> ServerSettings:
+        return ServerSettings.load()
+
+    @cached_property
+    def tokens(self) -> TokenSettings:
+        return TokenSettings.load()
+
+    @cached_property
+    def rate_limit(self) -> RateLimitSettings:
+        return RateLimitSettings.load()
+
+    @cached_property
+    def redis(self) -> RedisSettings:
+        return RedisSettings.load()
+
+    @cached_property
+    def tracing(self) -> TracingSettings:
+        return TracingSettings.load()
+
+    @cached_property
+    def health(self) -> HealthSettings:
+        return HealthSettings.load()
+
+
+settings: Optional[Settings] = None
+
+
+def get_settings() -> Settings:
+    global settings
+    if settings is None:
+        settings = Settings()
+    return settings
+
+
+def load_settings() -> Settings:
+    """Validates every group at once, entry points serving requests call it before they start"""
+    global settings
+    settings = Settings.load()
+    return settings
+
+
+def reload_settings() -> Settings:
+    """
+    Rereads the environment, the groups read so far are validated at once.
+    The current settings are kept if the new ones are invalid
+    """
+    global settings
+    settings = Settings.load(settings.loaded_groups) if settings else Settings()
+    return settings
+
+
+# App
+def get_app_secret() -> str:
+    return get_settings().app.secret
+
+
+def get_develop_mode() -> bool:
+    return get_settings().app.develop_mode
+
+
+def get_fast_json_responses() -> bool:
+    return get_settings().app.fast_json_responses
+
+
+# Passwords
+def get_password_min_length() -> int:
+    return get_settings().passwords.min_length
+
 
-@cached(cache=TTLCache(maxsize=1, ttl=ENV_CACHE_TTL_SECONDS))
 def get_password_max_length() -> int:
-    key = "PASSWORD_MAX_LENGTH"
-    value = os.getenv(key, "16")
+    return get_settings().passwords.max_length
+
+
+def get_password_min_length_enforced() -> bool:
+    return get_settings().passwords.min_length_enforced
 
-    try:
-        return int(value)
-    except ValueError:
-        raise EnvironmentValueError(key)
+
+def get_password_max_length_enforced() -> bool:
+    return get_settings().passwords.max_length_enforced
 
 
-@cached(cache=TTLCache(maxsize=1, ttl=ENV_CACHE_TTL_SECONDS))
 def get_password_iterations() -> int:
-    key = "PASSWORD_ITERATIONS"
-    value = os.getenv(key, "300000")
-    try:
-        numeric_value = int(value)
+    return get_settings().passwords.iterations
 
-    except ValueError:
-        raise EnvironmentValueError(key)
 
-    if numeric_value > 1e6:
-        raise EnvironmentValueError(key)
-    return numeric_value
+def get_password_hashing_threads() -> int:
+    return get_settings().passwords.hashing_threads
 
 
 # PostgreSQL
-@cached(cache=TTLCache(maxsize=1, ttl=ENV_CACHE_TTL_SECONDS))
 def get_postgres_host() -> str:
-    """Should contain a valid domain"""
-    key = "POSTGRES_HOST"
-    value = os.getenv(key, "127.0.0.1")
-    #
-    # if not re.compile(DOMAIN_REGEX).match(value):
-    #     raise EnvironmentValueError(key)
+    return get_settings().postgres.host
 
-    return value
 
-
-@cached(cache=TTLCache(maxsize=1, ttl=ENV_CACHE_TTL_SECONDS))
 def get_postgres_port() -> str:
-    """Should contain a valid port"""
-    key = "POSTGRES_PORT"
-    value = os.getenv(key, "5432")
-
-    if not re.compile(PORT_REGEX):
-        raise EnvironmentValueError(key)
-
-    return value
+    return get_settings().postgres.port
 
 
-@cached(cache=TTLCache(maxsize=1, ttl=ENV_CACHE_TTL_SECONDS))
 def get_postgres_db() -> str:
-    """Should contain postgres database name"""
-    key = "POSTGRES_DB"
-    value = os.getenv(key)
+    return get_settings().postgres.db
 
-    if not value:
-        raise EnvironmentValueError(key)
 
-    return value
+def get_postgres_user() -> str:
+    return get_settings().postgres.user
 
 
-@cached(cache=TTLCache(maxsize=1, ttl=ENV_CACHE_TTL_SECONDS))
-def get_postgres_user() -> str:
-    """Should contain postgres user that can access the postgres database"""
-    key = "POSTGRES_USER"
-    value = os.getenv(key)
+def get_postgres_password() -> str:
+    return get_settings().postgres.password
 
-    if not value:
-        raise EnvironmentValueError(key)
 
-    return value
+def get_db_pool_size() -> int:
+    return get_settings().postgres.pool_size
 
 
-@cached(cache=TTLCache(maxsize=1, ttl=ENV_CACHE_TTL_SECONDS))
-def get_postgres_password() -> str:
-    """Should contain postgres password that is used to access the postgres database"""
-    key = "POSTGRES_PASSWORD"
-    value = os.getenv(key)
+def get_db_max_overflow() -> int:
+    return get_settings().postgres.max_overflow
 
-    if not value:
-        raise EnvironmentValueError(key)
 
-    return value
+def get_db_pool_prefill() -> int:
+    return get_settings().postgres.pool_prefill
 
 
-@cached(cache=TTLCache(maxsize=1, ttl=ENV_CACHE_TTL_SECONDS))
+# Authentication codes
 def get_frontend_url() -> str:
-    key = "FRONTEND_URL"
-    value = os.getenv(key)
+    return get_settings().app.frontend_url
 
-    if not value:
-        raise EnvironmentValueError(key)
 
-    return value
+def get_authentication_code_valid_minutes() -> int:
+    return get_settings().codes.valid_minutes
 
 
-@cached(cache=TTLCache(maxsize=1, ttl=ENV_CACHE_TTL_SECONDS))
-def get_authentication_code_valid_minutes() -> int:
-    key = "AUTHENTICATION_CODE_VALID_MINUTES"
-    value = os.getenv(key, "5")
+def get_code_storage() -> str:
+    return get_settings().codes.storage
 
-    try:
-        value = int(value)
-    except ValueError:
-        raise EnvironmentValueError(key)
 
-    return value
+def get_code_storage_max_size() -> int:
+    return get_settings().codes.storage_max_size
 
 
-@cached(cache=TTLCache(maxsize=1, ttl=ENV_CACHE_TTL_SECONDS))
-def get_access_token_valid() -> timedelta:
-    key = "ACCESS_TOKEN_VALID_MINUTES"
-    value = os.getenv(key, "30")
+def get_code_partition_interval() -> str:
+    return get_settings().codes.partition_interval
+
+
+def get_code_partitions_ahead() -> int:
+    return get_settings().codes.partitions_ahead
+
+
+def get_code_partitions_retained() -> int:
+    return get_settings().codes.partitions_retained
+
+
+def get_code_partition_maintenance_seconds() -> int:
+    return get_settings().codes.partition_maintenance_seconds
+
+
+# Clients
+def get_last_authenticated_flush_seconds() -> float:
+    return get_settings().clients.last_authenticated_flush_seconds
+
+
+def get_cache_backend() -> str:
+    return get_settings().clients.cache_backend
 
-    try:
-        value = int(value)
-    except ValueError:
-        raise EnvironmentValueError(key)
 
-    return timedelta(minutes=value)
+def get_client_cache_max_size() -> int:
+    return get_settings().clients.cache_max_size
+
+
+def get_client_cache_ttl_seconds() -> int:
+    return get_settings().clients.cache_ttl_seconds
+
+
+# Server
+def get_serve_host() -> str:
+    return get_settings().server.host
+
+
+def get_serve_port() -> int:
+    return get_settings().server.port
+
+
+def get_serve_workers() -> int:
+    return get_settings().server.workers
+
+
+def get_serve_max_requests() -> int:
+    return get_settings().server.max_requests
+
+
+def get_serve_max_requests_jitter() -> int:
+    return get_settings().server.max_requests_jitter
+
+
+def get_serve_graceful_timeout() -> int:
+    return get_settings().server.graceful_timeout
+
+
+# Tokens
+def get_access_token_valid() -> timedelta:
+    return get_settings().tokens.access_token_valid
 
 
-@cached(cache=TTLCache(maxsize=1, ttl=ENV_CACHE_TTL_SECONDS))
 def get_refresh_token_valid() -> timedelta:
-    key = "REFRESH_TOKEN_VALID_DAYS"
-    value = os.getenv(key, "356")
+    return get_settings().tokens.refresh_token_valid
+
+
+def get_token_cache_max_size() -> int:
+    return get_settings().tokens.cache_max_size
+
+
+def get_token_cache_ttl_seconds() -> int:
+    return get_settings().tokens.cache_ttl_seconds
+
+
+# Rate limiting
+def get_rate_limit_enabled() -> bool:
+    return get_settings().rate_limit.enabled
+
+
+def get_rate_limit_backend() -> str:
+    return get_settings().rate_limit.backend
+
+
+def get_rate_limit_max_keys() -> int:
+    return get_settings().rate_limit.max_keys
+
+
+def get_rate_limit_default() -> str:
+    return get_settings().rate_limit.default
+
+
+def get_rate_limit_routes() -> str:
+    return get_settings().rate_limit.routes
+
+
+def get_redis_url() -> str:
+    return get_settings().redis.url
+
+
+# Tracing
+def get_tracing_exporter() -> str:
+    return get_settings().tracing.exporter
+
+
+def get_tracing_sample_rate() -> float:
+    return get_settings().tracing.sample_rate
+
+
+def get_tracing_endpoint() -> str:
+    return get_settings().tracing.endpoint
+
+
+def get_tracing_file() -> str:
+    return get_settings().tracing.file
+
+
+# Health
+def get_health_check_seconds() -> float:
+    return get_settings().health.check_seconds
+
+
+def get_health_max_loop_lag_seconds() -> float:
+    return get_settings().health.max_loop_lag_seconds
+
+
+def get_health_max_hashing_saturation() -> float:
+    return get_settings().health.max_hashing_saturation
 
-    try:
-        value = int(value)
-    except ValueError:
-        raise EnvironmentValueError(key)
 
-    return timedelta(days=value)
+def get_health_fail_on_saturation() -> bool:
+    return get_settings().health.fail_on_saturation
@@ -16,3 +16,7 @@ class EnvironmentValueError(AppError):
 
     def __str__(self):
         return f"Error loading environmental variable: {self.key}"
+
+
+class SchemaVersionError(AppError):
+    pass
@@ -1,16 +1,18 @@
-from argparse import ArgumentParser
 from enum import Enum
 
 from config import get_test_database_url, ADAPTERS
-from migrations.operations import migrate_head, migration_autogenerate
+from migrations.operations import migrate_head, migration_autogenerate, maintain_partitions
 
 
 class Operations(str, Enum):
     HEAD = "head"
     AUTOGENERATE = "autogenerate"
+    PARTITIONS = "partitions"
 
 
 if __name__ == "__main__":
+    from argparse import ArgumentParser
+
     parser = ArgumentParser()
     parser.add_argument(
         "operation",
@@ -19,7 +21,8 @@ if __name__ == "__main__":
     )
     operations = {
         Operations.HEAD: migrate_head,
-        Operations.AUTOGENERATE: migration_autogenerate
+        Operations.AUTOGENERATE: migration_autogenerate,
+        Operations.PARTITIONS: maintain_partitions
     }
 
     args = parser.parse_args()
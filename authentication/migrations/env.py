@@ -7,7 +7,7 @@ from sqlalchemy import pool
 from models.base import Base
 from models.user import User
 from models.client import Client, ClientScope
-from models.code import Code
+from models.code import Code, UnloggedCode
 from models.scope import Scope
 
 # this is the Alembic Config object, which provides
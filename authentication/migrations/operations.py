@@ -1,12 +1,14 @@
 import os
 
-from alembic import command
-from alembic.config import Config
+from sqlalchemy import create_engine
 
 from config import get_alembic_config_location, get_root_dir
+from services.partition_service import maintain_code_partitions
 
 
-def get_alembic_config(database_url: str) -> Config:
+def get_alembic_config(database_url: str):
+    from alembic.config import Config
+
     config = Config(get_alembic_config_location())
     config.set_main_option(
         "sqlalchemy.url", database_url)
@@ -17,10 +19,21 @@ def get_alembic_config(database_url: str) -> Config:
 
 
 def migrate_head(database_url: str):
+    from alembic import command
+
     alembic_config = get_alembic_config(database_url)
     command.upgrade(alembic_config, "head")
 
 
 def migration_autogenerate(database_url: str):
+    from alembic import command
+
     alembic_config = get_alembic_config(database_url)
     command.revision(alembic_config, autogenerate=True)
+
+
+def maintain_partitions(database_url: str):
+    engine = create_engine(database_url)
+    with engine.begin() as connection:
+        maintain_code_partitions(connection)
+    engine.dispose()
@@ -0,0 +1,65 @@
+import os
+import re
+from functools import lru_cache
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from config import get_root_dir
+from exceptions import SchemaVersionError
+
+REVISION_REGEX = re.compile(r"^revision(?:\s*:[^=]*)?\s*=\s*['\"](\w+)['\"]", re.MULTILINE)
+DOWN_REVISION_REGEX = re.compile(r"^down_revision(?:\s*:[^=]*)?\s*=\s*(.+)$", re.MULTILINE)
+REVISION_ID_REGEX = re.compile(r"['\"](\w+)['\"]")
+
+
+def get_versions_dir() -> str:
+    return os.path.join(get_root_dir(), "migrations", "versions")
+
+
+@lru_cache(maxsize=1)
+def get_expected_head() -> str:
+    """Reads the head revision from the migration files without loading Alembic"""
+    revisions = set()
+    down_revisions = set()
+
+    for filename in os.listdir(get_versions_dir()):
+        if not filename.endswith(".py"):
+            continue
+
+        with open(os.path.join(get_versions_dir(), filename)) as file:
+            source = file.read()
+
+        revision = REVISION_REGEX.search(source)
+        if not revision:
+            continue
+        revisions.add(revision.group(1))
+
+        down_revision = DOWN_REVISION_REGEX.search(source)
+        if down_revision:
+            down_revisions.update(REVISION_ID_REGEX.findall(down_revision.group(1)))
+
+    heads = revisions - down_revisions
+    if len(heads) != 1:
+        raise SchemaVersionError(f"Expected a single migration head, found: {sorted(heads)}")
+
+    return heads.pop()
+
+
+async def get_current_revision(engine: AsyncEngine) -> Optional[str]:
+    """None when the database was never migrated, connection errors are raised"""
+    async with engine.connect() as connection:
+        if await connection.scalar(text("SELECT to_regclass('alembic_version')")) is None:
+            return None
+        return await connection.scalar(text("SELECT version_num FROM alembic_version"))
+
+
+async def check_schema_version(engine: AsyncEngine):
+    expected = get_expected_head()
+    current = await get_current_revision(engine)
+
+    if current != expected:
+        raise SchemaVersionError(
+            f"Database schema is at revision {current}, expected {expected}; run: python migrate.py head"
+        )
@@ -0,0 +1,84 @@
+"""empty message
+
+Revision ID: 35278dd92bb3
+Revises: d06923a55566
+Create Date: 2026-10-19 11:02:17.730954
+
+"""
+from datetime import datetime, timedelta
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '35278dd92bb3'
+down_revision: Union[str, None] = 'd06923a55566'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = "id, value, client_id, redirect_uri, is_used, valid_until, created_at"
+# daily partitions from today on, the partition maintenance of the app takes over from there
+INITIAL_PARTITIONS = 4
+
+
+def create_initial_partitions() -> None:
+    start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    for _ in range(INITIAL_PARTITIONS):
+        end = start + timedelta(days=1)
+        op.execute(
+            f"CREATE TABLE codes_p{start.strftime('%Y%m%d')} PARTITION OF codes "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+        start = end
+
+
+def upgrade() -> None:
+    op.rename_table('codes', 'codes_unpartitioned')
+    op.execute("ALTER TABLE codes_unpartitioned RENAME CONSTRAINT codes_pkey TO codes_unpartitioned_pkey")
+    op.execute("ALTER TABLE codes_unpartitioned "
+               "RENAME CONSTRAINT codes_client_id_fkey TO codes_unpartitioned_client_id_fkey")
+
+    op.create_table('codes',
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('codes_id_seq')"), nullable=False),
+    sa.Column('value', sa.String(), nullable=False),
+    sa.Column('client_id', sa.Integer(), nullable=False),
+    sa.Column('redirect_uri', sa.String(), nullable=False),
+    sa.Column('is_used', sa.Boolean(), nullable=False),
+    sa.Column('valid_until', sa.DateTime(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['client_id'], ['clients.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id', 'created_at'),
+    postgresql_partition_by='RANGE (created_at)'
+    )
+    op.execute("CREATE TABLE codes_default PARTITION OF codes DEFAULT")
+    create_initial_partitions()
+
+    op.execute(f"INSERT INTO codes ({COLUMNS}) SELECT {COLUMNS} FROM codes_unpartitioned")
+    op.execute("ALTER SEQUENCE codes_id_seq OWNED BY codes.id")
+    op.drop_table('codes_unpartitioned')
+
+
+def downgrade() -> None:
+    op.rename_table('codes', 'codes_partitioned')
+    op.execute("ALTER TABLE codes_partitioned RENAME CONSTRAINT codes_pkey TO codes_partitioned_pkey")
+    op.execute("ALTER TABLE codes_partitioned "
+               "RENAME CONSTRAINT codes_client_id_fkey TO codes_partitioned_client_id_fkey")
+
+    op.create_table('codes',
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('codes_id_seq')"), nullable=False),
+    sa.Column('value', sa.String(), nullable=False),
+    sa.Column('client_id', sa.Integer(), nullable=False),
+    sa.Column('redirect_uri', sa.String(), nullable=False),
+    sa.Column('is_used', sa.Boolean(), nullable=False),
+    sa.Column('valid_until', sa.DateTime(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    # the partitions still hold the generated name until they are dropped
+    sa.ForeignKeyConstraint(['client_id'], ['clients.id'], name='codes_client_id_fkey', ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+    op.execute(f"INSERT INTO codes ({COLUMNS}) SELECT {COLUMNS} FROM codes_partitioned")
+    op.execute("ALTER SEQUENCE codes_id_seq OWNED BY codes.id")
+    op.drop_table('codes_partitioned')
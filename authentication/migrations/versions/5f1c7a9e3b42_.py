@@ -0,0 +1,30 @@
+"""index codes.value and clients.user_id
+
+Revision ID: 5f1c7a9e3b42
+Revises: 35278dd92bb3
+Create Date: 2026-10-19 14:20:41.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f1c7a9e3b42'
+down_revision: Union[str, None] = '35278dd92bb3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # created on the partitioned parent, postgres adds it to every existing and future partition
+    op.create_index(op.f('ix_codes_value'), 'codes', ['value'], unique=False)
+    op.create_index(op.f('ix_unlogged_codes_value'), 'unlogged_codes', ['value'], unique=False)
+    op.create_index(op.f('ix_clients_user_id'), 'clients', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_clients_user_id'), table_name='clients')
+    op.drop_index(op.f('ix_unlogged_codes_value'), table_name='unlogged_codes')
+    op.drop_index(op.f('ix_codes_value'), table_name='codes')
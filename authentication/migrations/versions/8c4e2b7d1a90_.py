@@ -0,0 +1,26 @@
+"""add the token-introspect scope
+
+Revision ID: 8c4e2b7d1a90
+Revises: 5f1c7a9e3b42
+Create Date: 2026-10-19 19:42:08.113527
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c4e2b7d1a90'
+down_revision: Union[str, None] = '5f1c7a9e3b42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # a fresh database already has it, the first revision inserts every scope type
+    op.execute("INSERT INTO scopes (type) VALUES ('token-introspect') ON CONFLICT (type) DO NOTHING")
+
+
+def downgrade() -> None:
+    op.execute("DELETE FROM scopes WHERE type = 'token-introspect'")
@@ -30,7 +30,7 @@ class Client(Base):
     name: Mapped[str] = mapped_column(
         unique=True, index=True, nullable=False)
     user_id: Mapped[int] = mapped_column(
-        ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+        ForeignKey("users.id", ondelete="CASCADE"), index=True, nullable=False)
     secret: Mapped[str] = mapped_column(
         default=generate_uuid,
         unique=True, index=True, nullable=False)
@@ -6,13 +6,11 @@ from sqlalchemy.orm import Mapped, mapped_column, relationship
 from models.base import Base
 
 
-class Code(Base):
-    __tablename__ = "codes"
-
+class CodeMixin:
     id: Mapped[int] = mapped_column(
-        primary_key=True)
+        primary_key=True, autoincrement=True)
     value: Mapped[str] = mapped_column(
-        nullable=False)
+        index=True, nullable=False)
     client_id: Mapped[int] = mapped_column(
         ForeignKey("clients.id", ondelete="CASCADE"), nullable=False)
     redirect_uri: Mapped[str] = mapped_column(
@@ -24,5 +22,22 @@ class Code(Base):
     created_at: Mapped[datetime] = mapped_column(
         default=datetime.now)
 
+
+class Code(CodeMixin, Base):
+    """Range partitioned by created_at, partitions are maintained by services.partition_service"""
+    __tablename__ = "codes"
+    __table_args__ = {"postgresql_partition_by": "RANGE (created_at)"}
+
+    created_at: Mapped[datetime] = mapped_column(
+        primary_key=True, default=datetime.now)
+
     client: Mapped["Client"] = relationship(
         back_populates="codes")
+
+
+class UnloggedCode(CodeMixin, Base):
+    """Same as Code, but stored in an UNLOGGED table that skips WAL writes and is truncated on a crash"""
+    __tablename__ = "unlogged_codes"
+    __table_args__ = {"prefixes": ["UNLOGGED"]}
+
+    client: Mapped["Client"] = relationship()
@@ -11,6 +11,7 @@ class Scope(Base):
         UNRESTRICTED = "unrestricted"
         PROFILE_READ = "profile-read"
         PROFILE_WRITE = "profile-write"
+        TOKEN_INTROSPECT = "token-introspect"
 
     __tablename__ = "scopes"
 
@@ -0,0 +1,99 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from env import get_health_check_seconds, get_health_max_loop_lag_seconds, get_health_max_hashing_saturation, \
+    get_health_fail_on_saturation
+from migrations.version import get_current_revision, get_expected_head
+from monitoring.pool import get_pool_saturation
+from services.password_service.executor import get_hashing_saturation
+
+logger = logging.getLogger(__name__)
+
+# a state older than this many check intervals means the checks themselves are stuck
+MAX_MISSED_CHECKS = 3
+
+
+@dataclass
+class HealthState:
+    """Refreshed in the background, probes only read it"""
+    database: bool = False
+    schema_revision: Optional[str] = None
+    pool_saturation: float = 0.0
+    hashing_saturation: float = 0.0
+    loop_lag_seconds: float = 0.0
+    checked_at: Optional[float] = None
+
+    @property
+    def schema_current(self) -> bool:
+        return self.schema_revision == get_expected_head()
+
+    @property
+    def fresh(self) -> bool:
+        if self.checked_at is None:
+            return False
+        return time.monotonic() - self.checked_at <= get_health_check_seconds() * MAX_MISSED_CHECKS
+
+    def get_saturated(self) -> list[str]:
+        saturated = []
+        if self.pool_saturation >= 1:
+            saturated.append("pool")
+        if self.hashing_saturation > get_health_max_hashing_saturation():
+            saturated.append("hashing")
+        if self.loop_lag_seconds > get_health_max_loop_lag_seconds():
+            saturated.append("loop_lag")
+        return saturated
+
+    def get_failures(self) -> list[str]:
+        """Saturation under load is shared by every replica, it only fails readiness when opted in"""
+        failures = []
+        if not self.fresh:
+            failures.append("stale")
+        if not self.database:
+            failures.append("database")
+        if not self.schema_current:
+            failures.append("schema")
+        if get_health_fail_on_saturation():
+            failures.extend(self.get_saturated())
+        return failures
+
+
+health_state = HealthState()
+
+
+async def check_database(engine: AsyncEngine, state: HealthState):
+    # an exhausted pool already tells the database is in use, waiting for a connection would compete with requests
+    if engine.pool.checkedin() == 0 and engine.pool.checkedout() > 0:
+        return
+    try:
+        state.schema_revision = await asyncio.wait_for(get_current_revision(engine), get_health_check_seconds())
+        # a database without a revision is reachable, it is reported as a schema failure
+        state.database = True
+    except Exception:  # noqa
+        logger.exception("Database health check failed")
+        state.database = False
+        state.schema_revision = None
+
+
+async def refresh_health_state(engine: AsyncEngine, state: HealthState = health_state, loop_lag: float = 0.0):
+    await check_database(engine, state)
+    state.pool_saturation = get_pool_saturation(engine.pool)
+    state.hashing_saturation = get_hashing_saturation()
+    state.loop_lag_seconds = loop_lag
+    state.checked_at = time.monotonic()
+
+
+async def run_health_checks(engine: AsyncEngine, interval_seconds: float):
+    """The oversleep of every interval is the event loop lag"""
+    while True:
+        expected = time.monotonic() + interval_seconds
+        await asyncio.sleep(interval_seconds)
+        loop_lag = max(time.monotonic() - expected, 0.0)
+        try:
+            await refresh_health_state(engine, loop_lag=loop_lag)
+        except Exception:  # noqa
+            logger.exception("Health checks failed")
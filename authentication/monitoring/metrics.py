@@ -0,0 +1,198 @@
+"""Minimal Prometheus compatible metrics, recorded from the event loop thread without locks"""
+from bisect import bisect_left
+from typing import Callable, Iterable
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+FAST_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01)
+COUNT_BUCKETS = (0, 1, 2, 3, 4, 5, 6, 8, 10, 15, 20, 50)
+HASHING_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+Labels = tuple[str, ...]
+
+
+def format_labels(names: Labels, values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: tuple[float, ...]):
+        self.bounds = bounds
+        # the last slot is the +Inf bucket
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+
+class Family:
+    type_ = None
+
+    def __init__(self, name: str, documentation: str, label_names: Labels = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.children = {}
+
+    def create_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        child = self.children.get(values)
+        if child is None:
+            child = self.children[values] = self.create_child()
+        return child
+
+    def render_samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_}"]
+        lines.extend(self.render_samples())
+        return "\n".join(lines)
+
+
+class CounterFamily(Family):
+    type_ = "counter"
+
+    def create_child(self) -> Counter:
+        return Counter()
+
+    def inc(self, amount: float = 1):
+        self.labels().inc(amount)
+
+    def render_samples(self) -> Iterable[str]:
+        for values, counter in self.children.items():
+            yield f"{self.name}{format_labels(self.label_names, values)} {format_value(counter.value)}"
+
+
+class CollectedCounterFamily(CounterFamily):
+    """Totals kept by their owner, read from the callback when metrics are collected"""
+
+    def __init__(self, name: str, documentation: str, label_names: Labels,
+                 callback: Callable[[], Iterable[tuple[Labels, float]]]):
+        super().__init__(name, documentation, label_names)
+        self.callback = callback
+
+    def render_samples(self) -> Iterable[str]:
+        for values, value in self.callback():
+            yield f"{self.name}{format_labels(self.label_names, values)} {format_value(value)}"
+
+
+class HistogramFamily(Family):
+    type_ = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: Labels = (), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(buckets)
+
+    def create_child(self) -> Histogram:
+        return Histogram(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def render_samples(self) -> Iterable[str]:
+        for values, histogram in self.children.items():
+            cumulative = 0
+            for bound, count in zip((*histogram.bounds, float("inf")), histogram.counts):
+                cumulative += count
+                labels = format_labels(self.label_names, values, f'le="{format_value(float(bound))}"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = format_labels(self.label_names, values)
+            yield f"{self.name}_sum{labels} {format_value(histogram.sum)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class GaugeFamily(Family):
+    """Values are read from the callback when metrics are collected, nothing is recorded in between"""
+    type_ = "gauge"
+
+    def __init__(self, name: str, documentation: str, label_names: Labels,
+                 callback: Callable[[], Iterable[tuple[Labels, float]]]):
+        super().__init__(name, documentation, label_names)
+        self.callback = callback
+
+    def render_samples(self) -> Iterable[str]:
+        for values, value in self.callback():
+            yield f"{self.name}{format_labels(self.label_names, values)} {format_value(value)}"
+
+
+class Registry:
+    def __init__(self):
+        self.families: dict[str, Family] = {}
+
+    def register(self, family: Family) -> Family:
+        self.families[family.name] = family
+        return family
+
+    def counter(self, name: str, documentation: str, label_names: Labels = (), callback=None) -> CounterFamily:
+        if callback:
+            return self.register(CollectedCounterFamily(name, documentation, label_names, callback))
+        return self.register(CounterFamily(name, documentation, label_names))
+
+    def histogram(self, name: str, documentation: str, label_names: Labels = (), buckets=LATENCY_BUCKETS):
+        return self.register(HistogramFamily(name, documentation, label_names, buckets))
+
+    def gauge(self, name: str, documentation: str, label_names: Labels = (), callback=None) -> GaugeFamily:
+        return self.register(GaugeFamily(name, documentation, label_names, callback))
+
+    def render(self) -> str:
+        return "\n".join(family.render() for family in self.families.values()) + "\n"
+
+
+registry = Registry()
+
+# HTTP
+REQUEST_LATENCY = registry.histogram(
+    "http_request_duration_seconds", "Request latency per route", ("method", "route"))
+RESPONSES = registry.counter(
+    "http_responses_total", "Responses per route and status code", ("method", "route", "status"))
+
+# Passwords
+PASSWORD_HASH_DURATION = registry.histogram(
+    "password_hash_duration_seconds", "Time spent hashing a password", buckets=HASHING_BUCKETS)
+PASSWORD_HASH_QUEUE_WAIT = registry.histogram(
+    "password_hash_queue_wait_seconds", "Time a hash waited for a free hashing thread")
+
+# Tokens
+JWT_DURATION = registry.histogram(
+    "jwt_duration_seconds", "Time spent encoding and decoding tokens", ("operation",), FAST_BUCKETS)
+JWT_ERRORS = registry.counter(
+    "jwt_decode_errors_total", "Rejected tokens")
+
+# Database
+DB_CHECKOUT_DURATION = registry.histogram(
+    "db_pool_checkout_duration_seconds", "Time spent waiting for a pooled connection", buckets=FAST_BUCKETS)
+DB_QUERY_DURATION = registry.histogram(
+    "db_query_duration_seconds", "Time spent executing a statement")
+DB_QUERIES_PER_REQUEST = registry.histogram(
+    "db_queries_per_request", "Statements executed while handling a request", ("method", "route"), COUNT_BUCKETS)
+DB_TIME_PER_REQUEST = registry.histogram(
+    "db_time_per_request_seconds", "Time spent executing statements while handling a request", ("method", "route"))
@@ -0,0 +1,49 @@
+import time
+
+from sqlalchemy import AsyncAdaptedQueuePool, Pool
+
+from env import get_db_max_overflow
+from monitoring.metrics import registry, DB_CHECKOUT_DURATION
+
+
+class InstrumentedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """Records how long each checkout waited, including connecting an overflow connection"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_CHECKOUT_DURATION.observe(time.perf_counter() - started)
+
+
+def get_pool_saturation(pool: Pool, max_overflow: int = None) -> float:
+    if max_overflow is None:
+        max_overflow = get_db_max_overflow()
+    capacity = pool.size() + max(max_overflow, 0)
+    return pool.checkedout() / capacity if capacity else 0.0
+
+
+def collect_pool_usage():
+    import config
+
+    if not config.db_engine:
+        return
+    pool = config.db_engine.pool
+    yield ("checked_out",), pool.checkedout()
+    yield ("idle",), pool.checkedin()
+    yield ("size",), pool.size()
+    yield ("overflow",), max(pool.overflow(), 0)
+
+
+def collect_pool_saturation():
+    import config
+
+    if not config.db_engine:
+        return
+    yield (), get_pool_saturation(config.db_engine.pool)
+
+
+registry.gauge("db_pool_connections", "Pooled connections by state", ("state",), collect_pool_usage)
+registry.gauge("db_pool_saturation", "Checked out connections relative to size plus overflow", (),
+               collect_pool_saturation)
@@ -0,0 +1,71 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional, Iterator
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from monitoring.metrics import DB_QUERY_DURATION
+from monitoring.tracing import current_span, STATUS_ERROR
+
+
+class QueryStats:
+    """Statements executed while tracking, nested trackers also count towards their parents"""
+    __slots__ = ("count", "duration", "parent")
+
+    def __init__(self, parent: "QueryStats" = None):
+        self.count = 0
+        self.duration = 0.0
+        self.parent = parent
+
+    def record(self, duration: float):
+        stats = self
+        while stats:
+            stats.count += 1
+            stats.duration += duration
+            stats = stats.parent
+
+
+current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("current_query_stats", default=None)
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    stats = QueryStats(current_query_stats.get())
+    token = current_query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        current_query_stats.reset(token)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    parent = current_span.get()
+    span = parent.child("db.query", **{"db.system": "postgresql", "db.statement": statement}) if parent else None
+    conn.info.setdefault("query_started", []).append((time.perf_counter(), span))
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started, span = conn.info["query_started"].pop()
+    duration = time.perf_counter() - started
+    DB_QUERY_DURATION.observe(duration)
+    if span:
+        span.finish()
+
+    stats = current_query_stats.get()
+    if stats:
+        stats.record(duration)
+
+
+@event.listens_for(Engine, "handle_error")
+def handle_error(context):
+    """Failed statements never reach after_cursor_execute"""
+    started = context.connection.info.get("query_started") if context.connection else None
+    if started:
+        _, span = started.pop()
+        if span:
+            span.status = STATUS_ERROR
+            span.finish()
@@ -0,0 +1,268 @@
+import inspect
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import Enum
+from functools import wraps
+from typing import Optional, Iterator, Callable
+
+from config import APP_NAME, get_tracing_exporter
+from env import get_tracing_sample_rate, get_tracing_endpoint, get_tracing_file
+
+logger = logging.getLogger(__name__)
+
+TRACEPARENT_REGEX = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+BATCH_SIZE = 512
+EXPORT_INTERVAL_SECONDS = 5
+# finished spans are dropped rather than buffered without bound when the exporter falls behind
+MAX_QUEUE_SIZE = 8192
+
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+
+class TracingExporters(str, Enum):
+    NONE = "none"
+    JSONL = "jsonl"
+    OTLP = "otlp"
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "start", "end", "attributes", "status")
+
+    def __init__(self, name: str, trace_id: str, parent_id: str = None, **attributes):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.start = time.time_ns()
+        self.end = None
+        self.attributes = attributes
+        self.status = STATUS_OK
+
+    def child(self, name: str, **attributes) -> "Span":
+        return Span(name, self.trace_id, self.span_id, **attributes)
+
+    def finish(self):
+        self.end = time.time_ns()
+        span_processor.put(self)
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "end": self.end,
+            "attributes": self.attributes,
+            "status": self.status
+        }
+
+    def to_otlp(self) -> dict:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "startTimeUnixNano": str(self.start),
+            "endTimeUnixNano": str(self.end),
+            "attributes": [
+                {"key": key, "value": {"stringValue": str(value)}} for key, value in self.attributes.items()
+            ],
+            "status": {"code": self.status}
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class SpanExporter:
+    def export(self, spans: list[Span]):
+        raise NotImplementedError
+
+
+class JsonlSpanExporter(SpanExporter):
+    def __init__(self, path: str = None):
+        self.path = path or get_tracing_file()
+
+    def export(self, spans: list[Span]):
+        with open(self.path, "a") as file:
+            file.writelines(json.dumps(span.to_dict()) + "\n" for span in spans)
+
+
+class OtlpSpanExporter(SpanExporter):
+    """Sends OTLP/HTTP JSON, the format every OpenTelemetry collector accepts"""
+
+    def __init__(self, endpoint: str = None, timeout: float = 10):
+        self.endpoint = endpoint or get_tracing_endpoint()
+        self.timeout = timeout
+
+    def export(self, spans: list[Span]):
+        body = {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": APP_NAME}}]},
+                "scopeSpans": [{"scope": {"name": __name__}, "spans": [span.to_otlp() for span in spans]}]
+            }]
+        }
+        request = urllib.request.Request(
+            self.endpoint,
+            data=json.dumps(body).encode(),
+            headers={"Content-Type": "application/json"},
+            method="POST"
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+
+TRACING_EXPORTER_MAP = {
+    TracingExporters.JSONL: JsonlSpanExporter,
+    TracingExporters.OTLP: OtlpSpanExporter
+}
+
+
+class BatchSpanProcessor:
+    """Queues finished spans and exports them in batches from a background thread"""
+
+    def __init__(self):
+        self.exporter: Optional[SpanExporter] = None
+        self.queue = queue.Queue(MAX_QUEUE_SIZE)
+        self.thread: Optional[threading.Thread] = None
+        self.dropped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def start(self, exporter: SpanExporter):
+        """Called in every worker, threads do not survive a fork"""
+        self.exporter = exporter
+        self.thread = threading.Thread(target=self.run, name="span-exporter", daemon=True)
+        self.thread.start()
+
+    def put(self, span: Span):
+        try:
+            self.queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def run(self):
+        stopping = False
+        while not stopping:
+            batch = []
+            deadline = time.monotonic() + EXPORT_INTERVAL_SECONDS
+            while len(batch) < BATCH_SIZE:
+                try:
+                    span = self.queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if span is None:
+                    stopping = True
+                    break
+                batch.append(span)
+
+            if batch:
+                try:
+                    self.exporter.export(batch)
+                except Exception:
+                    logger.exception("Failed to export %s spans", len(batch))
+
+    def shutdown(self):
+        """Exports the queued spans and stops the thread"""
+        if not self.thread:
+            return
+        self.queue.put(None)
+        self.thread.join()
+        self.thread = None
+        self.exporter = None
+
+
+span_processor = BatchSpanProcessor()
+
+
+def start_tracing():
+    exporter_cls = TRACING_EXPORTER_MAP.get(get_tracing_exporter())
+    if exporter_cls and not span_processor.enabled:
+        span_processor.start(exporter_cls())
+
+
+def stop_tracing():
+    span_processor.shutdown()
+
+
+def start_trace(name: str, traceparent: str = None, **attributes) -> Optional[Span]:
+    """Head based sampling, an incoming W3C traceparent decides for the whole trace"""
+    if not span_processor.enabled:
+        return None
+
+    match = TRACEPARENT_REGEX.match(traceparent) if traceparent else None
+    if match:
+        trace_id, parent_id, flags = match.groups()
+        if not int(flags, 16) & 1:
+            return None
+        return Span(name, trace_id, parent_id, **attributes)
+
+    if random.random() >= get_tracing_sample_rate():
+        return None
+    return Span(name, os.urandom(16).hex(), **attributes)
+
+
+@contextmanager
+def use_span(span: Optional[Span]) -> Iterator[Optional[Span]]:
+    """Makes the span current and finishes it on exit, does nothing for unsampled requests"""
+    if span is None:
+        yield None
+        return
+
+    token = current_span.set(span)
+    try:
+        yield span
+    except BaseException:
+        span.status = STATUS_ERROR
+        raise
+    finally:
+        current_span.reset(token)
+        span.finish()
+
+
+def trace_span(name: str, **attributes):
+    """Child of the current span, nothing is recorded outside of a sampled trace"""
+    parent = current_span.get()
+    return use_span(parent.child(name, **attributes) if parent else None)
+
+
+def traced(fn: Callable) -> Callable:
+    """Wraps every call of the function in a span named after it"""
+    name = fn.__qualname__
+
+    if inspect.iscoroutinefunction(fn):
+        @wraps(fn)
+        async def wrapper(*args, **kwargs):
+            if current_span.get() is None:
+                return await fn(*args, **kwargs)
+            with trace_span(name):
+                return await fn(*args, **kwargs)
+    else:
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if current_span.get() is None:
+                return fn(*args, **kwargs)
+            with trace_span(name):
+                return fn(*args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,220 @@
+import asyncio
+import gc
+import logging
+import os
+import random
+import signal
+import socket
+import sys
+import time
+from typing import Optional
+
+import uvicorn
+
+from env import get_serve_host, get_serve_port, get_serve_workers, get_serve_max_requests, \
+    get_serve_max_requests_jitter, get_serve_graceful_timeout, load_settings
+
+logger = logging.getLogger("uvicorn.error")
+
+SHUTDOWN_SIGNALS = (signal.SIGTERM, signal.SIGINT)
+WORKER_BOOT_ERROR = 3
+# Workers crashing in a row wait twice as long as the previous one before they are replaced
+RESPAWN_DELAY = 0.5
+RESPAWN_MAX_DELAY = 30.0
+# Seconds a stopping worker waits for the connections it accepted last to send their request
+ACCEPTED_CONNECTION_GRACE = 1.0
+
+
+def create_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def get_max_requests() -> Optional[int]:
+    """Spreads recycling so the workers do not restart at the same moment"""
+    max_requests = get_serve_max_requests()
+    if not max_requests:
+        return None
+    return max_requests + random.randint(0, get_serve_max_requests_jitter())
+
+
+class WorkerServer(uvicorn.Server):
+    """
+    Uvicorn closes the connections without a request as idle when it shuts down, including the ones accepted
+    an instant before a recycling worker stopped accepting. They get a moment to send their request first
+    """
+
+    async def shutdown(self, sockets: Optional[list[socket.socket]] = None):
+        for server in self.servers:
+            server.close()
+
+        deadline = time.monotonic() + ACCEPTED_CONNECTION_GRACE
+        while time.monotonic() < deadline and any(
+                getattr(connection, "cycle", None) is None for connection in self.server_state.connections
+        ):
+            await asyncio.sleep(0.01)
+
+        await super().shutdown(sockets)
+
+
+def run_worker(app, sock: socket.socket, max_requests: Optional[int]) -> bool:
+    for signum in SHUTDOWN_SIGNALS:
+        signal.signal(signum, signal.SIG_DFL)
+    # The lifespan installs its own reload handler once the loop is running
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+
+    config = uvicorn.Config(
+        app,
+        loop="uvloop",
+        http="httptools",
+        lifespan="on",
+        limit_max_requests=max_requests,
+        timeout_graceful_shutdown=get_serve_graceful_timeout(),
+    )
+    server = WorkerServer(config)
+    server.run(sockets=[sock])
+    return server.started
+
+
+class Arbiter:
+    """Preforks uvicorn workers sharing one socket and replaces the ones that exit"""
+
+    def __init__(self, app, sock: socket.socket, workers: int):
+        self.app = app
+        self.sock = sock
+        self.workers = workers
+        self.pids = set()
+        self.respawns: list[float] = []
+        self.crashes = 0
+        self.stopping = False
+        self.exit_code = 0
+
+    def spawn(self):
+        max_requests = get_max_requests()
+        pid = os.fork()
+        if pid == 0:
+            code = WORKER_BOOT_ERROR
+            try:
+                if run_worker(self.app, self.sock, max_requests):
+                    code = 0
+            except BaseException:
+                logger.exception("Worker %s crashed", os.getpid())
+                code = 1
+            finally:
+                os._exit(code)
+
+        self.pids.add(pid)
+
+    def stop(self, signum, _frame):
+        self.stopping = True
+        for pid in list(self.pids):
+            self.kill(pid, signum)
+
+    def kill(self, pid: int, signum: int):
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            self.pids.discard(pid)
+
+    def reap(self) -> tuple[int, int]:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            self.pids.clear()
+            return 0, 0
+        if not pid:
+            return 0, 0
+
+        self.pids.discard(pid)
+        code = os.waitstatus_to_exitcode(status)
+        if code and -code not in SHUTDOWN_SIGNALS:
+            logger.warning("Worker %s exited with %s", pid, code)
+        return pid, code
+
+    def schedule_respawn(self, pid: int, code: int):
+        """A recycled worker is replaced right away, a crashed one after a delay growing with the crashes in a row"""
+        if not code or -code in SHUTDOWN_SIGNALS:
+            self.crashes = 0
+            self.respawns.append(time.monotonic())
+            return
+
+        delay = min(RESPAWN_DELAY * 2 ** self.crashes, RESPAWN_MAX_DELAY)
+        self.crashes += 1
+        logger.warning("Replacing worker %s in %.1f seconds", pid, delay)
+        self.respawns.append(time.monotonic() + delay)
+
+    def spawn_due(self):
+        now = time.monotonic()
+        due = [respawn for respawn in self.respawns if respawn <= now]
+        self.respawns = [respawn for respawn in self.respawns if respawn > now]
+        for _ in due:
+            self.spawn()
+
+    def reload(self, signum, _frame):
+        from app import reload_settings_on_signal
+
+        reload_settings_on_signal()
+        for pid in list(self.pids):
+            self.kill(pid, signum)
+
+    def run(self) -> int:
+        for signum in SHUTDOWN_SIGNALS:
+            signal.signal(signum, self.stop)
+        signal.signal(signal.SIGHUP, self.reload)
+
+        for _ in range(self.workers):
+            self.spawn()
+
+        while not self.stopping:
+            self.spawn_due()
+            pid, code = self.reap()
+            if not pid:
+                time.sleep(0.1)
+            elif code == WORKER_BOOT_ERROR:
+                logger.error("Worker %s failed to boot, shutting down", pid)
+                self.exit_code = WORKER_BOOT_ERROR
+                self.stop(signal.SIGTERM, None)
+            elif not self.stopping:
+                self.schedule_respawn(pid, code)
+
+        self.shutdown()
+        return self.exit_code
+
+    def shutdown(self):
+        deadline = time.monotonic() + get_serve_graceful_timeout()
+        while self.pids and time.monotonic() < deadline:
+            if not self.reap()[0]:
+                time.sleep(0.1)
+
+        for pid in list(self.pids):
+            logger.warning("Worker %s did not stop in time, killing", pid)
+            self.kill(pid, signal.SIGKILL)
+        while self.pids:
+            if not self.reap()[0]:
+                time.sleep(0.1)
+
+        self.sock.close()
+
+
+def serve() -> int:
+    # an invalid environment stops the arbiter before any worker is forked
+    load_settings()
+    from app import app
+
+    sock = create_socket(get_serve_host(), get_serve_port())
+
+    # Objects created while importing the app are never freed, keeping them out of the
+    # collector stops it from touching (and copying) the pages shared with the workers
+    gc.collect()
+    gc.freeze()
+
+    return Arbiter(app, sock, get_serve_workers()).run()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(serve())
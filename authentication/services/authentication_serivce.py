@@ -1,3 +1,4 @@
+import time
 from datetime import timedelta, datetime
 from enum import Enum
 from urllib.parse import urljoin
@@ -7,12 +8,14 @@ from jwt import InvalidTokenError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from config import APP_NAME
-from env import get_app_secret, get_frontend_url, get_authentication_code_valid_minutes, get_access_token_valid, \
-    get_refresh_token_valid
+from env import get_app_secret, get_frontend_url, get_authentication_code_valid_minutes, get_settings, Settings
 from models.code import Code
 from models.scope import Scope
 from models.user import User
+from monitoring.metrics import JWT_DURATION, JWT_ERRORS
+from monitoring.tracing import traced
 from services.base import BaseService, ServiceError
+from services.client_cache import ClientPrincipal
 from services.client_service import ClientService
 from services.code_service import CodeService
 from services.user_service import UserService
@@ -37,6 +40,9 @@ TOKEN_IAT = "iat"
 TOKEN_TYPE = "type"
 TOKEN_SCOPES: str = "scopes"
 
+JWT_ENCODE_DURATION = JWT_DURATION.labels("encode")
+JWT_DECODE_DURATION = JWT_DURATION.labels("decode")
+
 
 class TokenTypes(str, Enum):
     REFRESH = "refresh"
@@ -57,32 +63,37 @@ class AuthenticationService(BaseService):
         self.session = session
 
     @staticmethod
-    def get_expiration_date(type_: TokenTypes) -> datetime:
+    @traced
+    def get_expiration_date(type_: TokenTypes, settings: Settings = None) -> datetime:
+        settings = settings or get_settings()
         match type_:
             case TokenTypes.ACCESS:
-                return datetime.utcnow() + get_access_token_valid()
+                return datetime.utcnow() + settings.tokens.access_token_valid
             case TokenTypes.REFRESH:
-                return datetime.utcnow() + get_refresh_token_valid()
+                return datetime.utcnow() + settings.tokens.refresh_token_valid
 
     @staticmethod
+    @traced
     def generate_token(
             sub: str,
             scopes: [Scope.Types] = None,
             type_: TokenTypes = TokenTypes.ACCESS,
             secret: str = None,
             **params) -> str:
+        settings = get_settings()
         if not secret:
-            secret = get_app_secret()
+            secret = settings.app.secret
 
         if not scopes:
             scopes = []
 
-        return jwt.encode(
+        started = time.perf_counter()
+        token = jwt.encode(
             {
                 TOKEN_SUB: sub,
                 TOKEN_ISS: APP_NAME,
                 TOKEN_IAT: datetime.utcnow().timestamp(),
-                TOKEN_EXP: AuthenticationService.get_expiration_date(type_).timestamp(),
+                TOKEN_EXP: AuthenticationService.get_expiration_date(type_, settings).timestamp(),
                 TOKEN_TYPE: type_,
                 TOKEN_SCOPES: scopes,
                 **params
@@ -90,12 +101,16 @@ class AuthenticationService(BaseService):
             secret,
             algorithm=JWT_ALGORITHM
         )
+        JWT_ENCODE_DURATION.observe(time.perf_counter() - started)
+        return token
 
     @staticmethod
+    @traced
     def decode_token(token: str, required_type: TokenTypes = None, secret: str = None) -> dict:
         if not secret:
             secret = get_app_secret()
 
+        started = time.perf_counter()
         try:
             decoded_token = jwt.decode(
                 token,
@@ -103,7 +118,10 @@ class AuthenticationService(BaseService):
                 JWT_ALGORITHM
             )
         except InvalidTokenError as e:
+            JWT_ERRORS.inc()
             raise TokenError from e
+        finally:
+            JWT_DECODE_DURATION.observe(time.perf_counter() - started)
 
         if TOKEN_SUB not in decoded_token or TOKEN_EXP not in decoded_token:
             raise TokenError
@@ -120,6 +138,17 @@ class AuthenticationService(BaseService):
 
         return decoded_token
 
+    @traced
+    async def authenticate_client(self, client_id: int, client_secret: str) -> ClientPrincipal:
+        client = await ClientService(self.session).get_client_principal(client_id)
+        if not client:
+            raise AuthenticationError("Invalid client id")
+        if not client.check_secret(client_secret):
+            raise AuthenticationError("Invalid client secret")
+
+        return client
+
+    @traced
     async def create_password_pair(
             self,
             username: str,
@@ -138,14 +167,10 @@ class AuthenticationService(BaseService):
         if not await user_service.check_password(user, password):
             raise AuthenticationError("Incorrect password")
 
-        client_service = ClientService(self.session)
-        client = await client_service.get_client_by_secret(client_secret)
-        if not client:
-            raise AuthenticationError("Incorrect secret")
-        if client.id != client_id:
-            raise AuthenticationError("Incorrect client id")
-        if client.user.id != user.id:
+        client = await self.authenticate_client(client_id, client_secret)
+        if client.user_id != user.id:
             raise AuthenticationError("Wrong user")
+        await ClientService(self.session).mark_authenticated(client.id)
 
         access_token = self.generate_token(
             sub=user.username,
@@ -161,6 +186,7 @@ class AuthenticationService(BaseService):
 
         return access_token, refresh
 
+    @traced
     async def get_user_by_token(
             self,
             token: str,
@@ -180,7 +206,17 @@ class AuthenticationService(BaseService):
 
         return user
 
+    @traced
+    async def get_user_by_subject(self, subject: str) -> User:
+        """Loads the user of an already verified token"""
+        user = await UserService(self.session).get_user_by_username(username=subject)
+        if not user:
+            raise AuthenticationError("User not found")
+
+        return user
+
     @staticmethod
+    @traced
     def get_scopes(
             token: str,
             required_token_type=TokenTypes.ACCESS,
@@ -194,6 +230,7 @@ class AuthenticationService(BaseService):
 
         return decoded_token.get(TOKEN_SCOPES)
 
+    @traced
     async def authenticate_user(self, username: str, password: str) -> User:
         user_service = UserService(self.session)
         user = await user_service.get_user_by_username(username)
@@ -205,6 +242,7 @@ class AuthenticationService(BaseService):
         return user
 
     @staticmethod
+    @traced
     def get_auth_uri(client_id: int, redirect_uri: str) -> str:
         return querify_url(
             url=urljoin(get_frontend_url(), "login/"),
@@ -213,12 +251,14 @@ class AuthenticationService(BaseService):
         )
 
     @staticmethod
+    @traced
     def get_callback_uri(code: Code) -> str:
         return querify_url(
             url=code.redirect_uri,
             code=code.value
         )
 
+    @traced
     async def generate_code(self, client_id: int, redirect_uri: str) -> Code:
         code_service = CodeService(self.session)
         client_service = ClientService(self.session)
@@ -232,32 +272,46 @@ class AuthenticationService(BaseService):
             valid_until=datetime.now() + timedelta(minutes=get_authentication_code_valid_minutes())
         )
 
-    async def check_code(
+    @traced
+    async def _check_code(
             self,
             client_id: int,
             client_secret: str,
             redirect_uri: str,
             value: str,
             invalidate: bool = False
-    ) -> Code:
-        client_service = ClientService(self.session)
-        client = await client_service.get_client_by_secret(client_secret)
-
-        if not client:
-            raise AuthenticationError("Invalid client secret")
-        if client.id != client_id:
-            raise AuthenticationError("Invalid client id")
+    ) -> tuple[ClientPrincipal, Code]:
+        client = await self.authenticate_client(client_id, client_secret)
 
         code_service = CodeService(self.session)
-        code = await code_service.get_valid_code(value, client.id, redirect_uri)
+        if invalidate:
+            code = await code_service.take_valid_code(value, client.id, redirect_uri)
+        else:
+            code = await code_service.get_valid_code(value, client.id, redirect_uri)
         if not code:
             raise AuthenticationError("Invalid code")
 
-        if invalidate:
-            await code_service.set_is_used(code)
+        return client, code
 
+    @traced
+    async def check_code(
+            self,
+            client_id: int,
+            client_secret: str,
+            redirect_uri: str,
+            value: str,
+            invalidate: bool = False
+    ) -> Code:
+        _, code = await self._check_code(
+            client_id=client_id,
+            client_secret=client_secret,
+            redirect_uri=redirect_uri,
+            value=value,
+            invalidate=invalidate
+        )
         return code
 
+    @traced
     async def create_code_pair(
             self,
             client_id: int,
@@ -266,30 +320,32 @@ class AuthenticationService(BaseService):
             value: str,
             secret: str = None
     ) -> tuple[str, str]:
-        code = await self.check_code(
+        client, _ = await self._check_code(
             client_id=client_id,
             client_secret=client_secret,
             redirect_uri=redirect_uri,
             value=value,
             invalidate=True
         )
+        await ClientService(self.session).mark_authenticated(client.id)
         if not secret:
             secret = get_app_secret()
 
         access_token = self.generate_token(
-            sub=code.client.user.username,
+            sub=client.username,
             type_=TokenTypes.ACCESS,
-            scopes=[scope.type for scope in code.client.scopes],
+            scopes=list(client.scopes),
             secret=secret
         )
         refresh = self.generate_token(
-            sub=code.client.user.username,
+            sub=client.username,
             type_=TokenTypes.REFRESH,
             secret=secret
         )
 
         return access_token, refresh
 
+    @traced
     async def refresh_pair(
             self,
             refresh_token: str,
@@ -300,25 +356,20 @@ class AuthenticationService(BaseService):
         if not secret:
             secret = get_app_secret()
 
-        client_service = ClientService(self.session)
-        client = await client_service.get_client_by_secret(secret=client_secret)
-
-        if not client:
-            raise AuthenticationError("Invalid client secret")
-        if client.id != client_id:
-            raise AuthenticationError("Invalid client id")
+        client = await self.authenticate_client(client_id, client_secret)
 
         user = await self.get_user_by_token(
             token=refresh_token,
             required_token_type=TokenTypes.REFRESH,
             secret=secret
         )
+        await ClientService(self.session).mark_authenticated(client.id)
 
         access_token = self.generate_token(
             sub=user.username,
             type_=TokenTypes.ACCESS,
             secret=secret,
-            scopes=[scope.type for scope in client.scopes]
+            scopes=list(client.scopes)
         )
         refresh = self.generate_token(
             sub=user.username,
@@ -0,0 +1,207 @@
+import logging
+from enum import Enum
+from typing import Any, Optional, Hashable
+
+from cachetools import TTLCache
+
+from monitoring.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+
+class CacheBackends(str, Enum):
+    MEMORY = "memory"
+    REDIS = "redis"
+
+
+class Codec:
+    """Turns cached values into bytes for the backends shared between processes"""
+
+    def dumps(self, value: Any) -> bytes:
+        raise NotImplementedError
+
+    def loads(self, data: bytes) -> Any:
+        raise NotImplementedError
+
+
+class CacheBackend:
+    async def get_many(self, keys: list[Hashable]) -> list[Optional[Any]]:
+        raise NotImplementedError
+
+    async def set_many(self, items: dict[Hashable, Any]):
+        raise NotImplementedError
+
+    async def delete_many(self, keys: list[Hashable]):
+        raise NotImplementedError
+
+    async def clear(self):
+        raise NotImplementedError
+
+    def size(self) -> Optional[int]:
+        """Amount of entries when it is known without a round trip"""
+        return None
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Per process LRU with a ttl, values are kept as they are"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def get_many(self, keys: list[Hashable]) -> list[Optional[Any]]:
+        return [self.cache.get(key) for key in keys]
+
+    async def set_many(self, items: dict[Hashable, Any]):
+        self.cache.update(items)
+
+    async def delete_many(self, keys: list[Hashable]):
+        for key in keys:
+            self.cache.pop(key, None)
+
+    async def clear(self):
+        self.cache.clear()
+
+    def size(self) -> Optional[int]:
+        return len(self.cache)
+
+
+class RedisCacheBackend(CacheBackend):
+    """Entries shared by every worker and node connected to the same redis"""
+    # keys deleted per command when the cache is cleared
+    clear_batch_size = 500
+
+    def __init__(self, prefix: str, codec: Codec, ttl: float, client=None):
+        self.prefix = prefix
+        self.codec = codec
+        self.ttl_ms = int(ttl * 1000)
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is not None:
+            return self._client
+        from config import get_redis_client
+        return get_redis_client()
+
+    def get_key(self, key: Hashable) -> str:
+        return f"{self.prefix}{key}"
+
+    async def get_many(self, keys: list[Hashable]) -> list[Optional[Any]]:
+        values = await self.client.mget([self.get_key(key) for key in keys])
+        return [None if value is None else self.codec.loads(value) for value in values]
+
+    async def set_many(self, items: dict[Hashable, Any]):
+        # one round trip for the whole batch, MSET can not expire the keys
+        async with self.client.pipeline(transaction=False) as pipeline:
+            for key, value in items.items():
+                pipeline.set(self.get_key(key), self.codec.dumps(value), px=self.ttl_ms)
+            await pipeline.execute()
+
+    async def delete_many(self, keys: list[Hashable]):
+        await self.client.delete(*[self.get_key(key) for key in keys])
+
+    async def clear(self):
+        batch = []
+        async for key in self.client.scan_iter(match=f"{self.prefix}*", count=self.clear_batch_size):
+            batch.append(key)
+            if len(batch) >= self.clear_batch_size:
+                await self.client.delete(*batch)
+                batch = []
+        if batch:
+            await self.client.delete(*batch)
+
+
+class Cache:
+    """Front of a backend counting hits, a failing backend degrades to misses instead of failing requests"""
+
+    def __init__(self, name: str, backend: CacheBackend):
+        self.name = name
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: Hashable) -> Optional[Any]:
+        return (await self.get_many([key]))[0]
+
+    async def get_many(self, keys: list[Hashable]) -> list[Optional[Any]]:
+        if not keys:
+            return []
+        try:
+            values = await self.backend.get_many(keys)
+        except Exception:  # noqa
+            logger.exception("Reading the %s cache failed", self.name)
+            values = [None] * len(keys)
+
+        hits = sum(value is not None for value in values)
+        self.hits += hits
+        self.misses += len(values) - hits
+        return values
+
+    async def set(self, key: Hashable, value: Any):
+        await self.set_many({key: value})
+
+    async def set_many(self, items: dict[Hashable, Any]):
+        if not items:
+            return
+        try:
+            await self.backend.set_many(items)
+        except Exception:  # noqa
+            logger.exception("Writing the %s cache failed", self.name)
+
+    async def invalidate(self, key: Hashable):
+        await self.invalidate_many([key])
+
+    async def invalidate_many(self, keys: list[Hashable]):
+        # unlike the other calls a failure is raised, a stale entry would outlive the change
+        await self.backend.delete_many(keys)
+
+    async def clear(self):
+        await self.backend.clear()
+
+    @property
+    def size(self) -> Optional[int]:
+        return self.backend.size()
+
+    @property
+    def hit_ratio(self) -> float:
+        requests = self.hits + self.misses
+        return self.hits / requests if requests else 0.0
+
+
+def create_cache(name: str, codec: Codec, maxsize: int, ttl: float) -> Cache:
+    from config import get_cache_backend
+
+    if get_cache_backend() == CacheBackends.REDIS:
+        backend = RedisCacheBackend(f"cache:{name}:", codec, ttl)
+    else:
+        backend = MemoryCacheBackend(maxsize, ttl)
+
+    cache = Cache(name, backend)
+    instrumented_caches[name] = cache
+    return cache
+
+
+# caches reported by the cache metrics, by name
+instrumented_caches = {}
+
+
+def collect_cache_usage():
+    for name, cache in instrumented_caches.items():
+        yield (name, "hits"), cache.hits
+        yield (name, "misses"), cache.misses
+
+
+def collect_cache_entries():
+    for name, cache in instrumented_caches.items():
+        if cache.size is not None:
+            yield (name,), cache.size
+
+
+def collect_cache_hit_ratio():
+    for name, cache in instrumented_caches.items():
+        yield (name,), cache.hit_ratio
+
+
+registry.counter("cache_lookups_total", "Cache hits and misses", ("cache", "state"), collect_cache_usage)
+registry.gauge("cache_entries", "Entries currently cached", ("cache",), collect_cache_entries)
+registry.gauge("cache_hit_ratio", "Share of lookups served from the cache", ("cache",), collect_cache_hit_ratio)
@@ -1,12 +1,17 @@
 from datetime import datetime
+from typing import Optional
 
 from sqlalchemy import select
-from sqlalchemy.orm import subqueryload
+from sqlalchemy.orm import subqueryload, joinedload, selectinload
 
 from models.client import Client
 from models.scope import Scope
 from models.user import User
 from services.base import ModelService, UniquenessError, ServiceError
+from services.client_cache import ClientPrincipal, client_principal_cache
+from services.invalidation import notify_invalidation, invalidate_locally, Entities
+from services.last_authenticated_buffer import last_authenticated_buffer
+from services.scope_registry import scope_registry
 
 
 class InvalidScopeError(ServiceError):
@@ -47,10 +52,9 @@ class ClientService(ModelService):
             instance = await self._preload_relationships(instance)
 
         if scopes:
-            await self.set_scopes(
-                instance=instance,
-                scopes=scopes,
-            )
+            # nothing caches a client that did not exist yet, no invalidation is needed
+            await self._add_scopes(instance, scopes)
+            await self.session.commit()
 
         return instance
 
@@ -62,6 +66,24 @@ class ClientService(ModelService):
             client = await self._preload_relationships(client)
         return client
 
+    async def get_client_principal(self, client_id: int) -> Optional[ClientPrincipal]:
+        principal = await client_principal_cache.get(client_id)
+        if principal:
+            return principal
+
+        client = await self.session.scalar(
+            select(Client)
+            .where(Client.id == client_id)
+            .options(joinedload(self.model_cls.user))
+            .options(selectinload(self.model_cls.scopes))
+        )
+        if not client:
+            return None
+
+        principal = ClientPrincipal.from_client(client)
+        await client_principal_cache.set(principal.id, principal)
+        return principal
+
     async def set_last_authenticated(self, instance: Client, date: datetime = None, commit: bool = True) -> Client:
         if not date:
             date = datetime.now()
@@ -73,18 +95,34 @@ class ClientService(ModelService):
 
         return instance
 
-    async def set_scopes(self, instance: Client, scopes: [Scope.Types], commit=True) -> Client:
-        scope_instances = (await self.session.scalars(
-            select(Scope).where(Scope.type.in_(scopes))
-        )).all()
+    async def mark_authenticated(self, client_id: int, date: datetime = None):
+        """Buffered version of set_last_authenticated, the date is written by the periodic flush"""
+        if not date:
+            date = datetime.now()
 
-        if set([scope.type for scope in scope_instances]) != set(scopes):
+        last_authenticated_buffer.add(client_id, date)
+
+    async def _add_scopes(self, instance: Client, scopes: [Scope.Types]):
+        scope_instances = await scope_registry.get_scopes(self.session, scopes)
+        if scope_instances is None:
             raise InvalidScopeError
 
         for scope in scope_instances:
             instance.scopes.add(scope)
         self.session.add(instance)
+
+    async def set_scopes(self, instance: Client, scopes: [Scope.Types], commit=True) -> Client:
+        await self._add_scopes(instance, scopes)
+        await notify_invalidation(self.session, Entities.CLIENT, [instance.id])
         if commit:
             await self.session.commit()
+            await invalidate_locally(Entities.CLIENT, [instance.id])
 
         return instance
+
+    async def delete(self, instance_id: int, commit: bool = True):
+        await notify_invalidation(self.session, Entities.CLIENT, [instance_id])
+        await super().delete(instance_id, commit)
+        # without a commit the caller's transaction is still open, the listener evicts once it commits
+        if commit:
+            await invalidate_locally(Entities.CLIENT, [instance_id])
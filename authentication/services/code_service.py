@@ -1,23 +1,26 @@
 from datetime import datetime
+from typing import Optional
 
-from sqlalchemy import select
-from sqlalchemy.orm import subqueryload
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from config import get_code_storage
 from models.client import Client
 from models.code import Code
 from services.base import ModelService
+from services.code_storages import CodeStorage, CODE_STORAGE_MAP
 from services.utils import generate_authorization_code
 
 
 class CodeService(ModelService):
     model_cls = Code
 
-    async def _preload_relationships(self, instance: Code):
-        return await self.session.scalar(
-            select(Code)
-            .where(Code.id == instance.id)
-            .options(subqueryload(Code.client).subqueryload(Client.user))
-        )
+    def __init__(self, session: AsyncSession, storage: CodeStorage = None):
+        super().__init__(session)
+        if not storage:
+            storage = CODE_STORAGE_MAP[get_code_storage()](session)
+
+        self.storage = storage
+        self.model_cls = storage.model_cls
 
     async def create(
             self,
@@ -26,37 +29,26 @@ class CodeService(ModelService):
             valid_until: datetime,
             commit: bool = True,
             **kwargs) -> Code:
-        instance = Code(
+        return await self.storage.create(
             client_id=client.id,
             redirect_uri=redirect_uri,
             valid_until=valid_until,
             value=generate_authorization_code(),
+            commit=commit,
             **kwargs
         )
-        self.session.add(instance)
-        if commit:
-            await self.session.commit()
-            instance = await self._preload_relationships(instance)
-        return instance
+
+    async def get_by_id(self, id_: int) -> Optional[Code]:
+        return await self.storage.get_by_id(id_)
+
+    async def delete(self, instance_id: int, commit: bool = True):
+        await self.storage.delete(instance_id, commit=commit)
 
     async def set_is_used(self, instance: Code, is_used: bool = True, commit: bool = True) -> Code:
-        instance.is_used = is_used
-        self.session.add(instance)
-        if commit:
-            await self.session.commit()
-
-        return instance
-
-    async def get_valid_code(self, value: str, client_id: int, redirect_uri: str) -> Code:
-        code = await self.session.scalar(
-            select(Code).where(
-                Code.value == value,
-                Code.client_id == client_id,
-                Code.redirect_uri == redirect_uri,
-                Code.is_used == False,  # noqa E712
-                Code.valid_until > datetime.now()
-            )
-        )
-        if code:
-            code = await self._preload_relationships(code)
-        return code
+        return await self.storage.set_is_used(instance, is_used=is_used, commit=commit)
+
+    async def get_valid_code(self, value: str, client_id: int, redirect_uri: str) -> Optional[Code]:
+        return await self.storage.get_valid(value, client_id, redirect_uri)
+
+    async def take_valid_code(self, value: str, client_id: int, redirect_uri: str) -> Optional[Code]:
+        return await self.storage.take_valid(value, client_id, redirect_uri)
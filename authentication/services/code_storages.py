@@ -0,0 +1,203 @@
+from datetime import datetime, timedelta
+from enum import Enum
+from itertools import count
+from typing import Optional
+
+from cachetools import TTLCache
+from sqlalchemy import select, update, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import subqueryload
+
+from env import get_authentication_code_valid_minutes, get_code_storage_max_size
+from models.client import Client
+from models.code import Code, UnloggedCode
+
+
+class CodeStorages(str, Enum):
+    TABLE = "table"
+    UNLOGGED_TABLE = "unlogged_table"
+    MEMORY = "memory"
+
+
+class CodeStorage:
+    model_cls = Code
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def create(self, commit: bool = True, **kwargs) -> Code:
+        raise NotImplementedError
+
+    async def get_by_id(self, id_: int) -> Optional[Code]:
+        raise NotImplementedError
+
+    async def get_valid(self, value: str, client_id: int, redirect_uri: str) -> Optional[Code]:
+        raise NotImplementedError
+
+    async def take_valid(self, value: str, client_id: int, redirect_uri: str, commit: bool = True) -> Optional[Code]:
+        """Atomically marks a valid code as used and returns it, a code can be taken only once"""
+        raise NotImplementedError
+
+    async def set_is_used(self, instance: Code, is_used: bool = True, commit: bool = True) -> Code:
+        raise NotImplementedError
+
+    async def delete(self, instance_id: int, commit: bool = True):
+        raise NotImplementedError
+
+
+class TableCodeStorage(CodeStorage):
+    def _valid_clause(self, value: str, client_id: int, redirect_uri: str) -> tuple:
+        now = datetime.now()
+        return (
+            # codes can't outlive the validity window, the bound lets postgres prune older partitions
+            self.model_cls.created_at > now - timedelta(minutes=get_authentication_code_valid_minutes()),
+            self.model_cls.value == value,
+            self.model_cls.client_id == client_id,
+            self.model_cls.redirect_uri == redirect_uri,
+            self.model_cls.is_used == False,  # noqa E712
+            self.model_cls.valid_until > now
+        )
+
+    async def _preload_relationships(self, instance: Code) -> Code:
+        return await self.session.scalar(
+            select(self.model_cls)
+            .where(self.model_cls.id == instance.id)
+            .options(subqueryload(self.model_cls.client).subqueryload(Client.user))
+        )
+
+    async def create(self, commit: bool = True, **kwargs) -> Code:
+        instance = self.model_cls(**kwargs)
+        self.session.add(instance)
+        if commit:
+            await self.session.commit()
+            instance = await self._preload_relationships(instance)
+        return instance
+
+    async def get_by_id(self, id_: int) -> Optional[Code]:
+        return await self.session.scalar(
+            select(self.model_cls).where(self.model_cls.id == id_)
+        )
+
+    async def get_valid(self, value: str, client_id: int, redirect_uri: str) -> Optional[Code]:
+        code = await self.session.scalar(
+            select(self.model_cls).where(
+                *self._valid_clause(value, client_id, redirect_uri)
+            )
+        )
+        if code:
+            code = await self._preload_relationships(code)
+        return code
+
+    async def take_valid(self, value: str, client_id: int, redirect_uri: str, commit: bool = True) -> Optional[Code]:
+        code = await self.session.scalar(
+            update(self.model_cls)
+            .where(*self._valid_clause(value, client_id, redirect_uri))
+            .values(is_used=True)
+            .returning(self.model_cls)
+        )
+        if commit:
+            await self.session.commit()
+        return code
+
+    async def set_is_used(self, instance: Code, is_used: bool = True, commit: bool = True) -> Code:
+        instance.is_used = is_used
+        self.session.add(instance)
+        if commit:
+            await self.session.commit()
+
+        return instance
+
+    async def delete(self, instance_id: int, commit: bool = True):
+        await self.session.execute(
+            delete(self.model_cls).where(self.model_cls.id == instance_id)
+        )
+        if commit:
+            await self.session.commit()
+
+
+class UnloggedTableCodeStorage(TableCodeStorage):
+    model_cls = UnloggedCode
+
+
+memory_codes = None
+memory_code_ids = count(1)
+
+
+def get_memory_codes() -> TTLCache:
+    global memory_codes
+    if memory_codes is None:
+        memory_codes = TTLCache(
+            maxsize=get_code_storage_max_size(),
+            ttl=get_authentication_code_valid_minutes() * 60
+        )
+    return memory_codes
+
+
+class MemoryCodeStorage(CodeStorage):
+    """
+    Keeps codes in the worker memory, codes are not shared between workers
+    and are lost on a restart, relationships of returned codes are not loaded
+    """
+
+    def __init__(self, session: AsyncSession):
+        super().__init__(session)
+        self.codes = get_memory_codes()
+
+    @staticmethod
+    def _is_valid(code: Optional[Code], client_id: int, redirect_uri: str) -> bool:
+        return code is not None \
+            and not code.is_used \
+            and code.client_id == client_id \
+            and code.redirect_uri == redirect_uri \
+            and code.valid_until > datetime.now()
+
+    async def create(self, commit: bool = True, **kwargs) -> Code:
+        instance = Code(
+            id=next(memory_code_ids),
+            is_used=False,
+            created_at=datetime.now(),
+            **kwargs
+        )
+        self.codes[instance.value] = instance
+        return instance
+
+    async def get_by_id(self, id_: int) -> Optional[Code]:
+        for code in list(self.codes.values()):
+            if code.id == id_:
+                return code
+        return None
+
+    async def get_valid(self, value: str, client_id: int, redirect_uri: str) -> Optional[Code]:
+        code = self.codes.get(value)
+        if self._is_valid(code, client_id, redirect_uri):
+            return code
+        return None
+
+    async def take_valid(self, value: str, client_id: int, redirect_uri: str, commit: bool = True) -> Optional[Code]:
+        # no awaits between the check and the removal, so the event loop can't hand the code out twice
+        code = self.codes.get(value)
+        if not self._is_valid(code, client_id, redirect_uri):
+            return None
+        del self.codes[value]
+        code.is_used = True
+        return code
+
+    async def set_is_used(self, instance: Code, is_used: bool = True, commit: bool = True) -> Code:
+        instance.is_used = is_used
+        if is_used:
+            self.codes.pop(instance.value, None)
+        else:
+            self.codes[instance.value] = instance
+        return instance
+
+    async def delete(self, instance_id: int, commit: bool = True):
+        code = await self.get_by_id(instance_id)
+        if code:
+            self.codes.pop(code.value, None)
+
+
+CODE_STORAGE_MAP = {
+    CodeStorages.TABLE: TableCodeStorage,
+    CodeStorages.UNLOGGED_TABLE: UnloggedTableCodeStorage,
+    CodeStorages.MEMORY: MemoryCodeStorage
+}
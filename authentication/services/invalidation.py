@@ -0,0 +1,124 @@
+import asyncio
+import logging
+from collections import defaultdict
+from enum import Enum
+from typing import Optional
+
+import asyncpg
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from env import get_postgres_host, get_postgres_port, get_postgres_user, get_postgres_password, get_postgres_db
+from services.cache import Cache
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "cache_invalidation"
+# notifications are limited to 8000 bytes, larger batches are split
+MAX_IDS_PER_NOTIFICATION = 500
+
+
+class Entities(str, Enum):
+    USER = "user"
+    CLIENT = "client"
+
+
+# caches holding entries of an entity, keyed by the entity id
+invalidated_caches: dict[str, list[Cache]] = defaultdict(list)
+
+
+def register_invalidated_cache(entity: Entities, cache: Cache):
+    invalidated_caches[entity].append(cache)
+
+
+async def invalidate_locally(entity: str, ids: list[int]):
+    if not ids:
+        return
+    for cache in invalidated_caches.get(entity, ()):
+        await cache.invalidate_many(ids)
+
+
+async def clear_locally():
+    for caches in invalidated_caches.values():
+        for cache in caches:
+            await cache.clear()
+
+
+def format_payload(entity: Entities, ids: list[int]) -> str:
+    return f"{entity.value}:{','.join(str(id_) for id_ in ids)}"
+
+
+def parse_payload(payload: str) -> Optional[tuple[str, list[int]]]:
+    entity, _, ids = payload.partition(":")
+    try:
+        return entity, [int(id_) for id_ in ids.split(",")]
+    except ValueError:
+        return None
+
+
+async def notify_invalidation(session: AsyncSession, entity: Entities, ids: list[int]):
+    """
+    Call it inside the transaction making the change, a rolled back change notifies nobody.
+    The listeners evict once the transaction commits, the worker making the change calls invalidate_locally
+    after its commit, evicting earlier would let a concurrent request cache the old rows again
+    """
+    if not ids:
+        return
+    for start in range(0, len(ids), MAX_IDS_PER_NOTIFICATION):
+        payload = format_payload(entity, ids[start:start + MAX_IDS_PER_NOTIFICATION])
+        await session.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": INVALIDATION_CHANNEL, "payload": payload}
+        )
+
+
+class InvalidationListener:
+    """LISTENs on a dedicated connection outside of the pool and evicts the entries changed by any worker"""
+
+    def __init__(self, reconnect_seconds: float = 5):
+        self.reconnect_seconds = reconnect_seconds
+        self.connected = asyncio.Event()
+        self.connection: Optional[asyncpg.Connection] = None
+        self.tasks: set[asyncio.Task] = set()
+
+    @staticmethod
+    async def connect() -> asyncpg.Connection:
+        return await asyncpg.connect(
+            host=get_postgres_host(),
+            port=int(get_postgres_port()),
+            user=get_postgres_user(),
+            password=get_postgres_password(),
+            database=get_postgres_db()
+        )
+
+    def on_notification(self, connection, pid: int, channel: str, payload: str):
+        parsed = parse_payload(payload)
+        if not parsed:
+            logger.warning("Ignored invalidation payload %r", payload)
+            return
+        task = asyncio.get_running_loop().create_task(invalidate_locally(*parsed))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def listen(self):
+        self.connection = connection = await self.connect()
+        terminated = asyncio.Event()
+        connection.add_termination_listener(lambda _: terminated.set())
+        try:
+            await connection.add_listener(INVALIDATION_CHANNEL, self.on_notification)
+            # changes made while no connection was listening were missed
+            await clear_locally()
+            self.connected.set()
+            await terminated.wait()
+            logger.warning("Cache invalidation listener lost its connection")
+        finally:
+            self.connected.clear()
+            await connection.close(timeout=self.reconnect_seconds)
+
+    async def run(self):
+        while True:
+            try:
+                await self.listen()
+            except (OSError, asyncio.TimeoutError, asyncpg.PostgresError):
+                logger.exception("Cache invalidation listener lost its connection")
+            await asyncio.sleep(self.reconnect_seconds)
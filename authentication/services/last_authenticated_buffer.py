@@ -0,0 +1,75 @@
+import asyncio
+import logging
+from datetime import datetime
+
+from sqlalchemy import DateTime, Integer, column, update, values, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import get_session
+from models.client import Client
+
+logger = logging.getLogger(__name__)
+
+
+class LastAuthenticatedBuffer:
+    """
+    Write-behind buffer for Client.last_authenticated,
+    keeps the latest date of every client and writes them all with a single UPDATE
+    """
+
+    def __init__(self):
+        self.pending: dict[int, datetime] = {}
+
+    def __len__(self):
+        return len(self.pending)
+
+    def add(self, client_id: int, date: datetime):
+        current = self.pending.get(client_id)
+        if current is None or current < date:
+            self.pending[client_id] = date
+
+    async def flush(self, session: AsyncSession) -> int:
+        if not self.pending:
+            return 0
+
+        pending, self.pending = self.pending, {}
+        dates = values(
+            column("id", Integer),
+            column("last_authenticated", DateTime),
+            name="dates"
+        ).data(list(pending.items()))
+
+        try:
+            await session.execute(
+                update(Client)
+                .where(
+                    Client.id == dates.c.id,
+                    or_(Client.last_authenticated.is_(None), Client.last_authenticated < dates.c.last_authenticated)
+                )
+                .values(last_authenticated=dates.c.last_authenticated)
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+        except Exception:
+            for client_id, date in pending.items():
+                self.add(client_id, date)
+            raise
+
+        return len(pending)
+
+
+last_authenticated_buffer = LastAuthenticatedBuffer()
+
+
+async def flush_last_authenticated():
+    async with get_session() as session:
+        return await last_authenticated_buffer.flush(session)
+
+
+async def run_last_authenticated_flush(interval_seconds: float):
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await flush_last_authenticated()
+        except Exception:  # noqa
+            logger.exception("Flushing last authenticated dates failed")
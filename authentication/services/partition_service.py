@@ -0,0 +1,230 @@
+import asyncio
+import logging
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from enum import Enum
+from typing import Optional
+
+from sqlalchemy import Connection, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import get_session
+from env import get_code_partition_interval, get_code_partitions_ahead, get_code_partitions_retained
+from models.code import Code
+from services.base import BaseService
+
+logger = logging.getLogger(__name__)
+
+# arbitrary key, serializes partition maintenance between workers
+PARTITION_LOCK_KEY = 720_260_027
+
+
+class PartitionIntervals(str, Enum):
+    HOUR = "hour"
+    DAY = "day"
+
+
+INTERVAL_MAP = {
+    PartitionIntervals.HOUR: (timedelta(hours=1), "%Y%m%d%H"),
+    PartitionIntervals.DAY: (timedelta(days=1), "%Y%m%d"),
+}
+# length of the name suffix of each interval, strptime would also accept a daily suffix as an hourly one
+SUFFIX_LENGTHS = {
+    PartitionIntervals.HOUR: 10,
+    PartitionIntervals.DAY: 8,
+}
+RANGE_BOUND_REGEX = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+
+@dataclass
+class PartitionBounds:
+    name: str
+    # None for the default partition
+    start: Optional[datetime]
+    end: Optional[datetime]
+
+    def overlaps(self, start: datetime, end: datetime) -> bool:
+        return self.start is not None and self.start < end and start < self.end
+
+
+def get_partition_start(moment: datetime, interval: PartitionIntervals) -> datetime:
+    if interval == PartitionIntervals.HOUR:
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def get_partition_name(table: str, start: datetime, interval: PartitionIntervals) -> str:
+    _, name_format = INTERVAL_MAP[interval]
+    return f"{table}_p{start.strftime(name_format)}"
+
+
+def parse_partition_start(table: str, name: str, interval: PartitionIntervals) -> datetime | None:
+    _, name_format = INTERVAL_MAP[interval]
+    prefix = f"{table}_p"
+    if not name.startswith(prefix) or len(name) - len(prefix) != SUFFIX_LENGTHS[interval]:
+        return None
+    try:
+        return datetime.strptime(name[len(prefix):], name_format)
+    except ValueError:
+        return None
+
+
+def get_partitions(connection: Connection, table: str) -> list[str]:
+    return list(connection.scalars(
+        text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON pg_inherits.inhparent = parent.oid "
+            "JOIN pg_class child ON pg_inherits.inhrelid = child.oid "
+            "WHERE parent.relname = :table"
+        ),
+        {"table": table}
+    ))
+
+
+def get_partition_bounds(connection: Connection, table: str) -> list[PartitionBounds]:
+    """The real bounds of the partitions, whatever interval created them"""
+    rows = connection.execute(
+        text(
+            "SELECT child.relname, pg_get_expr(child.relpartbound, child.oid) FROM pg_inherits "
+            "JOIN pg_class parent ON pg_inherits.inhparent = parent.oid "
+            "JOIN pg_class child ON pg_inherits.inhrelid = child.oid "
+            "WHERE parent.relname = :table"
+        ),
+        {"table": table}
+    )
+    bounds = []
+    for name, expression in rows:
+        match = RANGE_BOUND_REGEX.search(expression)
+        if match:
+            bounds.append(PartitionBounds(name, datetime.fromisoformat(match[1]), datetime.fromisoformat(match[2])))
+        else:
+            bounds.append(PartitionBounds(name, None, None))
+    return bounds
+
+
+def create_partition(
+        connection: Connection,
+        table: str,
+        name: str,
+        start: datetime,
+        end: datetime,
+        default: str = None):
+    """Rows of the range already stored in the default partition are moved into the new one"""
+    parameters = {"start": start, "end": end}
+    # the tables are partitioned on created_at
+    in_range = "created_at >= :start AND created_at < :end"
+    moved = 0
+    if default and connection.scalar(text(f"SELECT EXISTS (SELECT FROM {default} WHERE {in_range})"), parameters):
+        connection.execute(text(f"CREATE TEMPORARY TABLE moved_rows (LIKE {table}) ON COMMIT DROP"))
+        moved = connection.execute(text(
+            f"WITH moved AS (DELETE FROM {default} WHERE {in_range} RETURNING *) "
+            f"INSERT INTO moved_rows SELECT * FROM moved"
+        ), parameters).rowcount
+
+    connection.execute(text(
+        f"CREATE TABLE {name} PARTITION OF {table} "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    ))
+
+    if moved:
+        connection.execute(text(f"INSERT INTO {table} SELECT * FROM moved_rows"))
+        connection.execute(text("DROP TABLE moved_rows"))
+        logger.warning("Moved %s rows of %s from %s into %s", moved, table, default, name)
+
+
+def create_partitions(
+        connection: Connection,
+        table: str,
+        interval: PartitionIntervals,
+        ahead: int,
+        now: datetime = None) -> list[str]:
+    if not now:
+        now = datetime.now()
+
+    step, _ = INTERVAL_MAP[interval]
+    bounds = get_partition_bounds(connection, table)
+    default = next((partition.name for partition in bounds if partition.start is None), None)
+    start = get_partition_start(now, interval)
+    created = []
+
+    for _ in range(ahead + 1):
+        # ranges of partitions created with another interval are left as they are
+        if not any(partition.overlaps(start, start + step) for partition in bounds):
+            name = get_partition_name(table, start, interval)
+            create_partition(connection, table, name, start, start + step, default)
+            created.append(name)
+        start += step
+
+    return created
+
+
+def drop_partitions(
+        connection: Connection,
+        table: str,
+        interval: PartitionIntervals,
+        retained: int,
+        now: datetime = None) -> list[str]:
+    if not now:
+        now = datetime.now()
+
+    step, _ = INTERVAL_MAP[interval]
+    oldest_start = get_partition_start(now, interval) - step * retained
+    dropped = []
+
+    for partition in get_partition_bounds(connection, table):
+        if partition.end is not None and partition.end <= oldest_start:
+            connection.execute(text(f"DROP TABLE {partition.name}"))
+            dropped.append(partition.name)
+
+    return dropped
+
+
+def maintain_code_partitions(connection: Connection, now: datetime = None) -> tuple[list[str], list[str]]:
+    """Creates the current and future partitions of the codes table and drops expired ones"""
+    interval = PartitionIntervals(get_code_partition_interval())
+    connection.execute(
+        text("SELECT pg_advisory_xact_lock(:key)"),
+        {"key": PARTITION_LOCK_KEY}
+    )
+
+    created = create_partitions(
+        connection=connection,
+        table=Code.__tablename__,
+        interval=interval,
+        ahead=get_code_partitions_ahead(),
+        now=now
+    )
+    dropped = drop_partitions(
+        connection=connection,
+        table=Code.__tablename__,
+        interval=interval,
+        retained=get_code_partitions_retained(),
+        now=now
+    )
+    return created, dropped
+
+
+class CodePartitionService(BaseService):
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def maintain(self, now: datetime = None, commit: bool = True) -> tuple[list[str], list[str]]:
+        created, dropped = await self.session.run_sync(
+            lambda session: maintain_code_partitions(session.connection(), now)
+        )
+        if commit:
+            await self.session.commit()
+        return created, dropped
+
+
+async def run_code_partition_maintenance(interval_seconds: int):
+    while True:
+        try:
+            async with get_session() as session:
+                created, dropped = await CodePartitionService(session).maintain()
+            if created or dropped:
+                logger.info("Code partitions created: %s, dropped: %s", created, dropped)
+        except Exception:  # noqa
+            logger.exception("Code partition maintenance failed")
+        await asyncio.sleep(interval_seconds)
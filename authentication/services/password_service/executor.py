@@ -0,0 +1,57 @@
+import asyncio
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Optional
+
+from env import get_password_hashing_threads
+from monitoring.metrics import PASSWORD_HASH_DURATION, PASSWORD_HASH_QUEUE_WAIT
+
+executor: Optional[ThreadPoolExecutor] = None
+# hashing calls submitted and not finished yet, read by the readiness check
+in_flight = 0
+
+
+def get_hashing_executor() -> ThreadPoolExecutor:
+    """Created on first use so that forked workers never inherit the threads of the parent"""
+    global executor
+    if not executor:
+        executor = ThreadPoolExecutor(get_password_hashing_threads(), thread_name_prefix="password-hashing")
+    return executor
+
+
+def shutdown_hashing_executor():
+    global executor
+    if executor:
+        executor.shutdown(wait=True)
+        executor = None
+
+
+def get_hashing_saturation() -> float:
+    return in_flight / get_password_hashing_threads()
+
+
+def timed_call(fn: Callable, submitted: float, **kwargs):
+    started = time.perf_counter()
+    result = fn(**kwargs)
+    return result, started - submitted, time.perf_counter() - started
+
+
+async def run_hashing(fn: Callable, **kwargs):
+    """Runs a hashing call in the pool, timings are recorded back on the event loop"""
+    global in_flight
+    loop = asyncio.get_running_loop()
+    # the context carries the current trace span into the hashing thread
+    context = contextvars.copy_context()
+    in_flight += 1
+    try:
+        result, queue_wait, duration = await loop.run_in_executor(
+            get_hashing_executor(),
+            partial(context.run, timed_call, fn, time.perf_counter(), **kwargs)
+        )
+    finally:
+        in_flight -= 1
+    PASSWORD_HASH_QUEUE_WAIT.observe(queue_wait)
+    PASSWORD_HASH_DURATION.observe(duration)
+    return result
@@ -2,6 +2,7 @@ import os
 from enum import Enum
 from typing import List
 
+from monitoring.tracing import traced
 from services.base import BaseService
 from services.password_service.algorithms import get_plain_hash, get_sha256_hash
 from services.utils import encode64, decode64
@@ -36,6 +37,7 @@ class PasswordService(BaseService):
 
         return algorithm_fn
 
+    @traced
     def get_hash(
             self,
             plain_password: str,
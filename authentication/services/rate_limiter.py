@@ -0,0 +1,151 @@
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from enum import Enum
+
+from env import get_rate_limit_max_keys
+
+PERIODS = {
+    "second": 1,
+    "minute": 60,
+    "hour": 60 * 60
+}
+
+
+class RateLimitBackends(str, Enum):
+    MEMORY = "memory"
+    REDIS = "redis"
+
+
+@dataclass(frozen=True)
+class Rate:
+    """Bucket of capacity tokens refilled evenly over the period"""
+    capacity: int
+    period: float
+
+    @classmethod
+    def parse(cls, value: str) -> "Rate":
+        amount, period = value.split("/")
+        return cls(capacity=int(amount), period=PERIODS[period])
+
+    @property
+    def refill(self) -> float:
+        return self.capacity / self.period
+
+
+@dataclass(frozen=True)
+class BucketState:
+    allowed: bool
+    limit: int
+    remaining: int
+    # seconds until the bucket is full again
+    reset_after: float
+    # seconds until the next token, zero if the request was allowed
+    retry_after: float
+
+
+def get_bucket_state(allowed: bool, tokens: float, rate: Rate) -> BucketState:
+    return BucketState(
+        allowed=allowed,
+        limit=rate.capacity,
+        remaining=math.floor(tokens),
+        reset_after=(rate.capacity - tokens) / rate.refill,
+        retry_after=0 if allowed else max(1 - tokens, 0) / rate.refill
+    )
+
+
+def refill_tokens(tokens: float, updated: float, rate: Rate, now: float) -> float:
+    return min(rate.capacity, tokens + max(now - updated, 0) * rate.refill)
+
+
+class RateLimitBackend:
+    async def take(self, key: str, rate: Rate, now: float = None) -> BucketState:
+        return (await self.take_all([key], rate, now))[0]
+
+    async def take_all(self, keys: list[str], rate: Rate, now: float = None) -> list[BucketState]:
+        """Takes a token from every bucket, or from none of them when one is empty"""
+        raise NotImplementedError
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """Per process buckets, the least recently used ones are evicted past max_keys"""
+
+    def __init__(self, max_keys: int = None):
+        self.max_keys = max_keys or get_rate_limit_max_keys()
+        self.buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    async def take_all(self, keys: list[str], rate: Rate, now: float = None) -> list[BucketState]:
+        now = time.monotonic() if now is None else now
+        levels = [refill_tokens(*self.buckets.pop(key, (rate.capacity, now)), rate, now) for key in keys]
+        allowed = all(tokens >= 1 for tokens in levels)
+
+        states = []
+        for key, tokens in zip(keys, levels):
+            if allowed:
+                tokens -= 1
+            self.buckets[key] = (tokens, now)
+            states.append(get_bucket_state(allowed, tokens, rate))
+
+        while len(self.buckets) > self.max_keys:
+            self.buckets.popitem(last=False)
+        return states
+
+
+# Same arithmetic as the memory backend, run atomically so every worker shares the buckets
+TAKE_TOKENS_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local refill = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+
+local levels = {}
+local allowed = 1
+for index, key in ipairs(KEYS) do
+    local bucket = redis.call("HMGET", key, "tokens", "updated")
+    local tokens = tonumber(bucket[1]) or capacity
+    local updated = tonumber(bucket[2]) or now
+
+    tokens = math.min(capacity, tokens + math.max(now - updated, 0) * refill)
+    if tokens < 1 then
+        allowed = 0
+    end
+    levels[index] = tokens
+end
+
+local result = {allowed}
+for index, key in ipairs(KEYS) do
+    local tokens = levels[index] - allowed
+    redis.call("HSET", key, "tokens", tostring(tokens), "updated", tostring(now))
+    redis.call("PEXPIRE", key, math.ceil(capacity / refill * 1000))
+    result[index + 1] = tostring(tokens)
+end
+return result
+"""
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """Buckets shared by every worker connected to the same redis"""
+    key_prefix = "rate_limit:"
+
+    def __init__(self, client=None):
+        if client is None:
+            from config import get_redis_client
+            client = get_redis_client()
+
+        self.client = client
+        self.script = client.register_script(TAKE_TOKENS_SCRIPT)
+
+    async def take_all(self, keys: list[str], rate: Rate, now: float = None) -> list[BucketState]:
+        # wall clock, the buckets are shared across hosts
+        now = time.time() if now is None else now
+        allowed, *levels = await self.script(
+            keys=[self.key_prefix + key for key in keys],
+            args=[rate.capacity, rate.refill, now]
+        )
+        return [get_bucket_state(bool(allowed), float(tokens), rate) for tokens in levels]
+
+
+RATE_LIMIT_BACKEND_MAP = {
+    RateLimitBackends.MEMORY: MemoryRateLimitBackend,
+    RateLimitBackends.REDIS: RedisRateLimitBackend
+}
@@ -0,0 +1,84 @@
+from typing import Optional
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+
+from models.scope import Scope
+
+
+class ScopeRegistry:
+    """
+    In-memory map of scope types and ids, loaded once on startup.
+    The maps are replaced rather than mutated, so readers never see a partial update
+    """
+
+    def __init__(self):
+        self.ids_by_type: dict[str, int] = {}
+        self.types_by_id: dict[int, str] = {}
+        self.revision: Optional[str] = None
+        self.is_loaded = False
+
+    @staticmethod
+    async def get_revision(session: AsyncSession) -> Optional[str]:
+        return await session.scalar(text("SELECT version_num FROM alembic_version"))
+
+    def _set(self, ids_by_type: dict[str, int]):
+        self.ids_by_type = ids_by_type
+        self.types_by_id = {id_: type_ for type_, id_ in ids_by_type.items()}
+
+    async def load(self, session: AsyncSession):
+        scopes = (await session.execute(select(Scope.type, Scope.id))).all()
+        self._set({type_: id_ for type_, id_ in scopes})
+        self.revision = await self.get_revision(session)
+        self.is_loaded = True
+
+    async def ensure_loaded(self, session: AsyncSession):
+        if not self.is_loaded:
+            await self.load(session)
+
+    async def refresh_if_migrated(self, session: AsyncSession) -> bool:
+        """Reloads the registry if the schema was migrated since it was loaded"""
+        if await self.get_revision(session) == self.revision:
+            return False
+
+        await self.load(session)
+        return True
+
+    def add(self, id_: int, type_: str):
+        self._set({**self.ids_by_type, type_: id_})
+
+    def remove(self, id_: int):
+        self._set({type_: scope_id for type_, scope_id in self.ids_by_type.items() if scope_id != id_})
+
+    def get_id(self, type_: str) -> Optional[int]:
+        return self.ids_by_type.get(type_)
+
+    def get_type(self, id_: int) -> Optional[str]:
+        return self.types_by_id.get(id_)
+
+    @staticmethod
+    async def _attach(session: AsyncSession, id_: int, type_: str) -> Scope:
+        # merging a detached instance without loading returns the session's own instance, no SELECT is issued
+        scope = Scope(id=id_, type=type_)
+        make_transient_to_detached(scope)
+        return await session.merge(scope, load=False)
+
+    async def get_scope(self, session: AsyncSession, type_: str) -> Optional[Scope]:
+        scopes = await self.get_scopes(session, [type_])
+        return scopes[0] if scopes else None
+
+    async def get_scopes(self, session: AsyncSession, types: list[str]) -> Optional[list[Scope]]:
+        """Returns session bound scopes of the given types, None if any of the types is unknown"""
+        await self.ensure_loaded(session)
+
+        if any(type_ not in self.ids_by_type for type_ in types):
+            if not await self.refresh_if_migrated(session):
+                return None
+            if any(type_ not in self.ids_by_type for type_ in types):
+                return None
+
+        return [await self._attach(session, self.ids_by_type[type_], type_) for type_ in set(types)]
+
+
+scope_registry = ScopeRegistry()
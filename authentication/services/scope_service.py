@@ -2,6 +2,7 @@ from sqlalchemy import select
 
 from models.scope import Scope
 from services.base import ModelService, UniquenessError
+from services.scope_registry import scope_registry
 
 
 class ScopeService(ModelService):
@@ -18,9 +19,13 @@ class ScopeService(ModelService):
         self.session.add(instance)
         if commit:
             await self.session.commit()
+            scope_registry.add(instance.id, instance.type)
         return instance
 
+    async def delete(self, instance_id: int, commit: bool = True):
+        await super().delete(instance_id, commit)
+        if commit:
+            scope_registry.remove(instance_id)
+
     async def get_by_type(self, type_: str):
-        return await self.session.scalar(
-            select(self.model_cls).where(self.model_cls.type == type_)
-        )
+        return await scope_registry.get_scope(self.session, type_)
@@ -0,0 +1,50 @@
+import time
+from typing import Optional, Hashable
+
+from cachetools import TLRUCache
+
+from env import get_token_cache_max_size, get_token_cache_ttl_seconds
+from services.cache import instrumented_caches
+
+
+class TokenClaimsCache:
+    """Decoded claims by key, each entry expires with its token or after the ttl, whichever comes first"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.ttl = ttl
+        self.cache = TLRUCache(maxsize=maxsize, ttu=self.get_expiration, timer=time.time)
+        self.hits = 0
+        self.misses = 0
+
+    def get_expiration(self, key: Hashable, claims: dict, now: float) -> float:
+        return min(claims["exp"], now + self.ttl)
+
+    def get(self, key: Hashable) -> Optional[dict]:
+        claims = self.cache.get(key)
+        if claims is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return claims
+
+    def set(self, key: Hashable, claims: dict):
+        self.cache[key] = claims
+
+    def clear(self):
+        self.cache.clear()
+
+    @property
+    def size(self) -> int:
+        return len(self.cache)
+
+    @property
+    def hit_ratio(self) -> float:
+        requests = self.hits + self.misses
+        return self.hits / requests if requests else 0.0
+
+
+token_claims_cache = TokenClaimsCache(
+    maxsize=get_token_cache_max_size(),
+    ttl=get_token_cache_ttl_seconds()
+)
+instrumented_caches["token_claims"] = token_claims_cache
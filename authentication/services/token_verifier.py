@@ -0,0 +1,57 @@
+from dataclasses import dataclass, field
+
+from env import get_app_secret
+from monitoring.tracing import traced
+from services.authentication_serivce import AuthenticationService, TokenTypes, TOKEN_SUB, TOKEN_SCOPES, \
+    TOKEN_TYPE, TOKEN_EXP
+from services.token_cache import token_claims_cache
+
+
+@dataclass(frozen=True)
+class TokenPrincipal:
+    """Validated claims of a token, decoded once and shared by everything handling the request"""
+    subject: str
+    scopes: frozenset[str]
+    type: str
+    expires_at: float
+    claims: dict = field(compare=False, repr=False)
+
+    @classmethod
+    def from_claims(cls, claims: dict) -> "TokenPrincipal":
+        return cls(
+            subject=claims[TOKEN_SUB],
+            scopes=frozenset(claims[TOKEN_SCOPES]),
+            type=claims.get(TOKEN_TYPE),
+            expires_at=claims[TOKEN_EXP],
+            claims=claims
+        )
+
+
+class TokenVerifier:
+    """Checks tokens without a database session, a single instance serves every request of the process"""
+
+    def __init__(self, secret: str = None):
+        # None follows the settings, a reloaded secret applies without a new verifier
+        self.secret = secret
+
+    @traced
+    def verify(self, token: str, required_type: TokenTypes = TokenTypes.ACCESS) -> dict:
+        return AuthenticationService.decode_token(token=token, required_type=required_type, secret=self.secret)
+
+    @traced
+    def get_principal(self, token: str, required_type: TokenTypes = TokenTypes.ACCESS) -> TokenPrincipal:
+        return TokenPrincipal.from_claims(self.verify(token, required_type))
+
+    @traced
+    def introspect(self, token: str) -> dict:
+        """Decodes a token of any type once, later calls are served from the claims cache"""
+        # the cache is shared by every verifier, claims only count for the secret that verified them
+        secret = self.secret or get_app_secret()
+        claims = token_claims_cache.get((secret, token))
+        if claims is None:
+            claims = AuthenticationService.decode_token(token=token, secret=secret)
+            token_claims_cache.set((secret, token), claims)
+        return claims
+
+
+token_verifier = TokenVerifier()
@@ -3,8 +3,11 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import subqueryload
 
 from config import get_password_iterations, get_password_algorithm, get_password_validators
+from models.client import Client
 from models.user import User
 from services.base import ModelService, UniquenessError
+from services.invalidation import notify_invalidation, invalidate_locally, Entities
+from services.password_service.executor import run_hashing
 from services.password_service.service import PasswordService
 
 
@@ -35,7 +38,8 @@ class UserService(ModelService):
             plain_password=plain_password,
             validators=validators
         )
-        formatted_password = password_service.hash_password(
+        formatted_password = await run_hashing(
+            password_service.hash_password,
             plain_password=plain_password,
             algorithm=algorithm,
             iterations=iterations
@@ -63,7 +67,8 @@ class UserService(ModelService):
             plain_password=plain_password,
             validators=validators
         )
-        formatted_password = password_service.hash_password(
+        formatted_password = await run_hashing(
+            password_service.hash_password,
             plain_password=plain_password,
             algorithm=algorithm,
             iterations=iterations
@@ -75,10 +80,20 @@ class UserService(ModelService):
 
         return instance
 
+    async def delete(self, instance_id: int, commit: bool = True):
+        # the clients of the user are deleted by the cascade
+        client_ids = list(await self.session.scalars(select(Client.id).where(Client.user_id == instance_id)))
+        await notify_invalidation(self.session, Entities.CLIENT, client_ids)
+        await super().delete(instance_id, commit)
+        # without a commit the caller's transaction is still open, the listener evicts once it commits
+        if commit:
+            await invalidate_locally(Entities.CLIENT, client_ids)
+
     async def check_password(self, instance: User, plain_password: str) -> bool:
         password_service = PasswordService()
 
-        return password_service.check_password(
+        return await run_hashing(
+            password_service.check_password,
             password=instance.password,
             plain_password=plain_password
         )
@@ -1,4 +1,5 @@
 import asyncio
+import os
 import random
 from datetime import datetime, timedelta
 from string import ascii_lowercase, digits
@@ -8,18 +9,22 @@ from sqlalchemy import AsyncAdaptedQueuePool
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, AsyncEngine
 
 from config import get_test_database_url, ADAPTERS
-from env import get_authentication_code_valid_minutes
+from env import get_authentication_code_valid_minutes, set_env_key, reload_settings
 from migrations.operations import migrate_head
 from models.client import Client
 from models.code import Code
 from models.scope import Scope
 from models.user import User
+from monitoring.tracing import SpanExporter, Span, span_processor
 from services.authentication_serivce import AuthenticationService
 from services.client_service import ClientService
 from services.code_service import CodeService
 from services.scope_service import ScopeService
 from services.user_service import UserService
 
+CORRECT_PASSWORD_MIN_LENGTH = 12
+CORRECT_PASSWORD_MAX_LENGTH = 24
+
 
 def generate_mock_name(length: int = 10):
     return "".join(random.choices(ascii_lowercase + digits, k=length))
@@ -33,6 +38,44 @@ def generate_mock_password() -> str:
     return "test$1$plain_password$salt"
 
 
+class MemorySpanExporter(SpanExporter):
+    def __init__(self):
+        self.spans: list[Span] = []
+
+    def export(self, spans: list[Span]):
+        self.spans.extend(spans)
+
+
+@pytest.fixture
+def env_key():
+    """Sets environment variables, the previous values are restored and the settings reloaded afterwards"""
+    keys = {}
+
+    def set_key(key: str, value: str):
+        keys.setdefault(key, os.getenv(key))
+        set_env_key(key, value)
+
+    yield set_key
+
+    for key, value in keys.items():
+        set_env_key(key, value)
+    reload_settings()
+
+
+@pytest.fixture
+def password_min_length_env(env_key):
+    env_key("PASSWORD_MIN_LENGTH", str(CORRECT_PASSWORD_MIN_LENGTH))
+    reload_settings()
+    return CORRECT_PASSWORD_MIN_LENGTH
+
+
+@pytest.fixture
+def password_max_length_env(env_key):
+    env_key("PASSWORD_MAX_LENGTH", str(CORRECT_PASSWORD_MAX_LENGTH))
+    reload_settings()
+    return CORRECT_PASSWORD_MAX_LENGTH
+
+
 @pytest.fixture(scope="session")
 def event_loop():
     try:
@@ -179,3 +222,11 @@ async def mock_token_pair(test_session: AsyncSession, mock_user_with_password: U
 async def mock_auth_header(mock_token_pair: tuple[str, str]):
     access_token, _ = mock_token_pair
     return {"Authorization": f"Bearer {access_token}"}
+
+
+@pytest.fixture
+def span_exporter():
+    exporter = MemorySpanExporter()
+    span_processor.start(exporter)
+    yield exporter
+    span_processor.shutdown()
@@ -1,10 +1,25 @@
+from contextlib import contextmanager
+
 import pytest
 from httpx import AsyncClient
 
 from app import app
+from monitoring.queries import track_queries
 
 
 @pytest.fixture
 async def mock_http_client(event_loop):
     async with AsyncClient(app=app, base_url="https://testserver") as client:
         yield client
+
+
+@pytest.fixture
+def query_budget():
+    """Fails the test when the wrapped requests execute more statements than allowed"""
+    @contextmanager
+    def budget(max_queries: int):
+        with track_queries() as stats:
+            yield stats
+        assert stats.count <= max_queries, f"{stats.count} statements executed, the budget is {max_queries}"
+
+    return budget
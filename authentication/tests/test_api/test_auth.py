@@ -8,18 +8,28 @@ from fastapi import status
 from httpx import AsyncClient
 from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.requests import Request
 
-from api.auth.dependencies import authenticate
+from api.auth.dependencies import authenticate, get_request_principal, check_profile_scopes
 from api.auth.views import AUTH_URL_NAME, AuthRoutes
+from api.user.views import USER_URL_NAME, UserRoutes
 from app import app
 from config import APP_NAME
 from env import get_frontend_url, get_develop_mode, get_app_secret
 from models.client import Client
 from models.code import Code
+from models.scope import Scope
 from models.user import User
+from monitoring.metrics import JWT_DURATION
 from services.authentication_serivce import AuthenticationService, TOKEN_SUB, TOKEN_ISS, TOKEN_IAT, TOKEN_EXP, \
     TOKEN_TYPE, TOKEN_SCOPES, TokenTypes, JWT_ALGORITHM
-from tests.conftest import get_mock_uri
+from services.client_service import ClientService
+from services.token_verifier import token_verifier
+from tests.conftest import get_mock_uri, generate_mock_name
+
+
+def get_mock_request() -> Request:
+    return Request({"type": "http", "headers": []})
 
 
 async def test_authenticate_success(
@@ -29,14 +39,31 @@ async def test_authenticate_success(
 ):
     access_token, refresh_token = mock_token_pair
     auth_service = AuthenticationService(test_session)
+    principal = await get_request_principal(get_mock_request(), access_token, token_verifier)
+
     assert mock_user == await authenticate(
-        token=access_token,
+        principal=await check_profile_scopes(principal),
         auth_service=auth_service
     )
 
 
+async def test_request_principal_decoded_once(mock_token_pair: tuple[str, str], mock_user: User):
+    access_token, _ = mock_token_pair
+    request = get_mock_request()
+    decodes = JWT_DURATION.labels("decode")
+    count = decodes.count
+
+    principal = await get_request_principal(request, access_token, token_verifier)
+
+    assert await get_request_principal(request, access_token, token_verifier) is principal
+    assert request.state.principal is principal
+    assert decodes.count == count + 1
+    assert principal.subject == mock_user.username
+    assert principal.type == TokenTypes.ACCESS
+    assert Scope.Types.UNRESTRICTED in principal.scopes
+
+
 async def test_authenticate_no_required_scope(
-        test_session: AsyncSession,
         mock_user: User
 ):
     decoded_token = {
@@ -51,37 +78,40 @@ async def test_authenticate_no_required_scope(
         get_app_secret(),
         algorithm=JWT_ALGORITHM
     )
-    auth_service = AuthenticationService(test_session)
+    principal = await get_request_principal(get_mock_request(), invalid_token, token_verifier)
+
     with pytest.raises(HTTPException):
-        await authenticate(
-            token=invalid_token,
-            auth_service=auth_service
-        )
+        await check_profile_scopes(principal)
 
 
-async def test_authenticate_invalid_token(
-        test_session: AsyncSession,
-        mock_user: User
-):
+async def test_authenticate_invalid_token():
     invalid_token = "invalid_token"
-    auth_service = AuthenticationService(test_session)
     with pytest.raises(HTTPException):
-        await authenticate(
-            token=invalid_token,
-            auth_service=auth_service
-        )
+        await get_request_principal(get_mock_request(), invalid_token, token_verifier)
+
+
+async def test_profile_decodes_token_once(mock_http_client: AsyncClient, mock_auth_header: dict):
+    decodes = JWT_DURATION.labels("decode")
+    count = decodes.count
+
+    response = await mock_http_client.get(USER_URL_NAME + UserRoutes.PROFILE, headers=mock_auth_header)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert decodes.count == count + 1
 
 
 async def test_code_auth_url_success(
+        query_budget,
         mock_http_client: AsyncClient,
         mock_client: Client):
-    response = await mock_http_client.get(
-        url=AUTH_URL_NAME + AuthRoutes.GET_AUTHORIZATION_URI,
-        params={
-            "client_id": mock_client.id,
-            "redirect_uri": get_mock_uri()
-        }
-    )
+    with query_budget(0):
+        response = await mock_http_client.get(
+            url=AUTH_URL_NAME + AuthRoutes.GET_AUTHORIZATION_URI,
+            params={
+                "client_id": mock_client.id,
+                "redirect_uri": get_mock_uri()
+            }
+        )
     json_response = response.json()
 
     assert response.status_code == status.HTTP_200_OK
@@ -112,22 +142,24 @@ async def test_code_auth_url_no_redirect_uri(
 
 
 async def test_callback_code_success(
+        query_budget,
         mock_http_client: AsyncClient,
         test_session: AsyncSession,
         mock_client: Client,
         mock_user_with_password: tuple[User, str]):
     mock_user, password = mock_user_with_password
-    response = await mock_http_client.post(
-        url=AUTH_URL_NAME + AuthRoutes.CALLBACK_CODE,
-        params={
-            "client_id": mock_client.id,
-            "redirect_uri": get_mock_uri()
-        },
-        json={
-            "username": mock_user.username,
-            "password": password
-        }
-    )
+    with query_budget(6):
+        response = await mock_http_client.post(
+            url=AUTH_URL_NAME + AuthRoutes.CALLBACK_CODE,
+            params={
+                "client_id": mock_client.id,
+                "redirect_uri": get_mock_uri()
+            },
+            json={
+                "username": mock_user.username,
+                "password": password
+            }
+        )
     response_json = response.json()
     parsed = urlparse(response_json.get("redirect_uri"))
     code_value = parse_qs(parsed.query).get("code")[0]
@@ -214,19 +246,21 @@ async def test_callback_code_no_password(
 
 
 async def test_token_code_success(
+        query_budget,
         mock_http_client: AsyncClient,
         mock_client: Client,
         mock_code: Code
 ):
-    response = await mock_http_client.post(
-        url=AUTH_URL_NAME + AuthRoutes.TOKEN_CODE,
-        json={
-            "code": mock_code.value,
-            "client_id": mock_client.id,
-            "client_secret": mock_client.secret,
-            "redirect_uri": mock_code.redirect_uri
-        }
-    )
+    with query_budget(3):
+        response = await mock_http_client.post(
+            url=AUTH_URL_NAME + AuthRoutes.TOKEN_CODE,
+            json={
+                "code": mock_code.value,
+                "client_id": mock_client.id,
+                "client_secret": mock_client.secret,
+                "redirect_uri": mock_code.redirect_uri
+            }
+        )
     response_json = response.json()
 
     assert response.status_code == status.HTTP_200_OK
@@ -299,6 +333,7 @@ async def test_token_code_no_redirect_uri(
 
 
 async def test_token_password_success(
+        query_budget,
         fastapi_dep,
         mock_http_client: AsyncClient,
         mock_client: Client,
@@ -306,15 +341,16 @@ async def test_token_password_success(
 ):
     with fastapi_dep(app).override({get_develop_mode: lambda: True}):
         mock_user, password = mock_user_with_password
-        response = await mock_http_client.post(
-            url=AUTH_URL_NAME + AuthRoutes.TOKEN_PASSWORD,
-            data={
-                "username": mock_user.username,
-                "password": password,
-                "client_id": mock_client.id,
-                "client_secret": mock_client.secret
-            }
-        )
+        with query_budget(3):
+            response = await mock_http_client.post(
+                url=AUTH_URL_NAME + AuthRoutes.TOKEN_PASSWORD,
+                data={
+                    "username": mock_user.username,
+                    "password": password,
+                    "client_id": mock_client.id,
+                    "client_secret": mock_client.secret
+                }
+            )
     response_json = response.json()
 
     assert response.status_code == status.HTTP_200_OK
@@ -420,19 +456,21 @@ async def test_token_password_no_client_secret(
 
 
 async def test_refresh_success(
+        query_budget,
         mock_http_client: AsyncClient,
         mock_client: Client,
         mock_token_pair: tuple[str, str]
 ):
     _, refresh_token = mock_token_pair
-    response = await mock_http_client.post(
-        url=AUTH_URL_NAME + AuthRoutes.REFRESH,
-        json={
-            "refresh_token": refresh_token,
-            "client_id": mock_client.id,
-            "client_secret": mock_client.secret
-        }
-    )
+    with query_budget(1):
+        response = await mock_http_client.post(
+            url=AUTH_URL_NAME + AuthRoutes.REFRESH,
+            json={
+                "refresh_token": refresh_token,
+                "client_id": mock_client.id,
+                "client_secret": mock_client.secret
+            }
+        )
     response_json = response.json()
 
     assert response.status_code == status.HTTP_200_OK
@@ -489,9 +527,28 @@ async def test_refresh_no_client_secret(
 
 
 async def test_verify_success(
+        query_budget,
         mock_http_client: AsyncClient,
         mock_auth_header: dict
 ):
+    with query_budget(0):
+        response = await mock_http_client.post(
+            AUTH_URL_NAME + AuthRoutes.VERIFY,
+            headers=mock_auth_header
+        )
+
+    assert response.status_code == status.HTTP_200_OK
+
+
+async def test_verify_without_session(
+        mock_http_client: AsyncClient,
+        mock_auth_header: dict,
+        monkeypatch
+):
+    def get_session():
+        raise AssertionError("verify opened a session")
+
+    monkeypatch.setattr("api.dependencies.get_session", get_session)
     response = await mock_http_client.post(
         AUTH_URL_NAME + AuthRoutes.VERIFY,
         headers=mock_auth_header
@@ -532,3 +589,117 @@ async def test_verify_no_token(
     )
 
     assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.fixture
+async def introspection_auth(test_session: AsyncSession, mock_user: User) -> tuple[str, str]:
+    service = ClientService(test_session)
+    client = await service.create(
+        name=f"introspection_{generate_mock_name()}",
+        user=mock_user,
+        scopes=[Scope.Types.TOKEN_INTROSPECT]
+    )
+
+    client_id = client.id
+    yield str(client_id), client.secret
+
+    await service.delete(client_id)
+
+
+async def test_introspect_access_token(
+        query_budget,
+        mock_http_client: AsyncClient,
+        mock_token_pair: tuple[str, str],
+        mock_user: User,
+        introspection_auth: tuple[str, str]
+):
+    access_token, _ = mock_token_pair
+    # the first call caches the client principal, the next ones touch no database
+    await mock_http_client.post(
+        AUTH_URL_NAME + AuthRoutes.INTROSPECT,
+        data={"token": access_token},
+        auth=introspection_auth
+    )
+
+    with query_budget(0):
+        response = await mock_http_client.post(
+            AUTH_URL_NAME + AuthRoutes.INTROSPECT,
+            data={"token": access_token},
+            auth=introspection_auth
+        )
+
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["active"] is True
+    assert data["sub"] == mock_user.username
+    assert data["type"] == TokenTypes.ACCESS
+    assert data["iss"] == APP_NAME
+    assert isinstance(data["scopes"], list)
+
+    cache_control = response.headers["Cache-Control"]
+    assert cache_control.startswith("private, max-age=")
+    assert 0 < int(cache_control.split("=")[1]) <= data["exp"] - datetime.utcnow().timestamp() + 1
+
+
+async def test_introspect_refresh_token(
+        mock_http_client: AsyncClient,
+        mock_token_pair: tuple[str, str],
+        introspection_auth: tuple[str, str]
+):
+    _, refresh_token = mock_token_pair
+    response = await mock_http_client.post(
+        AUTH_URL_NAME + AuthRoutes.INTROSPECT,
+        data={"token": refresh_token, "token_type_hint": "refresh_token"},
+        auth=introspection_auth
+    )
+
+    assert response.json()["active"] is True
+    assert response.json()["type"] == TokenTypes.REFRESH
+
+
+async def test_introspect_invalid_token(
+        mock_http_client: AsyncClient,
+        introspection_auth: tuple[str, str]
+):
+    response = await mock_http_client.post(
+        AUTH_URL_NAME + AuthRoutes.INTROSPECT,
+        data={"token": "invalid_token"},
+        auth=introspection_auth
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"active": False}
+    assert response.headers["Cache-Control"] == "no-store"
+
+
+@pytest.mark.parametrize("auth", [None, ("not_an_id", "secret"), ("0", "secret")])
+async def test_introspect_unauthenticated(
+        mock_http_client: AsyncClient,
+        mock_token_pair: tuple[str, str],
+        auth: tuple[str, str]
+):
+    access_token, _ = mock_token_pair
+    response = await mock_http_client.post(
+        AUTH_URL_NAME + AuthRoutes.INTROSPECT,
+        data={"token": access_token},
+        auth=auth
+    )
+
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert response.headers["WWW-Authenticate"] == "Basic"
+    assert "sub" not in response.json()
+
+
+async def test_introspect_without_scope(
+        mock_http_client: AsyncClient,
+        mock_token_pair: tuple[str, str],
+        mock_client: Client
+):
+    access_token, _ = mock_token_pair
+    response = await mock_http_client.post(
+        AUTH_URL_NAME + AuthRoutes.INTROSPECT,
+        data={"token": access_token},
+        auth=(str(mock_client.id), mock_client.secret)
+    )
+
+    assert response.status_code == status.HTTP_403_FORBIDDEN
@@ -4,21 +4,24 @@ from httpx import AsyncClient
 from api.client.views import CLIENT_URL_NAME, ClientRoutes
 from models.scope import Scope
 from models.user import User
+from services.user_service import UserService
 from tests.conftest import generate_mock_name
 
 
 async def test_create_success(
+        query_budget,
         mock_http_client: AsyncClient,
         mock_user: User
 ):
-    response = await mock_http_client.post(
-        url=CLIENT_URL_NAME + ClientRoutes.CREATE,
-        json={
-            "username": mock_user.username,
-            "client_name": generate_mock_name(),
-            "scopes": [Scope.Types.UNRESTRICTED]
-        }
-    )
+    with query_budget(7):
+        response = await mock_http_client.post(
+            url=CLIENT_URL_NAME + ClientRoutes.CREATE,
+            json={
+                "username": mock_user.username,
+                "client_name": generate_mock_name(),
+                "scopes": [Scope.Types.UNRESTRICTED]
+            }
+        )
     response_json = response.json()
 
     assert response.status_code == status.HTTP_200_OK
@@ -62,7 +65,7 @@ async def test_create_not_existent_username(
     response = await mock_http_client.post(
         url=CLIENT_URL_NAME + ClientRoutes.CREATE,
         json={
-            "username": "non_existent_username",
+            "username": "non_existent",
             "client_name": generate_mock_name(),
             "scopes": [Scope.Types.UNRESTRICTED]
         }
@@ -85,3 +88,25 @@ async def test_create_no_scopes(
     )
 
     assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+async def test_create_invalid_client_name(
+        mock_http_client: AsyncClient,
+        mock_user: User,
+        monkeypatch
+):
+    async def fail_if_called(*args, **kwargs):
+        raise AssertionError("Invalid payload reached the service")
+
+    monkeypatch.setattr(UserService, "get_user_by_username", fail_if_called)
+
+    response = await mock_http_client.post(
+        url=CLIENT_URL_NAME + ClientRoutes.CREATE,
+        json={
+            "username": mock_user.username,
+            "client_name": "short",
+            "scopes": [Scope.Types.UNRESTRICTED]
+        }
+    )
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
@@ -1,6 +1,6 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from api.dependencies import get_auth_service, get_user_service, get_client_service
+from api.dependencies import get_auth_service, get_user_service, get_client_service, get_request_session
 from services.authentication_serivce import AuthenticationService
 from services.client_service import ClientService
 from services.user_service import UserService
@@ -19,3 +19,13 @@ async def test_get_user_service(test_session: AsyncSession):
 async def test_get_client_service(test_session: AsyncSession):
     auth_service = await get_client_service(test_session)
     assert isinstance(auth_service, ClientService)
+
+
+async def test_get_request_session(test_db_engine):
+    dependency = get_request_session()
+    session = await anext(dependency)
+    await session.connection()
+    assert session.in_transaction()
+
+    await dependency.aclose()
+    assert not session.in_transaction()
@@ -0,0 +1,42 @@
+import time
+
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+
+from api.health import HealthStatus
+from config import get_db_engine
+from monitoring.health import health_state, refresh_health_state
+
+
+@pytest.fixture
+def stale_health_state(monkeypatch):
+    monkeypatch.setattr(health_state, "checked_at", time.monotonic() - 3600)
+
+
+async def test_live(mock_http_client: AsyncClient):
+    response = await mock_http_client.get("/health/live")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"status": HealthStatus.LIVE}
+    assert "RateLimit-Limit" not in response.headers
+
+
+async def test_ready(mock_http_client: AsyncClient, query_budget):
+    await refresh_health_state(get_db_engine())
+
+    with query_budget(0):
+        response = await mock_http_client.get("/health/ready")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["status"] == HealthStatus.READY
+    assert response.json()["failures"] == []
+    assert "saturated" in response.json()
+
+
+async def test_ready_stale(mock_http_client: AsyncClient, stale_health_state):
+    response = await mock_http_client.get("/health/ready")
+
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.json()["status"] == HealthStatus.NOT_READY
+    assert "stale" in response.json()["failures"]
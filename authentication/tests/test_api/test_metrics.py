@@ -0,0 +1,73 @@
+import pytest
+from httpx import AsyncClient
+
+from api.auth.views import AUTH_URL_NAME, AuthRoutes
+from api.metrics import METRICS_CONTENT_TYPE
+from config import get_db_engine
+from env import reload_settings
+from monitoring.metrics import REQUEST_LATENCY, RESPONSES, JWT_DURATION, PASSWORD_HASH_DURATION
+
+VERIFY_ROUTE = f"/{AUTH_URL_NAME}{AuthRoutes.VERIFY.value}"
+
+
+@pytest.fixture
+def develop_mode(env_key):
+    env_key("APP_DEVELOP_MODE", "True")
+    reload_settings()
+
+
+async def test_metrics_format(mock_http_client: AsyncClient):
+    # pool gauges are reported once the engine exists
+    get_db_engine()
+    response = await mock_http_client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == METRICS_CONTENT_TYPE
+    assert "# TYPE http_request_duration_seconds histogram" in response.text
+    assert 'db_pool_connections{state="checked_out"}' in response.text
+    assert 'cache_hit_ratio{cache="client_principal"}' in response.text
+    assert "# TYPE cache_lookups_total counter" in response.text
+    assert 'cache_lookups_total{cache="client_principal",state="hits"}' in response.text
+
+
+async def test_metrics_routes_preallocated(mock_http_client: AsyncClient):
+    response = await mock_http_client.get("/metrics")
+
+    assert f'http_request_duration_seconds_count{{method="POST",route="{VERIFY_ROUTE}"}}' in response.text
+
+
+async def test_metrics_record_request(mock_http_client: AsyncClient, mock_auth_header: dict):
+    latency = REQUEST_LATENCY.labels("POST", VERIFY_ROUTE)
+    responses = RESPONSES.labels("POST", VERIFY_ROUTE, "200")
+    decodes = JWT_DURATION.labels("decode")
+    count, response_count, decode_count = latency.count, responses.value, decodes.count
+
+    response = await mock_http_client.post(VERIFY_ROUTE, headers=mock_auth_header)
+
+    assert response.status_code == 200
+    assert latency.count == count + 1
+    assert responses.value == response_count + 1
+    assert decodes.count > decode_count
+    # the token pair fixture checked a password
+    assert PASSWORD_HASH_DURATION.labels().count
+
+
+async def test_metrics_unmatched_route(mock_http_client: AsyncClient):
+    responses = RESPONSES.labels("GET", "other", "404")
+    count = responses.value
+
+    await mock_http_client.get("/does-not-exist/")
+
+    assert responses.value == count + 1
+
+
+async def test_metrics_query_header(develop_mode, mock_http_client: AsyncClient):
+    response = await mock_http_client.get("/does-not-exist/")
+
+    assert response.headers["server-timing"] == 'db;dur=0.00;desc="0 queries"'
+
+
+async def test_metrics_query_header_disabled(mock_http_client: AsyncClient):
+    response = await mock_http_client.get("/does-not-exist/")
+
+    assert "server-timing" not in response.headers
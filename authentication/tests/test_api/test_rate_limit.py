@@ -0,0 +1,106 @@
+import pytest
+from fastapi import status, FastAPI
+from httpx import AsyncClient, ASGITransport
+
+from api.auth.schemas import RefreshRequest
+from api.auth.views import AUTH_URL_NAME, AuthRoutes
+from api.rate_limit import RateLimitMiddleware
+from env import reload_settings
+from services.rate_limiter import MemoryRateLimitBackend, RateLimitBackend
+
+REFRESH_URL = f"/{AUTH_URL_NAME}{AuthRoutes.REFRESH}"
+
+limited_app = FastAPI()
+
+
+@limited_app.post(REFRESH_URL)
+async def refresh_stub(data: RefreshRequest) -> dict:
+    return {"client_id": data.client_id}
+
+
+@pytest.fixture
+def refresh_rate_env(env_key):
+    env_key("RATE_LIMIT_ROUTES", f"{REFRESH_URL}=2/minute")
+    reload_settings()
+
+
+def get_http_client(middleware: RateLimitMiddleware, ip: str = "127.0.0.1") -> AsyncClient:
+    return AsyncClient(
+        transport=ASGITransport(app=middleware, client=(ip, 1234)),
+        base_url="https://testserver"
+    )
+
+
+async def refresh(client: AsyncClient, client_id: int = 1):
+    return await client.post(
+        REFRESH_URL,
+        json={
+            "refresh_token": "invalid_token",
+            "client_id": client_id,
+            "client_secret": "secret"
+        }
+    )
+
+
+async def test_rate_limit_headers(mock_http_client: AsyncClient):
+    response = await mock_http_client.get(
+        AUTH_URL_NAME + AuthRoutes.GET_AUTHORIZATION_URI,
+        params={"client_id": 1, "redirect_uri": "https://example.com"}
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert int(response.headers["RateLimit-Limit"]) > 0
+    assert "RateLimit-Remaining" in response.headers
+    assert "RateLimit-Reset" in response.headers
+
+
+async def test_rate_limit_per_ip(refresh_rate_env):
+    middleware = RateLimitMiddleware(limited_app, backend=MemoryRateLimitBackend(max_keys=100))
+
+    async with get_http_client(middleware) as client:
+        responses = [await refresh(client, client_id) for client_id in range(1, 4)]
+
+    assert [response.status_code for response in responses] == [
+        status.HTTP_200_OK,
+        status.HTTP_200_OK,
+        status.HTTP_429_TOO_MANY_REQUESTS
+    ]
+    # the consumed body is replayed to the endpoint
+    assert responses[0].json() == {"client_id": 1}
+    assert responses[-1].headers["RateLimit-Remaining"] == "0"
+    assert int(responses[-1].headers["Retry-After"]) > 0
+
+
+async def test_rate_limit_per_client_id(refresh_rate_env):
+    middleware = RateLimitMiddleware(limited_app, backend=MemoryRateLimitBackend(max_keys=100))
+
+    statuses = []
+    for ip in ("10.0.0.1", "10.0.0.2", "10.0.0.3"):
+        async with get_http_client(middleware, ip) as client:
+            statuses.append((await refresh(client, client_id=42)).status_code)
+
+    assert statuses[-1] == status.HTTP_429_TOO_MANY_REQUESTS
+
+
+async def test_rate_limit_denied_ip_keeps_client_tokens(refresh_rate_env):
+    middleware = RateLimitMiddleware(limited_app, backend=MemoryRateLimitBackend(max_keys=100))
+
+    async with get_http_client(middleware, "10.0.0.1") as client:
+        statuses = [(await refresh(client, client_id)).status_code for client_id in (1, 2, 42, 42, 42)]
+    assert statuses.count(status.HTTP_429_TOO_MANY_REQUESTS) == 3
+
+    async with get_http_client(middleware, "10.0.0.2") as client:
+        assert (await refresh(client, client_id=42)).status_code == status.HTTP_200_OK
+        assert (await refresh(client, client_id=42)).status_code == status.HTTP_200_OK
+
+
+async def test_rate_limit_backend_failure_allows(refresh_rate_env):
+    class FailingBackend(RateLimitBackend):
+        async def take_all(self, *args, **kwargs):
+            raise ConnectionError
+
+    middleware = RateLimitMiddleware(limited_app, backend=FailingBackend())
+
+    async with get_http_client(middleware) as client:
+        for _ in range(3):
+            assert (await refresh(client)).status_code == status.HTTP_200_OK
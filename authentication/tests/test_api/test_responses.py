@@ -0,0 +1,34 @@
+import pytest
+from fastapi.responses import JSONResponse
+from pydantic import ValidationError
+
+from api.auth.schemas import TokenResponse
+from api.responses import make_response, get_response_class, OrjsonResponse
+from api.schemas import MessageResponse
+from app import app
+from env import reload_settings
+
+
+def test_default_response_class():
+    assert app.router.default_response_class is OrjsonResponse
+
+
+def test_response_class_disabled(env_key):
+    env_key("FAST_JSON_RESPONSES", "False")
+    reload_settings()
+    assert get_response_class() is JSONResponse
+
+
+def test_make_response():
+    response = make_response(MessageResponse, status_code=201, detail="Created")
+
+    assert response.status_code == 201
+    assert response.body == b'{"detail":"Created"}'
+
+
+def test_make_response_validated_in_develop_mode(env_key):
+    env_key("APP_DEVELOP_MODE", "True")
+    reload_settings()
+
+    with pytest.raises(ValidationError):
+        make_response(TokenResponse, access_token="token")
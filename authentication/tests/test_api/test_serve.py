@@ -0,0 +1,99 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+from config import get_root_dir
+from env import get_serve_max_requests, get_serve_max_requests_jitter, reload_settings
+from serve import get_max_requests, Arbiter, RESPAWN_DELAY, RESPAWN_MAX_DELAY
+
+
+def get_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 20):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise TimeoutError(port)
+
+
+def test_get_max_requests():
+    max_requests = get_max_requests()
+    assert get_serve_max_requests() <= max_requests <= get_serve_max_requests() + get_serve_max_requests_jitter()
+
+
+def test_get_max_requests_disabled(env_key):
+    env_key("SERVE_MAX_REQUESTS", "0")
+    reload_settings()
+    assert get_max_requests() is None
+
+
+def test_serve_recycles_and_stops_gracefully(test_db_engine):
+    port = get_free_port()
+    process = subprocess.Popen(
+        [sys.executable, "serve.py"],
+        cwd=get_root_dir(),
+        env={
+            **os.environ,
+            "SERVE_HOST": "127.0.0.1",
+            "SERVE_PORT": str(port),
+            "SERVE_WORKERS": "2",
+            "SERVE_MAX_REQUESTS": "2",
+            "SERVE_MAX_REQUESTS_JITTER": "0",
+        },
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_for_port(port)
+        for _ in range(8):
+            response = httpx.get(
+                f"http://127.0.0.1:{port}/auth/get-auth-uri",
+                params={"client_id": 1, "redirect_uri": "https://example.com"}
+            )
+            assert response.status_code == 200
+    finally:
+        process.send_signal(signal.SIGTERM)
+        assert process.wait(timeout=30) == 0
+
+
+def test_stop_forgets_exited_workers():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    with socket.socket() as sock:
+        arbiter = Arbiter(None, sock, workers=1)
+        arbiter.pids = {process.pid, process.pid + 1_000_000}
+
+        arbiter.stop(signal.SIGTERM, None)
+
+    assert arbiter.stopping
+    assert arbiter.pids == set()
+
+
+def test_crashed_workers_respawn_with_backoff():
+    with socket.socket() as sock:
+        arbiter = Arbiter(None, sock, workers=1)
+
+        started = time.monotonic()
+        for _ in range(10):
+            arbiter.schedule_respawn(1, 1)
+        delays = [respawn - started for respawn in arbiter.respawns]
+        assert RESPAWN_DELAY <= delays[0] < delays[1] < delays[2]
+        assert max(delays) <= RESPAWN_MAX_DELAY + 1
+
+        arbiter.respawns.clear()
+        arbiter.schedule_respawn(1, 0)
+        assert arbiter.crashes == 0
+        assert arbiter.respawns[0] <= time.monotonic()
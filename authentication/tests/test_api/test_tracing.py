@@ -0,0 +1,38 @@
+from httpx import AsyncClient
+
+from api.user.views import USER_URL_NAME, UserRoutes
+from monitoring.tracing import span_processor
+from tests.conftest import MemorySpanExporter
+
+TRACEPARENT = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+
+
+async def test_request_trace(
+        span_exporter: MemorySpanExporter,
+        mock_http_client: AsyncClient,
+        mock_auth_header: dict
+):
+    response = await mock_http_client.get(
+        USER_URL_NAME + UserRoutes.PROFILE,
+        headers={**mock_auth_header, "traceparent": TRACEPARENT}
+    )
+    span_processor.shutdown()
+    spans = {span.name: span for span in span_exporter.spans}
+
+    assert response.status_code == 200
+    root = spans[f"GET /{USER_URL_NAME}{UserRoutes.PROFILE.value}"]
+    assert root.parent_id == "b7ad6b7169203331"
+    assert root.attributes["http.status_code"] == 200
+    get_principal = spans["TokenVerifier.get_principal"]
+    assert get_principal.parent_id == root.span_id
+    assert spans["TokenVerifier.verify"].parent_id == get_principal.span_id
+    get_user = spans["AuthenticationService.get_user_by_subject"]
+    assert get_user.parent_id == root.span_id
+    assert spans["db.query"].parent_id == get_user.span_id
+
+
+async def test_request_not_sampled(span_exporter: MemorySpanExporter, mock_http_client: AsyncClient):
+    await mock_http_client.get("/does-not-exist/", headers={"traceparent": TRACEPARENT[:-2] + "00"})
+    span_processor.shutdown()
+
+    assert not span_exporter.spans
@@ -1,24 +1,28 @@
+import pytest
 from fastapi import status
 from httpx import AsyncClient
 
 from api.user.views import USER_URL_NAME, UserRoutes
 from models.user import User
+from services.user_service import UserService
 from tests.conftest import generate_mock_name, generate_mock_plain_password
 
 
 async def test_register_success(
+        query_budget,
         mock_http_client: AsyncClient
 ):
     username = generate_mock_name()
     password = generate_mock_plain_password()
 
-    response = await mock_http_client.post(
-        url=USER_URL_NAME + UserRoutes.REGISTER,
-        json={
-            "username": username,
-            "password": password
-        }
-    )
+    with query_budget(4):
+        response = await mock_http_client.post(
+            url=USER_URL_NAME + UserRoutes.REGISTER,
+            json={
+                "username": username,
+                "password": password
+            }
+        )
     response_json = response.json()
 
     assert response.status_code == status.HTTP_200_OK
@@ -72,14 +76,16 @@ async def test_register_already_exists(
 
 
 async def test_profile_success(
+        query_budget,
         mock_http_client: AsyncClient,
         mock_user: User,
         mock_auth_header: dict
 ):
-    response = await mock_http_client.get(
-        url=USER_URL_NAME + UserRoutes.PROFILE,
-        headers=mock_auth_header
-    )
+    with query_budget(1):
+        response = await mock_http_client.get(
+            url=USER_URL_NAME + UserRoutes.PROFILE,
+            headers=mock_auth_header
+        )
     response_json = response.json()
 
     assert response.status_code == status.HTTP_200_OK
@@ -99,18 +105,21 @@ async def test_profile_unauthorized(
 
 
 async def test_set_password_success(
+        query_budget,
         mock_http_client: AsyncClient,
         mock_user: User,
         mock_auth_header: dict
 ):
     password = generate_mock_plain_password()
-    response = await mock_http_client.post(
-        url=USER_URL_NAME + UserRoutes.SET_PASSWORD,
-        json={
-            "new_password": password
-        },
-        headers=mock_auth_header
-    )
+    # the user lookup, the invalidation notification and the update
+    with query_budget(3):
+        response = await mock_http_client.post(
+            url=USER_URL_NAME + UserRoutes.SET_PASSWORD,
+            json={
+                "new_password": password
+            },
+            headers=mock_auth_header
+        )
     assert response.status_code == status.HTTP_200_OK
 
 
@@ -139,3 +148,67 @@ async def test_set_password_unauthorized(
         },
     )
     assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+async def fail_if_called(*args, **kwargs):
+    raise AssertionError("Invalid payload reached the service")
+
+
+@pytest.mark.parametrize(
+    "username", [
+        "ab",
+        "name_that_is_way_too_long",
+        "invalid name",
+        "invalid-name!",
+    ])
+async def test_register_invalid_username(
+        mock_http_client: AsyncClient,
+        monkeypatch,
+        username: str
+):
+    monkeypatch.setattr(UserService, "create", fail_if_called)
+
+    response = await mock_http_client.post(
+        url=USER_URL_NAME + UserRoutes.REGISTER,
+        json={
+            "username": username,
+            "password": generate_mock_plain_password()
+        }
+    )
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+async def test_register_short_password(
+        mock_http_client: AsyncClient,
+        monkeypatch,
+        password_min_length_env
+):
+    monkeypatch.setattr(UserService, "create", fail_if_called)
+
+    response = await mock_http_client.post(
+        url=USER_URL_NAME + UserRoutes.REGISTER,
+        json={
+            "username": generate_mock_name(),
+            "password": "short"
+        }
+    )
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+async def test_set_password_short_password(
+        mock_http_client: AsyncClient,
+        mock_user: User,
+        mock_auth_header: dict,
+        monkeypatch,
+        password_min_length_env
+):
+    monkeypatch.setattr(UserService, "set_password", fail_if_called)
+
+    response = await mock_http_client.post(
+        url=USER_URL_NAME + UserRoutes.SET_PASSWORD,
+        json={
+            "new_password": "short"
+        },
+        headers=mock_auth_header
+    )
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
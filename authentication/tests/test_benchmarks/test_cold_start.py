@@ -0,0 +1,16 @@
+from benchmarks.cold_start import measure_cold_start, measure_import_times, DEFERRED_MODULES
+
+
+def test_import_times():
+    import_times = measure_import_times()
+
+    assert "fastapi" in import_times
+    for module in DEFERRED_MODULES:
+        assert module not in import_times
+
+
+def test_cold_start_budget(test_db_engine):
+    report = measure_cold_start()
+
+    assert report.import_seconds <= report.startup_seconds <= report.first_verify_seconds
+    assert not report.over_budget()
@@ -0,0 +1,9 @@
+from benchmarks.dependencies import measure
+
+
+async def test_measure_dependencies(test_db_engine):
+    report = await measure(iterations=20)
+
+    assert report.iterations == 20
+    assert report.session_us > 0
+    assert report.verifier_us > 0
@@ -0,0 +1,50 @@
+import pytest
+from httpx import AsyncClient, MockTransport, Response
+
+from app import app
+from benchmarks.load import run_load, parse_mix, percentile, SCENARIOS, SETUP_ATTEMPTS
+
+
+def test_parse_mix():
+    assert parse_mix("verify=3,profile=1") == {"verify": 3, "profile": 1}
+    with pytest.raises(ValueError):
+        parse_mix("unknown=1")
+
+
+def test_percentile():
+    values = [float(value) for value in range(1, 101)]
+
+    assert percentile(values, 0.5) == 50
+    assert percentile(values, 0.99) == 99
+    assert percentile([], 0.5) == 0
+
+
+async def test_run_load(test_db_engine):
+    async with AsyncClient(app=app, base_url="https://testserver") as client:
+        report = await run_load(
+            client,
+            concurrency=3,
+            duration=60,
+            ramp_up=0,
+            mix=",".join(f"{scenario}=1" for scenario in SCENARIOS),
+            max_iterations=10
+        )
+
+    steps = {step.step: step for step in report.steps}
+    assert report.errors == 0
+    assert {"register", "client", "login_code", "token_code"} <= set(steps)
+    assert report.requests == sum(step.requests for step in report.steps) >= 3 * 14
+    for step in report.steps:
+        assert step.p50_ms <= step.p95_ms <= step.p99_ms <= step.max_ms
+
+
+async def test_run_load_retires_users_failing_setup():
+    transport = MockTransport(lambda request: Response(503))
+    async with AsyncClient(transport=transport, base_url="https://testserver") as client:
+        report = await run_load(client, concurrency=2, duration=60, ramp_up=0, max_iterations=10)
+
+    steps = {step.step: step for step in report.steps}
+    assert steps["setup"].requests == 0
+    assert steps["setup"].errors == {"register": 2 * SETUP_ATTEMPTS}
+    assert steps["register"].errors == {"503": 2 * SETUP_ATTEMPTS}
+    assert report.requests == report.errors == 2 * SETUP_ATTEMPTS
@@ -0,0 +1,50 @@
+from sqlalchemy import text, func, select
+
+from benchmarks.query_plans import check_query_plans, is_violation
+from benchmarks.scale_data import generate_scale_data, USERNAME_PREFIX
+from models.user import User
+
+
+async def test_generate_scale_data(test_db_engine):
+    async with test_db_engine.connect() as connection:
+        transaction = await connection.begin()
+        report = await generate_scale_data(connection, users=100, clients_per_user=2, codes=300)
+        users = await connection.scalar(
+            select(func.count()).select_from(User).where(User.username.startswith(USERNAME_PREFIX))
+        )
+        await transaction.rollback()
+
+    assert (report.users, report.clients, report.codes) == (100, 200, 300)
+    assert users == 100
+
+
+async def test_check_query_plans(test_db_engine):
+    async with test_db_engine.connect() as connection:
+        transaction = await connection.begin()
+        await generate_scale_data(connection, users=10_000, codes=20_000)
+        violations = await check_query_plans(connection)
+        await transaction.rollback()
+
+    assert violations == []
+
+
+async def test_check_query_plans_missing_index(test_db_engine):
+    async with test_db_engine.connect() as connection:
+        transaction = await connection.begin()
+        await generate_scale_data(connection, users=10_000, codes=20_000)
+        await connection.execute(text("DROP INDEX ix_codes_value"))
+        violations = await check_query_plans(connection)
+        await transaction.rollback()
+
+    assert violations
+    assert {violation.call for violation in violations} == {"CodeService.get_valid_code"}
+    assert all(violation.relation.startswith("codes") for violation in violations)
+
+
+def test_is_violation():
+    assert is_violation({"Node Type": "Seq Scan", "Relation Name": "codes_p20240101", "Rows Removed by Filter": 5000})
+    assert not is_violation({"Node Type": "Seq Scan", "Relation Name": "codes_p20240101", "Actual Rows": 0})
+    assert not is_violation({"Node Type": "Seq Scan", "Relation Name": "scopes", "Rows Removed by Filter": 5000})
+    assert not is_violation({"Node Type": "Index Scan", "Relation Name": "users", "Actual Rows": 5000})
+    assert not is_violation({"Node Type": "Index Scan", "Relation Name": "codes_p20240101", "Shared Hit Blocks": 3})
+    assert is_violation({"Node Type": "Index Scan", "Relation Name": "codes_p20240101", "Shared Hit Blocks": 300})
@@ -0,0 +1,19 @@
+import json
+
+from benchmarks.responses import measure, render_all, ENDPOINTS
+
+
+def test_renderings_match():
+    renderings = render_all()
+
+    assert set(renderings) == set(ENDPOINTS)
+    for endpoint, (default, fast) in renderings.items():
+        assert json.loads(default) == json.loads(fast), endpoint
+
+
+def test_measure_reports_every_endpoint():
+    # timings vary between machines, they are only reported
+    reports = measure(iterations=10)
+
+    assert [report.endpoint for report in reports] == list(ENDPOINTS)
+    assert all(report.default_us > 0 and report.fast_us > 0 for report in reports)
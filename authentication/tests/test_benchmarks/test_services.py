@@ -0,0 +1,34 @@
+from benchmarks.services import run_benchmarks, find_regressions, save_baseline, load_baseline, BenchmarkResult, \
+    BENCHMARKS
+
+
+def get_result(name: str, median_us: float) -> BenchmarkResult:
+    return BenchmarkResult(
+        name=name, iterations=1, median_us=median_us, mean_us=median_us, min_us=median_us, stdev_us=0
+    )
+
+
+async def test_run_benchmarks(test_db_engine):
+    results = await run_benchmarks(iterations=3, warmup=1)
+
+    assert [result.name for result in results] == list(BENCHMARKS)
+    for result in results:
+        assert 0 < result.min_us <= result.median_us
+
+
+def test_baseline_roundtrip(tmp_path):
+    path = str(tmp_path / "baseline.json")
+    save_baseline([get_result("a", 10), get_result("b", 20)], path)
+
+    assert load_baseline(path) == {"a": 10, "b": 20}
+    assert load_baseline(str(tmp_path / "missing.json")) == {}
+
+
+def test_find_regressions():
+    baseline = {"fast": 100, "slow": 100}
+    results = [get_result("fast", 120), get_result("slow", 130), get_result("new", 1000)]
+
+    regressions = find_regressions(results, baseline, threshold=0.25)
+
+    assert [regression.name for regression in regressions] == ["slow"]
+    assert round(regressions[0].slowdown, 2) == 0.3
@@ -445,6 +445,14 @@ async def test_get_user_by_token_user_not_exist(test_session: AsyncSession, mock
         )
 
 
+async def test_get_user_by_subject(test_session: AsyncSession, mock_user: User):
+    auth_service = AuthenticationService(test_session)
+
+    assert await auth_service.get_user_by_subject(mock_user.username) == mock_user
+    with pytest.raises(AuthenticationError):
+        await auth_service.get_user_by_subject("non_existent_username")
+
+
 async def test_authenticate_user_success(test_session: AsyncSession, mock_user_with_password: tuple[User, str]):
     mock_user, password = mock_user_with_password
     auth_service = AuthenticationService(test_session)
@@ -0,0 +1,82 @@
+import pytest
+from fakeredis import FakeAsyncRedis
+
+from services.cache import Cache, Codec, MemoryCacheBackend, RedisCacheBackend, CacheBackend
+
+
+class TextCodec(Codec):
+    def dumps(self, value: str) -> bytes:
+        return value.encode()
+
+    def loads(self, data: bytes) -> str:
+        return data.decode()
+
+
+@pytest.fixture
+def redis_backend() -> RedisCacheBackend:
+    return RedisCacheBackend("cache:test:", TextCodec(), ttl=60, client=FakeAsyncRedis())
+
+
+async def test_memory_backend_batches():
+    cache = Cache("test", MemoryCacheBackend(maxsize=10, ttl=60))
+
+    await cache.set_many({1: "one", 2: "two"})
+
+    assert await cache.get_many([1, 2, 3]) == ["one", "two", None]
+    assert (cache.hits, cache.misses) == (2, 1)
+    assert cache.size == 2
+
+
+async def test_memory_backend_evicts():
+    cache = Cache("test", MemoryCacheBackend(maxsize=2, ttl=60))
+
+    await cache.set_many({1: "one", 2: "two", 3: "three"})
+
+    assert cache.size == 2
+
+
+async def test_redis_backend_batches(redis_backend: RedisCacheBackend):
+    cache = Cache("test", redis_backend)
+
+    await cache.set_many({1: "one", 2: "two"})
+
+    assert await cache.get_many([1, 2, 3]) == ["one", "two", None]
+    assert cache.size is None
+    assert await redis_backend.client.get("cache:test:1") == b"one"
+    assert 0 < await redis_backend.client.pttl("cache:test:1") <= 60_000
+
+
+async def test_redis_backend_invalidate(redis_backend: RedisCacheBackend):
+    cache = Cache("test", redis_backend)
+    await cache.set_many({1: "one", 2: "two"})
+
+    await cache.invalidate(1)
+    assert await cache.get_many([1, 2]) == [None, "two"]
+
+    await redis_backend.client.set("other", "value")
+    await cache.clear()
+    assert await cache.get(2) is None
+    assert await redis_backend.client.get("other") == b"value"
+
+
+async def test_redis_backend_shared(redis_backend: RedisCacheBackend):
+    other = RedisCacheBackend(redis_backend.prefix, TextCodec(), ttl=60, client=redis_backend.client)
+
+    await Cache("test", redis_backend).set(1, "one")
+
+    assert await Cache("test", other).get(1) == "one"
+
+
+async def test_failing_backend_misses():
+    class FailingBackend(CacheBackend):
+        async def get_many(self, keys):
+            raise ConnectionError
+
+        async def set_many(self, items):
+            raise ConnectionError
+
+    cache = Cache("test", FailingBackend())
+
+    await cache.set(1, "one")
+    assert await cache.get(1) is None
+    assert cache.misses == 1
@@ -0,0 +1,106 @@
+from fakeredis import FakeAsyncRedis
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.client import Client
+from models.scope import Scope
+from services.cache import Cache, MemoryCacheBackend, RedisCacheBackend
+from services.client_cache import ClientPrincipal, ClientPrincipalCodec, client_principal_cache
+from services.client_service import ClientService
+
+
+def test_principal_from_client(mock_client: Client):
+    principal = ClientPrincipal.from_client(mock_client)
+
+    assert principal.id == mock_client.id
+    assert principal.user_id == mock_client.user.id
+    assert principal.username == mock_client.user.username
+    assert set(principal.scopes) == {scope.type for scope in mock_client.scopes}
+    assert mock_client.secret.encode() not in principal.secret_digest
+
+
+def test_principal_check_secret(mock_client: Client):
+    principal = ClientPrincipal.from_client(mock_client)
+
+    assert principal.check_secret(mock_client.secret)
+    assert not principal.check_secret("wrong_secret")
+
+
+def test_principal_codec(mock_client: Client):
+    principal = ClientPrincipal.from_client(mock_client)
+    codec = ClientPrincipalCodec()
+
+    data = codec.dumps(principal)
+
+    assert codec.loads(data) == principal
+    assert len(data) < 100
+
+
+def test_principal_codec_other_version(mock_client: Client):
+    codec = ClientPrincipalCodec()
+    data = codec.dumps(ClientPrincipal.from_client(mock_client))
+
+    assert codec.loads(bytes([codec.version + 1]) + data[1:]) is None
+
+
+async def test_cache_hit_ratio(mock_client: Client):
+    cache = Cache("test", MemoryCacheBackend(maxsize=10, ttl=60))
+    assert cache.hit_ratio == 0
+
+    assert await cache.get(mock_client.id) is None
+    await cache.set(mock_client.id, ClientPrincipal.from_client(mock_client))
+    assert (await cache.get(mock_client.id)).id == mock_client.id
+
+    assert cache.hits == cache.misses == 1
+    assert cache.hit_ratio == 0.5
+
+
+async def test_get_client_principal(test_session: AsyncSession, mock_client: Client):
+    service = ClientService(test_session)
+    await client_principal_cache.invalidate(mock_client.id)
+
+    principal = await service.get_client_principal(mock_client.id)
+    assert principal.id == mock_client.id
+    assert principal.check_secret(mock_client.secret)
+
+    hits = client_principal_cache.hits
+    assert await service.get_client_principal(mock_client.id) is principal
+    assert client_principal_cache.hits == hits + 1
+
+
+async def test_get_client_principal_redis(test_session: AsyncSession, mock_client: Client, monkeypatch):
+    backend = RedisCacheBackend("cache:client_principal:", ClientPrincipalCodec(), ttl=60, client=FakeAsyncRedis())
+    monkeypatch.setattr(client_principal_cache, "backend", backend)
+    service = ClientService(test_session)
+
+    principal = await service.get_client_principal(mock_client.id)
+
+    hits = client_principal_cache.hits
+    assert await service.get_client_principal(mock_client.id) == principal
+    assert client_principal_cache.hits == hits + 1
+
+    await service.delete(mock_client.id)
+    assert await backend.client.get(f"cache:client_principal:{mock_client.id}") is None
+
+
+async def test_get_client_principal_not_exist(test_session: AsyncSession):
+    service = ClientService(test_session)
+    assert await service.get_client_principal(int(1e9) + 42) is None
+
+
+async def test_set_scopes_invalidates(test_session: AsyncSession, mock_client: Client):
+    service = ClientService(test_session)
+    await service.get_client_principal(mock_client.id)
+
+    await service.set_scopes(mock_client, [Scope.Types.PROFILE_READ])
+
+    principal = await service.get_client_principal(mock_client.id)
+    assert Scope.Types.PROFILE_READ in principal.scopes
+
+
+async def test_delete_invalidates(test_session: AsyncSession, mock_client: Client):
+    service = ClientService(test_session)
+    await service.get_client_principal(mock_client.id)
+
+    await service.delete(mock_client.id)
+
+    assert await service.get_client_principal(mock_client.id) is None
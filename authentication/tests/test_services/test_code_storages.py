@@ -0,0 +1,122 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.client import Client
+from models.code import Code, UnloggedCode
+from services.code_service import CodeService
+from services.code_storages import TableCodeStorage, UnloggedTableCodeStorage, MemoryCodeStorage
+from tests.conftest import get_mock_uri
+
+STORAGES = [TableCodeStorage, UnloggedTableCodeStorage, MemoryCodeStorage]
+
+
+@pytest.fixture(params=STORAGES)
+async def storage_code_service(request, test_session: AsyncSession) -> CodeService:
+    return CodeService(test_session, storage=request.param(test_session))
+
+
+@pytest.fixture
+async def storage_code(storage_code_service: CodeService, mock_client: Client) -> Code:
+    code = await storage_code_service.create(
+        client=mock_client,
+        redirect_uri=get_mock_uri(),
+        valid_until=datetime.now() + timedelta(minutes=5)
+    )
+
+    code_id = code.id
+    yield code
+
+    await storage_code_service.delete(code_id)
+
+
+async def test_unlogged_table_persistence(test_session: AsyncSession):
+    assert await test_session.scalar(
+        text("SELECT relpersistence::text FROM pg_class WHERE relname = :name"),
+        {"name": UnloggedCode.__tablename__}
+    ) == "u"
+
+
+async def test_create(storage_code_service: CodeService, storage_code: Code):
+    assert storage_code.value
+    assert not storage_code.is_used
+    assert (await storage_code_service.get_by_id(storage_code.id)).value == storage_code.value
+
+
+async def test_get_valid_code_success(storage_code_service: CodeService, storage_code: Code):
+    code = await storage_code_service.get_valid_code(
+        value=storage_code.value,
+        client_id=storage_code.client_id,
+        redirect_uri=storage_code.redirect_uri
+    )
+    assert code.value == storage_code.value
+
+
+async def test_get_valid_code_wrong_redirect_uri(storage_code_service: CodeService, storage_code: Code):
+    assert not await storage_code_service.get_valid_code(
+        value=storage_code.value,
+        client_id=storage_code.client_id,
+        redirect_uri="wrong_redirect_uri"
+    )
+
+
+async def test_take_valid_code_once(storage_code_service: CodeService, storage_code: Code):
+    code = await storage_code_service.take_valid_code(
+        value=storage_code.value,
+        client_id=storage_code.client_id,
+        redirect_uri=storage_code.redirect_uri
+    )
+    assert code.value == storage_code.value
+    assert code.is_used
+
+    assert not await storage_code_service.take_valid_code(
+        value=storage_code.value,
+        client_id=storage_code.client_id,
+        redirect_uri=storage_code.redirect_uri
+    )
+    assert not await storage_code_service.get_valid_code(
+        value=storage_code.value,
+        client_id=storage_code.client_id,
+        redirect_uri=storage_code.redirect_uri
+    )
+
+
+async def test_take_valid_code_wrong_client_id(storage_code_service: CodeService, storage_code: Code):
+    assert not await storage_code_service.take_valid_code(
+        value=storage_code.value,
+        client_id=int(1e9) + 42,
+        redirect_uri=storage_code.redirect_uri
+    )
+    assert await storage_code_service.get_valid_code(
+        value=storage_code.value,
+        client_id=storage_code.client_id,
+        redirect_uri=storage_code.redirect_uri
+    )
+
+
+async def test_take_valid_code_expired(storage_code_service: CodeService, mock_client: Client):
+    code = await storage_code_service.create(
+        client=mock_client,
+        redirect_uri=get_mock_uri(),
+        valid_until=datetime.now() - timedelta(minutes=1)
+    )
+
+    assert not await storage_code_service.take_valid_code(
+        value=code.value,
+        client_id=code.client_id,
+        redirect_uri=code.redirect_uri
+    )
+
+    await storage_code_service.delete(code.id)
+
+
+async def test_set_is_used(storage_code_service: CodeService, storage_code: Code):
+    await storage_code_service.set_is_used(storage_code)
+
+    assert not await storage_code_service.get_valid_code(
+        value=storage_code.value,
+        client_id=storage_code.client_id,
+        redirect_uri=storage_code.redirect_uri
+    )
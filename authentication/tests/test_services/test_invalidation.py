@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.client import Client
+from services.cache import Cache, MemoryCacheBackend
+from services.client_cache import client_principal_cache
+from services.client_service import ClientService
+from services.invalidation import InvalidationListener, Entities, notify_invalidation, register_invalidated_cache, \
+    invalidated_caches, parse_payload, format_payload
+from services.user_service import UserService
+
+
+@pytest.fixture
+def user_cache() -> Cache:
+    cache = Cache("test_user", MemoryCacheBackend(maxsize=10, ttl=60))
+    register_invalidated_cache(Entities.USER, cache)
+    yield cache
+    invalidated_caches[Entities.USER].remove(cache)
+
+
+@pytest.fixture
+async def listener(test_db_engine) -> InvalidationListener:
+    listener = InvalidationListener(reconnect_seconds=0.1)
+    task = asyncio.create_task(listener.run())
+    await asyncio.wait_for(listener.connected.wait(), 5)
+    yield listener
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+
+async def wait_for_eviction(cache: Cache, key: int):
+    for _ in range(100):
+        if await cache.backend.get_many([key]) == [None]:
+            return True
+        await asyncio.sleep(0.01)
+    return False
+
+
+def test_payload_roundtrip():
+    assert parse_payload(format_payload(Entities.CLIENT, [1, 2, 3])) == ("client", [1, 2, 3])
+    assert parse_payload("client:") is None
+    assert parse_payload("garbage") is None
+
+
+async def test_listener_evicts_committed_change(listener, user_cache: Cache, test_session: AsyncSession):
+    await user_cache.set(42, "user")
+
+    await notify_invalidation(test_session, Entities.USER, [42])
+    # nothing is evicted before the commit, a request reloading the old rows meanwhile is evicted with it
+    assert await user_cache.get(42) == "user"
+    await test_session.commit()
+
+    assert await wait_for_eviction(user_cache, 42)
+
+
+async def test_listener_ignores_rolled_back_change(listener, user_cache: Cache, test_session: AsyncSession):
+    await notify_invalidation(test_session, Entities.USER, [42])
+    await user_cache.set(42, "user")
+    await test_session.rollback()
+
+    assert not await wait_for_eviction(user_cache, 42)
+
+
+async def test_listener_clears_after_reconnect(listener, user_cache: Cache, test_session: AsyncSession):
+    await user_cache.set(42, "user")
+    pid = listener.connection.get_server_pid()
+
+    # notifications sent until the listener reconnects are lost, everything cached before is dropped
+    await test_session.execute(text("SELECT pg_terminate_backend(:pid)"), {"pid": pid})
+    for _ in range(100):
+        if listener.connected.is_set() and listener.connection.get_server_pid() != pid:
+            break
+        await asyncio.sleep(0.01)
+
+    assert listener.connection.get_server_pid() != pid
+    assert user_cache.size == 0
+
+
+async def test_delete_user_invalidates_clients(test_session: AsyncSession, mock_client: Client):
+    service = ClientService(test_session)
+    await service.get_client_principal(mock_client.id)
+
+    await UserService(test_session).delete(mock_client.user_id)
+
+    assert await client_principal_cache.backend.get_many([mock_client.id]) == [None]
+
+
+async def test_set_scopes_evicts_after_commit(test_session: AsyncSession, mock_client: Client):
+    service = ClientService(test_session)
+    await service.get_client_principal(mock_client.id)
+    evicted_before_commit = []
+
+    async def commit():
+        evicted_before_commit.append(await client_principal_cache.backend.get_many([mock_client.id]) == [None])
+        await AsyncSession.commit(test_session)
+
+    test_session.commit = commit
+    try:
+        await service.set_scopes(mock_client, [])
+    finally:
+        del test_session.commit
+
+    assert evicted_before_commit == [False]
+    assert await client_principal_cache.backend.get_many([mock_client.id]) == [None]
+
+
+async def test_set_scopes_without_commit_keeps_cache(test_session: AsyncSession, mock_client: Client):
+    service = ClientService(test_session)
+    await service.get_client_principal(mock_client.id)
+
+    await service.set_scopes(mock_client, [], commit=False)
+    # the transaction is still open, other requests may only read the committed scopes
+    assert await client_principal_cache.backend.get_many([mock_client.id]) != [None]
+    await test_session.rollback()
@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.client import Client
+from models.code import Code
+from services.authentication_serivce import AuthenticationService
+from services.client_service import ClientService
+from services.last_authenticated_buffer import LastAuthenticatedBuffer, last_authenticated_buffer
+
+
+async def get_last_authenticated(test_session: AsyncSession, client: Client) -> datetime:
+    return await test_session.scalar(
+        select(Client.last_authenticated)
+        .where(Client.id == client.id)
+        .execution_options(populate_existing=True)
+    )
+
+
+async def test_add_keeps_latest_date():
+    buffer = LastAuthenticatedBuffer()
+    date = datetime.now()
+
+    buffer.add(1, date)
+    buffer.add(1, date - timedelta(minutes=1))
+    assert buffer.pending[1] == date
+
+    buffer.add(1, date + timedelta(minutes=1))
+    assert buffer.pending[1] == date + timedelta(minutes=1)
+    assert len(buffer) == 1
+
+
+async def test_flush_empty(test_session: AsyncSession):
+    buffer = LastAuthenticatedBuffer()
+    assert await buffer.flush(test_session) == 0
+
+
+async def test_flush(test_session: AsyncSession, mock_client: Client):
+    buffer = LastAuthenticatedBuffer()
+    date = datetime.now() + timedelta(days=10)
+
+    buffer.add(mock_client.id, date)
+    assert await buffer.flush(test_session) == 1
+
+    assert len(buffer) == 0
+    assert await get_last_authenticated(test_session, mock_client) == date
+
+
+async def test_flush_does_not_overwrite_newer(test_session: AsyncSession, mock_client: Client):
+    service = ClientService(test_session)
+    buffer = LastAuthenticatedBuffer()
+    newer_date = datetime.now() + timedelta(days=10)
+
+    await service.set_last_authenticated(mock_client, newer_date)
+    buffer.add(mock_client.id, newer_date - timedelta(days=1))
+    await buffer.flush(test_session)
+
+    assert await get_last_authenticated(test_session, mock_client) == newer_date
+
+
+async def test_mark_authenticated(test_session: AsyncSession, mock_client: Client):
+    service = ClientService(test_session)
+    date = datetime.now() + timedelta(days=10)
+
+    await service.mark_authenticated(mock_client.id, date)
+
+    assert last_authenticated_buffer.pending[mock_client.id] == date
+    await last_authenticated_buffer.flush(test_session)
+    assert await get_last_authenticated(test_session, mock_client) == date
+
+
+async def test_create_code_pair_marks_authenticated(test_session: AsyncSession, mock_client: Client, mock_code: Code):
+    auth_service = AuthenticationService(test_session)
+    last_authenticated_buffer.pending.pop(mock_client.id, None)
+
+    await auth_service.create_code_pair(
+        client_id=mock_client.id,
+        client_secret=mock_client.secret,
+        redirect_uri=mock_code.redirect_uri,
+        value=mock_code.value
+    )
+
+    assert mock_client.id in last_authenticated_buffer.pending
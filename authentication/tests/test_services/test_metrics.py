@@ -0,0 +1,99 @@
+import sqlite3
+
+from sqlalchemy import text, QueuePool
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from monitoring.metrics import Registry, Histogram, format_labels
+from monitoring.pool import get_pool_saturation
+from monitoring.queries import track_queries
+
+
+def test_histogram_buckets():
+    histogram = Histogram((0.1, 1))
+    for value in (0.05, 0.1, 0.5, 2):
+        histogram.observe(value)
+
+    assert histogram.counts == [2, 1, 1]
+    assert histogram.count == 4
+    assert histogram.sum == 2.65
+
+
+def test_format_labels():
+    assert format_labels((), ()) == ""
+    assert format_labels(("method", "route"), ("GET", "/")) == '{method="GET",route="/"}'
+    assert format_labels(("route",), ("/",), 'le="1.0"') == '{route="/",le="1.0"}'
+
+
+def test_render_counter():
+    registry = Registry()
+    counter = registry.counter("requests_total", "Requests", ("route",))
+    counter.labels("/a").inc()
+    counter.labels("/a").inc(2)
+
+    rendered = registry.render()
+
+    assert "# TYPE requests_total counter" in rendered
+    assert 'requests_total{route="/a"} 3' in rendered
+
+
+def test_render_collected_counter():
+    registry = Registry()
+    registry.counter("lookups_total", "Lookups", ("state",), lambda: [(("hits",), 3)])
+
+    rendered = registry.render()
+
+    assert "# TYPE lookups_total counter" in rendered
+    assert 'lookups_total{state="hits"} 3' in rendered
+
+
+def test_render_histogram():
+    registry = Registry()
+    histogram = registry.histogram("duration_seconds", "Duration", buckets=(0.1, 1))
+    histogram.observe(0.5)
+    histogram.observe(5)
+
+    lines = registry.render().splitlines()
+
+    assert 'duration_seconds_bucket{le="0.1"} 0' in lines
+    assert 'duration_seconds_bucket{le="1.0"} 1' in lines
+    assert 'duration_seconds_bucket{le="+Inf"} 2' in lines
+    assert "duration_seconds_sum 5.5" in lines
+    assert "duration_seconds_count 2" in lines
+
+
+def test_render_gauge():
+    registry = Registry()
+    registry.gauge("connections", "Connections", ("state",), lambda: [(("idle",), 2), (("used",), 1)])
+
+    rendered = registry.render()
+
+    assert 'connections{state="idle"} 2' in rendered
+    assert 'connections{state="used"} 1' in rendered
+
+
+def test_query_stats_nested():
+    with track_queries() as outer:
+        outer.record(0.5)
+        with track_queries() as inner:
+            inner.record(0.25)
+
+    assert inner.count == 1
+    assert outer.count == 2
+    assert outer.duration == 0.75
+
+
+async def test_track_queries(test_session: AsyncSession):
+    with track_queries() as stats:
+        await test_session.execute(text("SELECT 1"))
+
+    assert stats.count == 1
+    assert stats.duration > 0
+
+
+def test_pool_saturation():
+    pool = QueuePool(lambda: sqlite3.connect(":memory:"), pool_size=2, max_overflow=2)
+    connection = pool.connect()
+
+    assert get_pool_saturation(pool, max_overflow=2) == 0.25
+    connection.close()
+    assert get_pool_saturation(pool, max_overflow=2) == 0
@@ -0,0 +1,153 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.code import Code
+from services.partition_service import PartitionIntervals, CodePartitionService, create_partitions, \
+    drop_partitions, get_partitions, get_partition_name, get_partition_start, parse_partition_start, \
+    get_partition_bounds
+
+MOCK_TABLE = "mock_partitioned"
+MOCK_NOW = datetime(2030, 1, 1, 10, 30)
+
+
+@pytest.fixture
+async def mock_partitioned_table(test_session: AsyncSession) -> str:
+    await test_session.execute(text(
+        f"CREATE TABLE {MOCK_TABLE} (created_at TIMESTAMP NOT NULL) PARTITION BY RANGE (created_at)"
+    ))
+    await test_session.commit()
+
+    yield MOCK_TABLE
+
+    await test_session.execute(text(f"DROP TABLE {MOCK_TABLE}"))
+    await test_session.commit()
+
+
+@pytest.mark.parametrize(
+    "interval, expected_start, expected_name", [
+        (PartitionIntervals.HOUR, datetime(2030, 1, 1, 10), "codes_p2030010110"),
+        (PartitionIntervals.DAY, datetime(2030, 1, 1), "codes_p20300101"),
+    ])
+def test_get_partition_name(interval: PartitionIntervals, expected_start: datetime, expected_name: str):
+    start = get_partition_start(MOCK_NOW, interval)
+
+    assert start == expected_start
+    assert get_partition_name("codes", start, interval) == expected_name
+    assert parse_partition_start("codes", expected_name, interval) == expected_start
+
+
+def test_parse_partition_start_default():
+    assert parse_partition_start("codes", "codes_default", PartitionIntervals.DAY) is None
+
+
+def test_parse_partition_start_other_interval():
+    assert parse_partition_start("codes", "codes_p20261022", PartitionIntervals.HOUR) is None
+    assert parse_partition_start("codes", "codes_p2026102210", PartitionIntervals.DAY) is None
+
+
+async def create_mock_partitions(session: AsyncSession, interval: PartitionIntervals, ahead: int, now: datetime):
+    return await session.run_sync(
+        lambda sync_session: create_partitions(sync_session.connection(), MOCK_TABLE, interval, ahead=ahead, now=now)
+    )
+
+
+async def test_create_partitions(test_session: AsyncSession, mock_partitioned_table: str):
+    created = await test_session.run_sync(
+        lambda session: create_partitions(
+            session.connection(), mock_partitioned_table, PartitionIntervals.HOUR, ahead=2, now=MOCK_NOW)
+    )
+    assert created == [f"{MOCK_TABLE}_p2030010110", f"{MOCK_TABLE}_p2030010111", f"{MOCK_TABLE}_p2030010112"]
+
+    created_again = await test_session.run_sync(
+        lambda session: create_partitions(
+            session.connection(), mock_partitioned_table, PartitionIntervals.HOUR, ahead=2, now=MOCK_NOW)
+    )
+    assert created_again == []
+
+    await test_session.execute(
+        text(f"INSERT INTO {MOCK_TABLE} (created_at) VALUES (:created_at)"),
+        {"created_at": MOCK_NOW}
+    )
+    assert await test_session.scalar(
+        text(f"SELECT tableoid::regclass::text FROM {MOCK_TABLE}")
+    ) == f"{MOCK_TABLE}_p2030010110"
+    await test_session.rollback()
+
+
+async def test_drop_partitions(test_session: AsyncSession, mock_partitioned_table: str):
+    await test_session.run_sync(
+        lambda session: create_partitions(
+            session.connection(), mock_partitioned_table, PartitionIntervals.HOUR, ahead=4, now=MOCK_NOW)
+    )
+
+    dropped = await test_session.run_sync(
+        lambda session: drop_partitions(
+            session.connection(), mock_partitioned_table, PartitionIntervals.HOUR, retained=1,
+            now=MOCK_NOW + timedelta(hours=3))
+    )
+    assert set(dropped) == {f"{MOCK_TABLE}_p2030010110", f"{MOCK_TABLE}_p2030010111"}
+    assert set(await test_session.run_sync(
+        lambda session: get_partitions(session.connection(), mock_partitioned_table)
+    )) == {f"{MOCK_TABLE}_p2030010112", f"{MOCK_TABLE}_p2030010113", f"{MOCK_TABLE}_p2030010114"}
+    await test_session.commit()
+
+
+async def test_maintain_creates_current_partition(test_session: AsyncSession):
+    service = CodePartitionService(test_session)
+    await service.maintain()
+
+    partitions = await test_session.run_sync(
+        lambda session: get_partitions(session.connection(), Code.__tablename__)
+    )
+    assert f"{Code.__tablename__}_default" in partitions
+    assert any(
+        parse_partition_start(Code.__tablename__, name, interval) == get_partition_start(datetime.now(), interval)
+        for name in partitions
+        for interval in PartitionIntervals
+    )
+
+
+async def test_create_partitions_within_other_interval(test_session: AsyncSession, mock_partitioned_table: str):
+    await create_mock_partitions(test_session, PartitionIntervals.DAY, ahead=0, now=MOCK_NOW)
+
+    # the hours still covered by the daily partition are skipped
+    created = await create_mock_partitions(test_session, PartitionIntervals.HOUR, ahead=2, now=MOCK_NOW)
+    assert created == []
+    created = await create_mock_partitions(test_session, PartitionIntervals.HOUR, ahead=0, now=datetime(2030, 1, 2))
+    assert created == [f"{MOCK_TABLE}_p2030010200"]
+    await test_session.commit()
+
+
+async def test_drop_partitions_of_other_interval(test_session: AsyncSession, mock_partitioned_table: str):
+    await create_mock_partitions(test_session, PartitionIntervals.DAY, ahead=2, now=MOCK_NOW)
+
+    dropped = await test_session.run_sync(
+        lambda session: drop_partitions(
+            session.connection(), mock_partitioned_table, PartitionIntervals.HOUR, retained=1, now=MOCK_NOW)
+    )
+    assert dropped == []
+    await test_session.commit()
+
+
+async def test_create_partitions_moves_default_rows(test_session: AsyncSession, mock_partitioned_table: str):
+    await test_session.execute(text(f"CREATE TABLE {MOCK_TABLE}_default PARTITION OF {MOCK_TABLE} DEFAULT"))
+    await test_session.execute(
+        text(f"INSERT INTO {MOCK_TABLE} (created_at) VALUES (:created_at)"),
+        {"created_at": MOCK_NOW}
+    )
+
+    created = await create_mock_partitions(test_session, PartitionIntervals.HOUR, ahead=0, now=MOCK_NOW)
+
+    assert created == [f"{MOCK_TABLE}_p2030010110"]
+    assert await test_session.scalar(
+        text(f"SELECT tableoid::regclass::text FROM {MOCK_TABLE}")
+    ) == f"{MOCK_TABLE}_p2030010110"
+    bounds = await test_session.run_sync(lambda session: get_partition_bounds(session.connection(), MOCK_TABLE))
+    assert {partition.name: partition.start for partition in bounds} == {
+        f"{MOCK_TABLE}_default": None,
+        f"{MOCK_TABLE}_p2030010110": datetime(2030, 1, 1, 10),
+    }
+    await test_session.commit()
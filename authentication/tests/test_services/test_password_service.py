@@ -6,8 +6,7 @@ import pytest
 from services.password_service.algorithms import get_plain_hash, get_sha256_hash
 from services.password_service.service import PasswordAlgorithms, PasswordService
 from services.password_service.validators import validate_min_length, PasswordValidationError, validate_max_length
-from tests.conftest import generate_mock_plain_password
-from tests.test_services.conftest import CORRECT_PASSWORD_MIN_LENGTH, CORRECT_PASSWORD_MAX_LENGTH
+from tests.conftest import generate_mock_plain_password, CORRECT_PASSWORD_MIN_LENGTH, CORRECT_PASSWORD_MAX_LENGTH
 
 
 def test_plain_algorithm():
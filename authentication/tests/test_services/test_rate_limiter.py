@@ -0,0 +1,110 @@
+import pytest
+from fakeredis import FakeAsyncRedis
+
+from services.rate_limiter import Rate, MemoryRateLimitBackend, RedisRateLimitBackend
+
+
+@pytest.mark.parametrize(
+    "value, capacity, period", [
+        ("10/second", 10, 1),
+        ("60/minute", 60, 60),
+        ("1/hour", 1, 3600),
+    ])
+def test_rate_parse(value: str, capacity: int, period: int):
+    rate = Rate.parse(value)
+
+    assert rate.capacity == capacity
+    assert rate.period == period
+    assert rate.refill == capacity / period
+
+
+async def test_memory_backend_limits():
+    backend = MemoryRateLimitBackend(max_keys=10)
+    rate = Rate.parse("2/second")
+
+    first = await backend.take("key", rate, now=0)
+    second = await backend.take("key", rate, now=0)
+    third = await backend.take("key", rate, now=0)
+
+    assert first.allowed and second.allowed
+    assert (first.remaining, second.remaining) == (1, 0)
+    assert not third.allowed
+    assert third.retry_after == pytest.approx(0.5)
+
+
+async def test_memory_backend_refills():
+    backend = MemoryRateLimitBackend(max_keys=10)
+    rate = Rate.parse("2/second")
+
+    for _ in range(2):
+        await backend.take("key", rate, now=0)
+
+    assert not (await backend.take("key", rate, now=0.1)).allowed
+    assert (await backend.take("key", rate, now=0.6)).allowed
+
+
+async def test_memory_backend_keys_separate():
+    backend = MemoryRateLimitBackend(max_keys=10)
+    rate = Rate.parse("1/minute")
+
+    assert (await backend.take("first", rate, now=0)).allowed
+    assert (await backend.take("second", rate, now=0)).allowed
+    assert not (await backend.take("first", rate, now=0)).allowed
+
+
+async def test_memory_backend_takes_all_or_none():
+    backend = MemoryRateLimitBackend(max_keys=10)
+    rate = Rate.parse("1/minute")
+
+    await backend.take("empty", rate, now=0)
+    states = await backend.take_all(["full", "empty"], rate, now=0)
+
+    assert not any(state.allowed for state in states)
+    assert states[0].retry_after == 0 < states[1].retry_after
+    assert (await backend.take("full", rate, now=0)).allowed
+
+
+async def test_memory_backend_bounded():
+    backend = MemoryRateLimitBackend(max_keys=3)
+    rate = Rate.parse("1/minute")
+
+    for key in range(10):
+        await backend.take(str(key), rate, now=0)
+
+    assert list(backend.buckets) == ["7", "8", "9"]
+
+
+async def test_redis_backend_shared():
+    client = FakeAsyncRedis()
+    first_worker = RedisRateLimitBackend(client)
+    second_worker = RedisRateLimitBackend(client)
+    rate = Rate.parse("2/second")
+
+    assert (await first_worker.take("key", rate, now=100)).allowed
+    assert (await second_worker.take("key", rate, now=100)).allowed
+
+    state = await first_worker.take("key", rate, now=100)
+    assert not state.allowed
+    assert state.retry_after == pytest.approx(0.5)
+
+    assert (await second_worker.take("key", rate, now=100.6)).allowed
+
+
+async def test_redis_backend_expires_buckets():
+    client = FakeAsyncRedis()
+    backend = RedisRateLimitBackend(client)
+
+    await backend.take("key", Rate.parse("10/minute"), now=0)
+
+    assert 0 < await client.pttl(backend.key_prefix + "key") <= 60 * 1000
+
+
+async def test_redis_backend_takes_all_or_none():
+    backend = RedisRateLimitBackend(FakeAsyncRedis())
+    rate = Rate.parse("1/minute")
+
+    await backend.take("empty", rate, now=100)
+    states = await backend.take_all(["full", "empty"], rate, now=100)
+
+    assert not any(state.allowed for state in states)
+    assert (await backend.take("full", rate, now=100)).allowed
@@ -0,0 +1,78 @@
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncEngine
+
+from models.client import Client
+from models.scope import Scope
+from services.client_service import ClientService
+from services.scope_registry import ScopeRegistry, scope_registry
+
+
+@pytest.fixture
+def statements(test_db_engine: AsyncEngine) -> list[str]:
+    executed = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(test_db_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    yield executed
+    event.remove(test_db_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+async def test_load(test_session: AsyncSession, mock_scope: Scope):
+    registry = ScopeRegistry()
+    await registry.load(test_session)
+
+    assert registry.is_loaded
+    assert registry.revision
+    assert registry.get_id(mock_scope.type) == mock_scope.id
+    assert registry.get_type(mock_scope.id) == mock_scope.type
+    for type_ in Scope.Types:
+        assert registry.get_id(type_.value)
+
+
+async def test_add_remove():
+    registry = ScopeRegistry()
+    registry.add(42, "scope-42")
+    assert registry.get_id("scope-42") == 42
+    assert registry.get_type(42) == "scope-42"
+
+    registry.remove(42)
+    assert registry.get_id("scope-42") is None
+    assert registry.get_type(42) is None
+
+
+async def test_registry_follows_scope_service(mock_scope: Scope):
+    assert scope_registry.get_id(mock_scope.type) == mock_scope.id
+
+
+async def test_get_scopes_unknown_type(test_session: AsyncSession):
+    assert await scope_registry.get_scopes(test_session, ["non_existent_scope"]) is None
+
+
+async def test_get_scopes_no_select(test_session: AsyncSession, mock_scope: Scope, statements: list[str]):
+    await scope_registry.ensure_loaded(test_session)
+    statements.clear()
+
+    scopes = await scope_registry.get_scopes(test_session, [mock_scope.type])
+
+    assert scopes == [mock_scope]
+    assert statements == []
+
+
+async def test_set_scopes_no_scope_select(
+        test_session: AsyncSession,
+        mock_client: Client,
+        statements: list[str]
+):
+    await scope_registry.ensure_loaded(test_session)
+    statements.clear()
+
+    await ClientService(test_session).set_scopes(
+        instance=mock_client,
+        scopes=[Scope.Types.PROFILE_READ]
+    )
+
+    assert Scope.Types.PROFILE_READ in {scope.type for scope in mock_client.scopes}
+    assert not [statement for statement in statements if "FROM scopes" in statement]
@@ -0,0 +1,100 @@
+import dataclasses
+
+import pytest
+
+import env
+from env import Settings, get_settings, reload_settings, get_postgres_port
+from exceptions import EnvironmentValueError
+
+
+def test_settings_immutable():
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        get_settings().app.secret = "other_secret_key"
+
+
+def test_settings_loaded_once():
+    assert get_settings() is get_settings()
+
+
+def test_reload_settings(env_key):
+    port = get_postgres_port()
+    env_key("POSTGRES_PORT", "6543")
+    assert get_postgres_port() == port != "6543"
+
+    reload_settings()
+    assert get_postgres_port() == "6543"
+
+
+@pytest.mark.parametrize(
+    "key, value", [
+        ("POSTGRES_PORT", "not_a_port"),
+        ("POSTGRES_PORT", "70000"),
+        ("APP_SECRET_KEY", "short"),
+        ("PASSWORD_ITERATIONS", str(int(1e7))),
+        ("CODE_STORAGE", "disk"),
+        ("SERVE_WORKERS", "0"),
+        ("DB_POOL_SIZE", "many"),
+        ("RATE_LIMIT_ROUTES", "/auth/refresh/=2/day"),
+        ("RATE_LIMIT_ROUTES", "/auth/refresh/=2/minute,"),
+        ("RATE_LIMIT_ROUTES", "auth/refresh/=2/minute"),
+        ("RATE_LIMIT_ROUTES", "/auth/ refresh/=2/minute"),
+    ])
+def test_invalid_settings(env_key, key: str, value: str):
+    env_key(key, value)
+
+    with pytest.raises(EnvironmentValueError):
+        Settings.load()
+
+
+def test_invalid_reload_keeps_settings(env_key):
+    settings = get_settings()
+    assert get_postgres_port()
+    env_key("POSTGRES_PORT", "not_a_port")
+
+    with pytest.raises(EnvironmentValueError):
+        reload_settings()
+    assert get_settings() is settings
+
+
+def test_rate_limit_routes(env_key):
+    env_key("RATE_LIMIT_ROUTES", "/auth/refresh/=2/minute,/auth/verify/=10/second")
+
+    assert Settings.load().rate_limit.routes == "/auth/refresh/=2/minute,/auth/verify/=10/second"
+
+
+def test_settings_loaded_per_group(env_key):
+    env_key("APP_SECRET_KEY", None)
+    env_key("FRONTEND_URL", None)
+
+    settings = Settings.load(("postgres", "codes"))
+    assert settings.loaded_groups == ("postgres", "codes")
+    with pytest.raises(EnvironmentValueError):
+        settings.app
+
+
+def test_reload_validates_loaded_groups(env_key, monkeypatch):
+    monkeypatch.setattr(env, "settings", Settings.load(("postgres",)))
+    env_key("APP_SECRET_KEY", "short")
+
+    assert reload_settings().loaded_groups == ("postgres",)
+    env_key("POSTGRES_PORT", "not_a_port")
+    with pytest.raises(EnvironmentValueError):
+        reload_settings()
+
+
+def test_empty_value_falls_back_to_default(env_key):
+    env_key("PASSWORD_MIN_LENGTH", "")
+    env_key("POSTGRES_HOST", "")
+
+    settings = Settings.load(("passwords", "postgres"))
+    assert settings.passwords.min_length == 8
+    assert settings.postgres.host == "127.0.0.1"
+
+
+def test_password_lengths_enforced_when_set(env_key):
+    env_key("PASSWORD_MIN_LENGTH", "")
+    env_key("PASSWORD_MAX_LENGTH", "20")
+
+    passwords = Settings.load(("passwords",)).passwords
+    assert not passwords.min_length_enforced
+    assert passwords.max_length_enforced
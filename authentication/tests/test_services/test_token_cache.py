@@ -0,0 +1,43 @@
+import time
+
+from monitoring.metrics import JWT_DURATION
+from services.token_cache import TokenClaimsCache, token_claims_cache
+from services.token_verifier import token_verifier
+
+
+def test_cache_hit_ratio():
+    cache = TokenClaimsCache(maxsize=10, ttl=60)
+
+    assert cache.get("token") is None
+    cache.set("token", {"exp": time.time() + 60})
+    assert cache.get("token") is not None
+
+    assert cache.hits == cache.misses == 1
+    assert cache.hit_ratio == 0.5
+
+
+def test_cache_entry_expires_with_token():
+    cache = TokenClaimsCache(maxsize=10, ttl=60)
+
+    cache.set("expired", {"exp": time.time() - 1})
+    assert cache.get("expired") is None
+
+
+def test_cache_entry_bounded_by_ttl():
+    cache = TokenClaimsCache(maxsize=10, ttl=60)
+    now = time.time()
+
+    assert cache.get_expiration("token", {"exp": now + 3600}, now) == now + 60
+    assert cache.get_expiration("token", {"exp": now + 30}, now) == now + 30
+
+
+def test_introspect_token_cached(mock_token_pair: tuple[str, str]):
+    access_token, _ = mock_token_pair
+    token_claims_cache.clear()
+    decodes = JWT_DURATION.labels("decode")
+
+    claims = token_verifier.introspect(access_token)
+    count = decodes.count
+
+    assert token_verifier.introspect(access_token) is claims
+    assert decodes.count == count
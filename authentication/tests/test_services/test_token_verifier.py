@@ -0,0 +1,36 @@
+import pytest
+
+from services.authentication_serivce import TokenError, TokenTypes, TOKEN_SUB
+from services.token_cache import token_claims_cache
+from services.token_verifier import TokenVerifier
+from models.user import User
+
+
+def test_verify(mock_token_pair: tuple[str, str], mock_user: User):
+    access_token, _ = mock_token_pair
+
+    assert TokenVerifier().verify(access_token)[TOKEN_SUB] == mock_user.username
+
+
+def test_verify_wrong_type(mock_token_pair: tuple[str, str]):
+    _, refresh_token = mock_token_pair
+
+    with pytest.raises(TokenError):
+        TokenVerifier().verify(refresh_token)
+    assert TokenVerifier().verify(refresh_token, TokenTypes.REFRESH)
+
+
+def test_verify_other_secret(mock_token_pair: tuple[str, str]):
+    access_token, _ = mock_token_pair
+
+    with pytest.raises(TokenError):
+        TokenVerifier(secret="another_secret_key").verify(access_token)
+
+
+def test_introspect_other_secret(mock_token_pair: tuple[str, str]):
+    access_token, _ = mock_token_pair
+    token_claims_cache.clear()
+
+    assert TokenVerifier().introspect(access_token)
+    with pytest.raises(TokenError):
+        TokenVerifier(secret="another_secret_key").introspect(access_token)
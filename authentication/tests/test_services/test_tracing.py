@@ -0,0 +1,91 @@
+import json
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from monitoring.tracing import Span, JsonlSpanExporter, span_processor, start_trace, use_span, trace_span, traced, \
+    current_span, STATUS_ERROR
+from services.password_service.algorithms import get_sha256_hash
+from services.password_service.executor import run_hashing
+from services.password_service.service import PasswordService
+from tests.conftest import MemorySpanExporter
+
+TRACEPARENT = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+
+
+@traced
+def traced_function():
+    return current_span.get()
+
+
+def test_tracing_disabled():
+    assert start_trace("request", TRACEPARENT) is None
+
+
+def test_traceparent(span_exporter: MemorySpanExporter):
+    span = start_trace("request", TRACEPARENT)
+
+    assert span.trace_id == "0af7651916cd43dd8448eb211c80319c"
+    assert span.parent_id == "b7ad6b7169203331"
+    assert start_trace("request", TRACEPARENT[:-2] + "00") is None
+
+
+def test_traced(span_exporter: MemorySpanExporter):
+    with use_span(start_trace("request", TRACEPARENT)) as root:
+        span = traced_function()
+    span_processor.shutdown()
+
+    assert span.parent_id == root.span_id
+    assert span.name == "traced_function"
+    assert {item.name for item in span_exporter.spans} == {"request", "traced_function"}
+
+
+def test_traced_outside_of_trace(span_exporter: MemorySpanExporter):
+    assert traced_function() is None
+    assert trace_span("child").__enter__() is None
+
+
+def test_span_error(span_exporter: MemorySpanExporter):
+    with pytest.raises(ValueError):
+        with use_span(start_trace("request", TRACEPARENT)):
+            raise ValueError
+    span_processor.shutdown()
+
+    assert span_exporter.spans[0].status == STATUS_ERROR
+
+
+async def test_query_span(span_exporter: MemorySpanExporter, test_session: AsyncSession):
+    with use_span(start_trace("request", TRACEPARENT)) as root:
+        await test_session.execute(text("SELECT 1"))
+    span_processor.shutdown()
+
+    query = next(span for span in span_exporter.spans if span.name == "db.query")
+    assert query.parent_id == root.span_id
+    assert query.attributes["db.statement"] == "SELECT 1"
+
+
+async def test_hashing_span(span_exporter: MemorySpanExporter):
+    with use_span(start_trace("request", TRACEPARENT)) as root:
+        await run_hashing(
+            PasswordService().get_hash,
+            plain_password="password",
+            algorithm_fn=get_sha256_hash,
+            iterations=1000,
+            salt=b"salt"
+        )
+    span_processor.shutdown()
+
+    span = next(span for span in span_exporter.spans if span.name == "PasswordService.get_hash")
+    assert span.parent_id == root.span_id
+
+
+def test_jsonl_exporter(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    span = Span("request", "0af7651916cd43dd8448eb211c80319c")
+
+    JsonlSpanExporter(str(path)).export([span, span])
+
+    lines = path.read_text().splitlines()
+    assert len(lines) == 2
+    assert json.loads(lines[0])["name"] == "request"